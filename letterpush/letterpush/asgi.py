@@ -0,0 +1,193 @@
+"""
+ASGI config for letterpush project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``, to run with an ASGI server, e.g.
+
+    uvicorn letterpush.asgi:application
+
+Django 1.9 has no ASGI support of its own, so this wraps the WSGI
+application: the event loop keeps the connections, reads requests and
+sends responses, while Django handles them on a pool of
+settings.ASGI_THREADS threads. A slow client then holds a coroutine, not
+a thread, and the pool bounds the concurrent database work (and the
+number of connections). Needs Python 3.5+.
+"""
+
+import asyncio
+import io
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "letterpush.settings")
+
+
+def build_environ(scope, body):
+    """Return a WSGI environ for an ASGI HTTP scope and request body."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # WSGI strings are bytes decoded as latin-1.
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': 'HTTP/%s' % scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:  # Repeated header.
+            value = environ[name] + ',' + value
+        environ[name] = value
+    # Also for chunked requests, which have no Content-Length header.
+    environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+
+class ClientGone(Exception):
+    """The response has nowhere to go anymore."""
+
+
+class WsgiToAsgi(object):
+    """Serves a WSGI application over ASGI 3, on a bounded thread pool."""
+
+    # Chunks of a streaming response to hold for a slow client, after
+    # which the thread making them waits.
+    QUEUE_SIZE = 8
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.is_shut_down = False
+
+    def shutdown(self):
+        """Close the database connections of the pool threads, then it."""
+        if self.is_shut_down:
+            return
+        self.is_shut_down = True
+        barrier = threading.Barrier(self.threads)
+
+        def close(_):
+            barrier.wait()  # So that every thread runs one of these.
+            connections.close_all()
+        list(self.executor.map(close, range(self.threads)))
+        self.executor.shutdown(wait=True)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        else:
+            raise ValueError("Cannot serve %r" % scope['type'])
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Off the loop, which requests still running may need.
+                await asyncio.get_event_loop().run_in_executor(
+                    None, self.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.append(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        environ = build_environ(scope, b''.join(body))
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue(self.QUEUE_SIZE)
+        gone = threading.Event()
+
+        def put(message):  # From the pool thread.
+            if gone.is_set():
+                raise ClientGone()
+            asyncio.run_coroutine_threadsafe(queue.put(message), loop).result()
+
+        handled = loop.run_in_executor(self.executor, self.run, environ, put)
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    break
+                await send(message)
+        except BaseException:
+            gone.set()
+            while not queue.empty():  # Let a waiting put() through.
+                queue.get_nowait()
+            raise
+        finally:
+            try:
+                await handled
+            except ClientGone:
+                pass
+
+    def run(self, environ, put):
+        """
+        Call the WSGI application, in a pool thread; put() the ASGI
+        messages of the response, then None.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'),
+                             value.encode('latin-1'))
+                            for name, value in headers],
+            }
+
+        try:
+            chunks = self.wsgi_application(environ, start_response)
+            try:
+                for chunk in chunks:
+                    if chunk:
+                        if 'start' in response:  # Not sent yet.
+                            put(response.pop('start'))
+                        put({'type': 'http.response.body', 'body': chunk,
+                             'more_body': True})
+                if 'start' in response:
+                    put(response.pop('start'))
+                put({'type': 'http.response.body', 'body': b''})
+            finally:
+                # Sends request_finished, which closes the database
+                # connection of this thread if it is due.
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+        finally:
+            try:
+                put(None)
+            except ClientGone:
+                pass
+
+
+application = WsgiToAsgi(get_wsgi_application(), settings.ASGI_THREADS)
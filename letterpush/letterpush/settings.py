@@ -70,15 +70,130 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'letterpush.wsgi.application'
 
+# The ASGI entry point runs the WSGI application on a pool of this many
+# threads, see asgi.py; this also bounds its database connections.
+ASGI_THREADS = int(os.environ.get('LETTERPUSH_ASGI_THREADS', 16))
+
 
 # Database
 # https://docs.djangoproject.com/en/1.10/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+# LETTERPUSH_DB selects a profile:
+#   'sqlite' (default) is the plain development setup;
+#   'sqlite-tuned' adds WAL, a busy timeout, etc, for concurrent writers;
+#   'postgres' uses the usual PG* environment variables.
+# Try them with `python ./manage.py loadtest`.
+
+DB_PROFILE = os.environ.get('LETTERPUSH_DB', 'sqlite')
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('PGDATABASE', 'letterpush'),
+            'USER': os.environ.get('PGUSER', ''),
+            'PASSWORD': os.environ.get('PGPASSWORD', ''),
+            'HOST': os.environ.get('PGHOST', ''),  # Or a pgbouncer.
+            'PORT': os.environ.get('PGPORT', ''),
+            # Reuse connections across requests, seconds.
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+        }
+    }
+    SQLITE_PRAGMAS = {}
+elif DB_PROFILE in ('sqlite', 'sqlite-tuned'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        }
     }
+    # Run on every new connection, see rest_api/db.py.
+    SQLITE_PRAGMAS = {}
+    if DB_PROFILE == 'sqlite-tuned':
+        DATABASES['default'].update({
+            'OPTIONS': {'timeout': 20},  # Wait for a lock that long, seconds.
+            'CONN_MAX_AGE': None,  # Keep a connection per thread for good.
+        })
+        SQLITE_PRAGMAS = {
+            'journal_mode': 'WAL',  # Readers do not block the writer.
+            'synchronous': 'NORMAL',  # Safe with WAL, fsyncs far less.
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64 * 1024,  # In KiB, per connection.
+            'temp_store': 'MEMORY',
+        }
+else:
+    raise ValueError("Unknown LETTERPUSH_DB profile %r" % DB_PROFILE)
+
+
+# Cache of prepared API representations, see rest_api/cache.py.
+
+REST_API_CACHE = {
+    'BACKEND': 'lru',  # Or 'django' to use CACHES[ALIAS], or None.
+    'MAX_SIZE': 10000,
+    'ALIAS': 'default',
+}
+
+
+# Per-request instrumentation of the API, see rest_api/profiling.py.
+
+REST_API_PROFILING = {
+    'ENABLED': False,
+    'PROFILE_DIR': None,  # Where to put cProfile dumps, if anywhere.
+    'PROFILE_HEADER': 'HTTP_X_PROFILE',
+    'SAMPLE_RATE': 0.0,
+}
+
+# Changes handed to downstream consumers by `manage.py drain_outbox`,
+# see rest_api/outbox.py. E.g. 'CONSUMERS': {'log':
+# 'rest_api.outbox.log_events'}.
+
+REST_API_OUTBOX = {
+    'CONSUMERS': {},
+    'BATCH_SIZE': 200,
+    'THREADS': 4,
+    'MAX_ATTEMPTS': 8,
+    'RETRY_DELAY': 1.0,  # Seconds; doubles with every retry.
+}
+
+# Token buckets per client, resource and reads / writes, see
+# rest_api/ratelimit.py. Off here; settings_api.py turns them on.
+
+REST_API_RATE_LIMITS = {
+    'BACKEND': None,  # Or 'memory', or 'django' to use CACHES[ALIAS].
+    'MAX_SIZE': 100000,
+    'ALIAS': 'default',
+    'CLIENT_KEY': 'REMOTE_ADDR',  # Or e.g. 'HTTP_X_FORWARDED_FOR'.
+    'TRUSTED_PROXIES': 1,  # Appending to CLIENT_KEY, see ratelimit.py.
+    'READ': {'RATE': 50.0, 'BURST': 100},  # Tokens a second, at most.
+    'WRITE': {'RATE': 10.0, 'BURST': 20},
+    'ENDPOINTS': {},  # E.g. {'ImageLinkResource': {'WRITE': {...}}}.
+}
+
+# JSON of the API, see rest_api/serializers.py.
+
+REST_API_JSON = {
+    'COMPACT': True,  # Without spaces after ',' and ':'.
+    'FAST_ENCODER': True,  # orjson, if installed.
+}
+
+# Compression of API responses, see rest_api/compression.py.
+
+REST_API_COMPRESSION = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,  # Bytes; streamed lists are always compressed.
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,  # If the brotli package is installed.
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'rest_api.profiling': {'handlers': ['console'], 'level': 'INFO'},
+    },
 }
 
 
@@ -119,3 +234,13 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/1.10/howto/static-files/
 
 STATIC_URL = '/static/'
+
+# Image.path is relative to IMAGES_ROOT. Resized copies are made by
+# IMAGE_WORKERS threads and kept in IMAGE_DERIVATIVES_ROOT, see
+# rest_api/images.py.
+IMAGES_ROOT = os.environ.get(
+    'LETTERPUSH_IMAGES_ROOT', os.path.join(BASE_DIR, 'static', 'images'))
+IMAGE_DERIVATIVES_ROOT = os.environ.get(
+    'LETTERPUSH_IMAGE_DERIVATIVES_ROOT',
+    os.path.join(BASE_DIR, 'static', 'derivatives'))
+IMAGE_WORKERS = int(os.environ.get('LETTERPUSH_IMAGE_WORKERS', 4))
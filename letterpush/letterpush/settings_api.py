@@ -0,0 +1,33 @@
+"""
+Settings of a worker that serves only the JSON API, for a faster start.
+
+    DJANGO_SETTINGS_MODULE=letterpush.settings_api gunicorn letterpush.wsgi
+
+The same as settings.py, without the admin, sessions, messages, static
+files and templates, or the middleware that serve them; the API uses
+none (its views are exempt from CSRF). Use settings.py wherever those
+are needed, e.g. for the admin or manage.py migrate. Compare the two
+with `python ./manage.py startup`. Rate limits are on, per process; see
+rest_api/ratelimit.py to share them.
+"""
+
+from letterpush.settings import *  # noqa
+
+INSTALLED_APPS = [
+    'rest_api',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+MIDDLEWARE_CLASSES = MIDDLEWARE  # What Django before 1.10 reads.
+
+ROOT_URLCONF = 'letterpush.urls_api'
+
+TEMPLATES = []
+
+# Error messages stay in English; saves loading the translations.
+USE_I18N = False
+
+REST_API_RATE_LIMITS = dict(REST_API_RATE_LIMITS, BACKEND='memory')  # noqa
@@ -13,15 +13,12 @@ Including another URLconf
     1. Import the include() function: from django.conf.urls import url, include
     2. Add a URL to urlpatterns:  url(r'^blog/', include('blog.urls'))
 """
-from django.conf.urls import patterns, url, include
+from django.conf.urls import url
 from django.contrib import admin
 
-from rest_api import resources
+from letterpush import urls_api
 
 
 urlpatterns = [
     url(r'^admin/', admin.site.urls),  # Retained to easily inspect the DB.
-    url(r'^api/articles/', include(resources.ArticleResource.urls())),
-    url(r'^api/images/', include(resources.ImageResource.urls())),
-    url(r'^api/image_links/', include(resources.ImageLinkResource.urls())),
-]
+] + urls_api.urlpatterns
@@ -0,0 +1,16 @@
+"""URLs of the JSON API, for settings_api.py; urls.py adds the admin."""
+
+from django.conf.urls import url, include
+
+from rest_api import resources
+from rest_api import views
+
+
+urlpatterns = [
+    url(r'^api/articles/(?P<pk>\d+)/bundle/$', views.article_bundle),
+    url(r'^api/articles/', include(resources.ArticleResource.urls())),
+    url(r'^api/images/(?P<pk>\d+)/content/$', views.image_content),
+    url(r'^api/images/', include(resources.ImageResource.urls())),
+    url(r'^api/image_links/', include(resources.ImageLinkResource.urls())),
+    url(r'^api/_stats/cache/$', views.cache_stats),
+]
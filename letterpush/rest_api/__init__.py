@@ -0,0 +1 @@
+default_app_config = 'rest_api.apps.RestConfig'
@@ -0,0 +1,18 @@
+"""The coroutines of asgi_tests.py; needs Python 3.5+."""
+
+
+def call(application, loop, scope, received):
+    """
+    Run application on scope in loop, with received as the messages it
+    receives, in order; return the messages it sent.
+    """
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    loop.run_until_complete(application(scope, receive, send))
+    return sent
@@ -4,4 +4,8 @@ from django.apps import AppConfig
 
 
 class RestConfig(AppConfig):
-    name = 'rest'
+    name = 'rest_api'
+
+    def ready(self):
+        # Connect signal receivers.
+        from . import bundles, cache, db, outbox, search  # noqa
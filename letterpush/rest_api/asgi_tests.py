@@ -0,0 +1,71 @@
+"""Tests of the ASGI entry point, see letterpush/asgi.py."""
+
+import json
+import sys
+import unittest
+
+from django.core.wsgi import get_wsgi_application
+from django.test import TransactionTestCase
+
+from . import resources
+
+if sys.version_info >= (3, 5):  # Else async def is a syntax error.
+    import asyncio
+    from letterpush import asgi
+    from ._asgi_calls import call
+
+
+@unittest.skipIf(sys.version_info < (3, 5), "Needs Python 3.5+")
+class AsgiTest(TransactionTestCase):
+    """
+    Requests run on the pool threads, each with its own connection, so
+    the data has to be committed for them to see it.
+    """
+
+    def setUp(self):
+        self.application = asgi.WsgiToAsgi(get_wsgi_application(), threads=2)
+        self.addCleanup(self.application.shutdown)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def request(self, method, path, data=None, query=b''):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        received = [{'type': 'http.request', 'body': body[:5],
+                     'more_body': True},
+                    {'type': 'http.request', 'body': body[5:]}]
+        scope = {'type': 'http', 'method': method, 'path': path,
+                 'query_string': query,
+                 'headers': [(b'content-type', b'application/json'),
+                             (b'host', b'testserver')]}
+        sent = call(self.application, self.loop, scope, received)
+        start = sent.pop(0)
+        self.assertEquals('http.response.start', start['type'])
+        self.assertFalse(sent[-1].get('more_body', False))
+        content = b''.join(message['body'] for message in sent)
+        return start['status'], json.loads(content.decode('utf-8'))
+
+    def test_creates_and_gets(self):
+        status, created = self.request('POST', '/api/articles/',
+                                       {"title": "Async", "body": "Body"})
+        self.assertEquals(201, status, created)
+        status, content = self.request(
+            'GET', '/api/articles/%d/' % created["id"])
+        self.assertEquals(200, status, content)
+        self.assertEquals("Async", content["title"])
+
+    def test_streams_in_chunks(self):
+        resources.ArticleResource.MODEL.objects.bulk_create(
+            resources.ArticleResource.MODEL(title=str(index), body='')
+            for index in range(5))
+        status, content = self.request('GET', '/api/articles/',
+                                       query=b'stream=1')
+        self.assertEquals(200, status, content)
+        self.assertEquals(5, len(content["objects"]))
+
+    def test_lifespan(self):
+        sent = call(self.application, self.loop, {'type': 'lifespan'},
+                    [{'type': 'lifespan.startup'},
+                     {'type': 'lifespan.shutdown'}])
+        self.assertEquals(['lifespan.startup.complete',
+                           'lifespan.shutdown.complete'],
+                          [message['type'] for message in sent])
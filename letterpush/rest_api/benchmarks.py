@@ -0,0 +1,260 @@
+"""
+Benchmarks of the REST resources, see `manage.py bench`.
+
+Requests go straight to the resource views through RequestFactory, like
+resources_tests do, so that the numbers show our code and the database,
+not the middleware.
+"""
+
+import json
+import os
+import random
+import time
+import timeit
+
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2.
+    tracemalloc = None
+
+from . import cache
+from . import images
+from . import ratelimit
+from . import resources
+from .models import Article, Image, ImageLink
+
+# CPU seconds of this process, which leave out the waits for the database
+# server; it runs in this process with SQLite, though. time.clock is gone
+# in Python 3.8, so it must not be looked up where process_time is there.
+process_time = getattr(time, 'process_time', None) or time.clock
+
+OPERATIONS = ('list', 'detail', 'create', 'update', 'delete')
+
+
+def percentile(ordered, share):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class Benchmark(object):
+    """
+    Seeds `volume` objects of every kind, then times the operations. The
+    requests send accept_encoding as Accept-Encoding, if not None.
+    """
+
+    def __init__(self, volume, repeat=20, seed=0, accept_encoding=None):
+        self.volume = volume
+        self.repeat = repeat
+        self.accept_encoding = accept_encoding
+        self.random = random.Random(seed)
+        self.request_factory = RequestFactory()
+        self.counter = 0
+
+    def unique(self, prefix):
+        self.counter += 1
+        return '%s-%d' % (prefix, self.counter)
+
+    def populate(self):
+        """Add volume articles and images, each pair linked once."""
+        Article.objects.bulk_create(
+            Article(title='Title %d' % index, body='Body %d. ' % index * 20)
+            for index in range(self.volume))
+        Image.objects.bulk_create(
+            Image(note='Note %d' % index, path='seed/%d.jpg' % index)
+            for index in range(self.volume))
+        article_ids = list(Article.objects.values_list('id', flat=True))
+        image_ids = list(Image.objects.values_list('id', flat=True))
+        ImageLink.objects.bulk_create(
+            ImageLink(article_id=article_id, image_id=image_id, role='L')
+            for article_id, image_id in zip(article_ids, image_ids))
+        self.ids = {
+            resources.ArticleResource: article_ids,
+            resources.ImageResource: image_ids,
+            resources.ImageLinkResource: list(
+                ImageLink.objects.values_list('id', flat=True)),
+        }
+
+    def make_data(self, resource):
+        if resource is resources.ArticleResource:
+            return {"title": self.unique('Title'), "body": 'Body ' * 100}
+        if resource is resources.ImageResource:
+            return {"note": self.unique('Note'),
+                    "path": self.write_image(self.unique('bench') + '.png')}
+        # Pair up articles and images in ways no earlier call has.
+        self.counter += 1
+        articles = self.ids[resources.ArticleResource]
+        images = self.ids[resources.ImageResource]
+        shift = self.counter // len(articles) + 1
+        return {"article_id": articles[self.counter % len(articles)],
+                "image_id": images[(self.counter + shift) % len(images)],
+                "role": 'G'}  # Seeded links are all 'L'.
+
+    def write_image(self, path):
+        """Put a small image at path in IMAGES_ROOT, for Image to accept."""
+        full_path = images.full_path(path)
+        if not os.path.isdir(os.path.dirname(full_path)):
+            os.makedirs(os.path.dirname(full_path))
+        with open(full_path, 'wb') as stream:
+            stream.write(images.blank_png(64, 48))
+        return path
+
+    def request(self, resource, method, view_type, pk=None, data=None):
+        path = '/bench/' if pk is None else '/bench/%d/' % pk
+        body = json.dumps(data) if data is not None else ''
+        headers = {}
+        if self.accept_encoding is not None:
+            headers['HTTP_ACCEPT_ENCODING'] = self.accept_encoding
+        request = self.request_factory.generic(
+            method, path, body, content_type='application/json', **headers)
+        kwargs = {} if pk is None else {'pk': pk}
+        response = resource.as_view(view_type)(request, **kwargs)
+        content = response.getvalue()  # Consume a streaming one too.
+        if response.status_code >= 400:
+            raise AssertionError("%s %s: %s %s" % (
+                method, path, response.status_code, content[:200]))
+        return content
+
+    def calls(self, resource, operation):
+        """Return `repeat` argument tuples for request() to run operation."""
+        ids = self.ids[resource]
+        if operation == 'list':
+            return [(resource, 'GET', 'list')] * self.repeat
+        if operation == 'detail':
+            return [(resource, 'GET', 'detail', self.random.choice(ids))
+                    for _ in range(self.repeat)]
+        if operation == 'create':
+            return [(resource, 'POST', 'list', None, self.make_data(resource))
+                    for _ in range(self.repeat)]
+        if operation == 'update':
+            return [(resource, 'PUT', 'detail', self.random.choice(ids),
+                     self.make_data(resource))
+                    for _ in range(self.repeat)]
+        # Delete what create has added, to keep the volume.
+        created = resource.MODEL.objects.exclude(
+            id__in=ids).values_list('id', flat=True)[:self.repeat]
+        return [(resource, 'DELETE', 'detail', pk) for pk in created]
+
+    def measure(self, calls, call=None):
+        """Run call (request() by default) with every argument tuple."""
+        call = call or self.request
+        timings, cpu_times, sizes, queries = [], [], [], []
+        if tracemalloc is not None:
+            tracemalloc.start()
+        try:
+            for args in calls:
+                # The log is capped; once full, it would count nothing.
+                connection.queries_log.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = timeit.default_timer()
+                    cpu_started = process_time()
+                    sizes.append(len(call(*args)))
+                    cpu_times.append(process_time() - cpu_started)
+                    timings.append(timeit.default_timer() - started)
+                queries.append(len(captured))
+            peak = (tracemalloc.get_traced_memory()[1]
+                    if tracemalloc is not None else None)
+        finally:
+            if tracemalloc is not None:
+                tracemalloc.stop()
+        timings.sort()
+        cpu_times.sort()
+        sizes.sort()
+        return {
+            "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+            "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+            "cpu_ms": round(percentile(cpu_times, 0.5) * 1000, 3),
+            "bytes": percentile(sizes, 0.5),  # Of the body on the wire.
+            "queries": max(queries),
+            "peak_kb": peak and round(peak / 1024.0, 1),
+        }
+
+    def admit(self, request):
+        """Check a request against the rate limits, which let it in."""
+        if ratelimit.admit(request, 'ArticleResource') is not None:
+            raise AssertionError("Rate limited")
+        return b''
+
+    def reject(self, request):
+        """Make a request that gets turned away by the rate limits."""
+        response = resources.ArticleResource.as_view('list')(request)
+        if response.status_code != 429:
+            raise AssertionError("Got %s" % response.status_code)
+        return response.getvalue()
+
+    def measure_rate_limits(self):
+        """Return the metrics of admitting and of rejecting a request."""
+        calls = [(self.request_factory.get('/bench/'),)] * self.repeat
+        results = {}
+        for operation, call, budget in (
+                ('admit', self.admit, {'RATE': 1e9, 'BURST': 1e9}),
+                ('reject', self.reject, {'RATE': 0.001, 'BURST': 0})):
+            config = {'BACKEND': 'memory', 'READ': budget}
+            with override_settings(REST_API_RATE_LIMITS=config):
+                ratelimit.reset_backend()
+                try:
+                    results[operation] = self.measure(calls, call)
+                finally:
+                    ratelimit.reset_backend()
+        return results
+
+    def run(self):
+        """
+        Return {resource name: {operation: metrics}}, and the rate limits
+        as "RateLimiter": {"admit": ..., "reject": ...}.
+        """
+        self.populate()
+        backend = cache.get_backend()
+        results = {}
+        for resource in (resources.ArticleResource, resources.ImageResource,
+                         resources.ImageLinkResource):
+            if backend is not None:
+                backend.clear()  # Every resource starts cold.
+            results[resource.__name__] = dict(
+                (operation, self.measure(self.calls(resource, operation)))
+                for operation in OPERATIONS)
+        results["RateLimiter"] = self.measure_rate_limits()
+        return results
+
+
+# Metrics that must not grow, and how much noise to forgive them by default.
+THRESHOLDS = {
+    "p50_ms": 0.25,
+    "p95_ms": 0.5,
+    "cpu_ms": 0.25,
+    "bytes": 0.05,
+    "queries": 0,
+    "peak_kb": 0.25,
+}
+
+
+def find_regressions(results, baseline, tolerance=None):
+    """
+    Compare results to baseline of the same shape; return a list of
+    human-readable regressions. A metric regresses when it grows by more
+    than its share in THRESHOLDS (or tolerance, for timings and memory).
+    """
+    regressions = []
+    for volume, by_resource in sorted(baseline.items()):
+        for resource, by_operation in sorted(by_resource.items()):
+            for operation, expected in sorted(by_operation.items()):
+                actual = results.get(volume, {}).get(resource, {}).get(
+                    operation)
+                if actual is None:
+                    continue  # Not measured this time.
+                for metric, allowed in sorted(THRESHOLDS.items()):
+                    if (metric not in ("queries", "bytes") and
+                            tolerance is not None):
+                        allowed = tolerance
+                    before, now = expected.get(metric), actual.get(metric)
+                    if before is None or now is None:
+                        continue
+                    if now > before * (1 + allowed):
+                        regressions.append(
+                            "%s %s %s %s: %s -> %s" % (
+                                volume, resource, operation, metric,
+                                before, now))
+    return regressions
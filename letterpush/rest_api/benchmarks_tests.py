@@ -0,0 +1,45 @@
+"""Tests of the benchmark harness itself."""
+
+from django.test import TestCase
+
+from . import benchmarks
+from . import resources
+from . import resources_tests
+
+
+class BenchmarkTest(resources_tests.ImageFilesMixin, TestCase):
+
+    def test_measures_every_operation(self):
+        results = benchmarks.Benchmark(volume=5, repeat=2).run()
+        rate_limits = results.pop('RateLimiter')
+        self.assertEquals(
+            set(['ArticleResource', 'ImageResource', 'ImageLinkResource']),
+            set(results))
+        for by_operation in results.values():
+            self.assertEquals(set(benchmarks.OPERATIONS), set(by_operation))
+            self.assertGreater(by_operation['list']['queries'], 0)
+        self.assertEquals(0, rate_limits['reject']['queries'])
+        self.assertEquals(0, rate_limits['admit']['queries'])
+
+    def test_measures_bytes_on_the_wire(self):
+        benchmark = benchmarks.Benchmark(volume=20, repeat=1)
+        benchmark.populate()
+        calls = benchmark.calls(resources.ArticleResource, 'list')
+        plain = benchmark.measure(calls)
+        benchmark.accept_encoding = 'gzip'
+        gzipped = benchmark.measure(calls)
+        self.assertIn('cpu_ms', plain)
+        self.assertLess(gzipped['bytes'], plain['bytes'])
+
+    def test_finds_regressions(self):
+        baseline = {"10": {"ArticleResource": {"list": {
+            "p50_ms": 10.0, "p95_ms": 20.0, "queries": 3}}}}
+        results = {"10": {"ArticleResource": {"list": {
+            "p50_ms": 11.0, "p95_ms": 20.0, "queries": 4}}}}
+        self.assertEquals(
+            ["10 ArticleResource list queries: 3 -> 4"],
+            benchmarks.find_regressions(results, baseline))
+        self.assertEquals(
+            ["10 ArticleResource list p50_ms: 10.0 -> 11.0",
+             "10 ArticleResource list queries: 3 -> 4"],
+            benchmarks.find_regressions(results, baseline, tolerance=0.05))
@@ -0,0 +1,114 @@
+"""
+Render bundles: an article with every image linked to it, grouped by the
+role of the link, kept as the JSON text the API serves.
+
+A bundle is rebuilt whenever its article, one of its links or a linked
+image is saved, by the signal receivers below, in the same transaction;
+once at the end for all the links of a bulk operation, see
+models.batch_link_changes().
+So reading one is a single primary key lookup, with nothing to prepare
+or serialize.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import preparers
+from . import resources
+from .models import Article, ArticleBundle, Image, ImageLink, links_changed
+
+ROLE_NAMES = dict(ImageLink.ROLE_CHOICES)
+
+
+def build(article_ids):
+    """Return {article id: bundle dict} of the articles that exist."""
+    article_preparer = resources.ArticleResource.preparer
+    image_preparer = resources.ImageResource.preparer
+    bundles = {}
+    for row in preparers.read_rows(
+            Article.objects.filter(id__in=article_ids),
+            article_preparer.columns):
+        bundles[row.id] = {
+            "article": article_preparer.prepare(row),
+            "images": dict((name, []) for name in ROLE_NAMES.values()),
+        }
+    # The links with their images, in one join.
+    image_columns = list(image_preparer.columns)
+    links = ImageLink.objects.filter(
+        article_id__in=list(bundles)).order_by('id').values_list(
+        'id', 'article_id', 'role',
+        *['image__' + column for column in image_columns])
+    for values in links:
+        image = image_preparer.prepare(
+            preparers.Row(zip(image_columns, values[3:])))
+        # Moved by the links of the image to any article; this bundle would
+        # keep a stale one, see models.touch_linked().
+        del image["updated"]
+        image["link_id"] = values[0]
+        bundles[values[1]]["images"][ROLE_NAMES[values[2]]].append(image)
+    return bundles
+
+
+def rebuild(article_ids):
+    """Store fresh bundles of the articles; a few queries for any number."""
+    article_ids = set(article_ids) - set([None])
+    if not article_ids:
+        return
+    serialize = resources.ArticleResource.serializer.serialize
+    contents = dict((pk, serialize(bundle))
+                    for pk, bundle in build(article_ids).items())
+    now = timezone.now()
+    existing = set(ArticleBundle.objects.filter(
+        article_id__in=list(contents)).values_list('article_id', flat=True))
+    for pk in existing:
+        ArticleBundle.objects.filter(article_id=pk).update(
+            content=contents[pk], updated=now)
+    missing = [ArticleBundle(article_id=pk, content=content, updated=now)
+               for pk, content in contents.items() if pk not in existing]
+    if not missing:
+        return
+    try:
+        with transaction.atomic():
+            ArticleBundle.objects.bulk_create(missing)
+    except IntegrityError:  # A concurrent rebuild has made some.
+        for bundle in missing:
+            ArticleBundle.objects.update_or_create(
+                article_id=bundle.article_id,
+                defaults={'content': bundle.content, 'updated': now})
+
+
+def get(article_id):
+    """Return (content, updated) of the bundle of an article, or None."""
+    found = ArticleBundle.objects.filter(article_id=article_id).values_list(
+        'content', 'updated').first()
+    if found is None:  # Made before bundles were, or no such article.
+        rebuild([article_id])
+        found = ArticleBundle.objects.filter(
+            article_id=article_id).values_list('content', 'updated').first()
+    return found
+
+
+@receiver(post_save, sender=Article)
+def rebuild_saved_article(sender, instance, **kwargs):
+    rebuild([instance.pk])
+
+
+@receiver(post_delete, sender=Article)
+def delete_article_bundle(sender, instance, **kwargs):
+    # Also one rebuilt when the links went, which goes first on cascade.
+    ArticleBundle.objects.filter(article_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Image)
+def rebuild_linked_articles(sender, instance, **kwargs):
+    # A linked image cannot be deleted (PROTECT), so saves are enough.
+    rebuild(ImageLink.objects.filter(image_id=instance.pk).values_list(
+        'article_id', flat=True).distinct())
+
+
+@receiver(links_changed)
+def rebuild_link_articles(sender, article_ids, **kwargs):
+    # After models.touch_linked(), so the bundles show the new `updated`.
+    rebuild(article_ids)
@@ -0,0 +1,131 @@
+"""Tests of the article render bundles, see bundles.py."""
+
+import json
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from . import resources_tests
+from .models import Article, ArticleBundle, Image, ImageLink
+
+
+class BundleTest(TestCase):
+
+    def setUp(self):
+        self.article = Article.objects.create(title="Cats", body="Meow")
+        self.lead = Image.objects.create(path='lead.png', note="Lead")
+        self.link = ImageLink.objects.create(
+            article=self.article, image=self.lead, role=ImageLink.ROLES.lead)
+
+    def get(self, article_id=None, **headers):
+        response = self.client.get('/api/articles/%d/bundle/' % (
+            article_id or self.article.id), **headers)
+        if response.status_code != 200:
+            return response, None
+        return response, json.loads(response.content.decode('utf-8'))
+
+    def test_embeds_images_by_role(self):
+        response, content = self.get()
+        self.assertEquals(200, response.status_code)
+        self.assertEquals("Cats", content["article"]["title"])
+        self.assertEquals({"gallery": [], "social": []},
+                          {role: images for role, images
+                           in content["images"].items() if role != "lead"})
+        lead, = content["images"]["lead"]
+        self.assertEquals(("lead.png", "Lead", self.link.id),
+                          (lead["path"], lead["note"], lead["link_id"]))
+        self.assertEquals(
+            set(resources_tests.ImageTest.EXPECTED_FIELDS) -
+            set(['related_resources', 'updated']) | set(['link_id']),
+            set(lead))
+
+    def test_shared_image_is_as_its_resource(self):
+        other = Article.objects.create(title="Other", body="")
+        ImageLink.objects.create(article=other, image=self.lead,
+                                 role=ImageLink.ROLES.gallery)
+        _, content = self.get()
+        lead, = content["images"]["lead"]
+        image = json.loads(self.client.get(
+            '/api/images/%d/' % self.lead.id).content.decode('utf-8'))
+        self.assertEquals(
+            dict((name, image[name]) for name in lead if name != 'link_id'),
+            dict((name, lead[name]) for name in lead if name != 'link_id'))
+
+    def test_is_one_query(self):
+        self.get()
+        with self.assertNumQueries(1):
+            response, _ = self.get()
+        self.assertEquals(200, response.status_code)
+
+    def test_follows_changes(self):
+        self.article.title = "Dogs"
+        self.article.save()
+        self.lead.note = "New"
+        self.lead.save()
+        gallery = Image.objects.create(path='gallery.png', note="")
+        ImageLink.objects.create(article=self.article, image=gallery,
+                                 role=ImageLink.ROLES.gallery)
+        link = ImageLink.objects.get(id=self.link.id)  # Has loaded values.
+        link.role = ImageLink.ROLES.social
+        link.save()
+        _, content = self.get()
+        self.assertEquals("Dogs", content["article"]["title"])
+        self.assertEquals([], content["images"]["lead"])
+        self.assertEquals(["New"], [image["note"] for image
+                                    in content["images"]["social"]])
+        self.assertEquals(["gallery.png"], [image["path"] for image
+                                            in content["images"]["gallery"]])
+
+    def test_follows_moved_and_deleted_links(self):
+        other = Article.objects.create(title="Other", body="")
+        link = ImageLink.objects.get(id=self.link.id)
+        link.article = other
+        link.save()
+        _, content = self.get()
+        self.assertEquals([], content["images"]["lead"])
+        _, content = self.get(other.id)
+        self.assertEquals(1, len(content["images"]["lead"]))
+        link.delete()
+        _, content = self.get(other.id)
+        self.assertEquals([], content["images"]["lead"])
+
+    def test_rebuilt_once_per_bulk_operation(self):
+        gallery = [Image.objects.create(path='%d.png' % index, note="")
+                   for index in range(20)]
+        items = [{"article_id": self.article.id, "image_id": image.id,
+                  "role": ImageLink.ROLES.gallery} for image in gallery]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                '/api/image_links/bulk/', json.dumps(items),
+                content_type='application/json')
+        self.assertEquals(201, response.status_code)
+        self.assertEquals(2, len([  # The existing ones, then the update.
+            query for query in queries.captured_queries
+            if 'rest_api_articlebundle' in query['sql']]))
+        self.assertEquals(2, len([  # Of the article and the images.
+            query for query in queries.captured_queries
+            if query['sql'].startswith('UPDATE "rest_api_image"') or
+            query['sql'].startswith('UPDATE "rest_api_article"')]))
+        _, content = self.get()
+        self.assertEquals(20, len(content["images"]["gallery"]))
+
+    def test_goes_with_article(self):
+        self.article.delete()
+        self.assertFalse(ArticleBundle.objects.exists())
+        response, _ = self.get(self.article.id or self.link.article_id)
+        self.assertEquals(404, response.status_code)
+
+    def test_built_when_missing(self):
+        ArticleBundle.objects.all().delete()
+        response, content = self.get()
+        self.assertEquals(200, response.status_code)
+        self.assertEquals(1, len(content["images"]["lead"]))
+
+    def test_not_modified(self):
+        response, _ = self.get()
+        response, _ = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(304, response.status_code)
+        response, _ = self.get(
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEquals(304, response.status_code)
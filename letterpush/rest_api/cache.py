@@ -0,0 +1,198 @@
+"""
+Read-through cache of prepared object representations.
+
+An entry is stored under (model, pk) together with the `updated` value of
+the object it was prepared from, and only counts as a hit for an object
+with the same `updated`. So any save of the object itself makes its entry
+stale. Changes that do not touch `updated` of an object but show up in its
+representation (its image links) delete the entry via signals below.
+
+Configured by settings.REST_API_CACHE:
+
+    'BACKEND': 'lru' for an in-process LRU dict, 'django' for a cache from
+        settings.CACHES (locmem, file-based, etc), or None to disable.
+    'MAX_SIZE': number of entries the 'lru' backend keeps.
+    'ALIAS': name of the cache in settings.CACHES for the 'django' backend.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Article, Image, ImageLink
+
+
+class LRUBackend(object):
+    """Keeps up to max_size entries in process memory."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries[key] = value  # Now the most recently used.
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {"backend": "lru", "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._entries),
+                "max_size": self.max_size}
+
+
+class DjangoCacheBackend(object):
+    """Keeps entries in a Django cache, shared if the cache is shared."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.cache = caches[alias]
+        # NOTE: per process only; Django caches do not count evictions.
+        self.hits = self.misses = 0
+
+    def _key(self, key):
+        return 'rest_api:%s:%s' % key
+
+    def get(self, key):
+        value = self.cache.get(self._key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, None)  # Never expire.
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        return {"backend": "django", "alias": self.alias, "hits": self.hits,
+                "misses": self.misses, "evictions": None}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the configured backend, or None if caching is off."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                config = getattr(settings, 'REST_API_CACHE', {})
+                name = config.get('BACKEND')
+                if name == 'lru':
+                    _backend = LRUBackend(config.get('MAX_SIZE', 10000))
+                elif name == 'django':
+                    _backend = DjangoCacheBackend(
+                        config.get('ALIAS', 'default'))
+                elif name is None:
+                    _backend = False  # Checked once, stays off.
+                else:
+                    raise ValueError("Unknown REST_API_CACHE backend %r" %
+                                     name)
+    return _backend or None
+
+
+def reset_backend():
+    """Make the next get_backend() re-read the settings."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def _key(model, pk):
+    return (model._meta.label_lower, pk)
+
+
+def get(model, pk, updated):
+    """Return the cached representation, if it was made at updated."""
+    backend = get_backend()
+    if backend is None:
+        return None
+    entry = backend.get(_key(model, pk))
+    if entry is None or entry[0] != updated:
+        return None
+    return entry[1]
+
+
+def put(model, pk, updated, representation):
+    backend = get_backend()
+    if backend is not None:
+        backend.set(_key(model, pk), (updated, representation))
+
+
+def invalidate(model, pk):
+    """
+    Delete the entry right away, and once more after the current
+    transaction commits, in case a concurrent reader has put back
+    a representation made before the commit.
+    """
+    backend = get_backend()
+    if backend is None:
+        return
+    key = _key(model, pk)
+    backend.delete(key)
+    transaction.on_commit(lambda: backend.delete(key))
+
+
+def stats():
+    backend = get_backend()
+    return backend.stats() if backend is not None else None
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def invalidate_saved(sender, instance, **kwargs):
+    invalidate(sender, instance.pk)
+
+
+@receiver(post_save, sender=ImageLink)
+@receiver(post_delete, sender=ImageLink)
+def invalidate_linked(sender, instance, **kwargs):
+    """A link is embedded into both its article and its image."""
+    article_ids = set([instance.article_id])
+    image_ids = set([instance.image_id])
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded:  # The link may have been moved from another article / image.
+        article_ids.add(loaded.get('article_id'))
+        image_ids.add(loaded.get('image_id'))
+    for pk in article_ids - set([None]):
+        invalidate(Article, pk)
+    for pk in image_ids - set([None]):
+        invalidate(Image, pk)
@@ -0,0 +1,135 @@
+"""Tests of the representation cache."""
+
+import json
+
+from django.db.models.signals import post_save
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from . import cache
+from . import resources
+from . import resources_tests
+from .models import ImageLink
+
+
+class LRUBackendTest(TestCase):
+
+    def test_evicts_least_recently_used(self):
+        backend = cache.LRUBackend(max_size=2)
+        backend.set('a', 1)
+        backend.set('b', 2)
+        self.assertEquals(1, backend.get('a'))
+        backend.set('c', 3)  # Evicts 'b', since 'a' was just used.
+        self.assertIsNone(backend.get('b'))
+        self.assertEquals(3, backend.get('c'))
+        stats = backend.stats()
+        self.assertEquals((2, 1, 1, 2), (stats["hits"], stats["misses"],
+                                         stats["evictions"], stats["size"]))
+
+
+class CachedResourceMixin(resources_tests.RestRequestMixin):
+
+    CACHE_SETTINGS = {'BACKEND': 'lru', 'MAX_SIZE': 100}
+
+    def setUp(self):
+        overridden = override_settings(REST_API_CACHE=self.CACHE_SETTINGS)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        cache.reset_backend()
+        self.addCleanup(cache.reset_backend)
+
+    def make_link(self):
+        link = resources.ImageLinkResource.MODEL(
+            **resources_tests.ImageLinkTest.make_data())
+        link.save()
+        return link
+
+    def test_detail_is_served_from_cache(self):
+        link = self.make_link()
+        _, first = self.request_detail('GET', link.article_id)
+        with self.assertNumQueries(2):  # Version and article, no links.
+            _, second = self.request_detail('GET', link.article_id)
+        self.assertEquals(first, second)
+        self.assertEquals(1, cache.stats()["hits"])
+
+    def test_list_loads_links_for_misses_only(self):
+        self.make_link()
+        self.request_list('GET')  # Caches the first article.
+        self.make_link()
+        # Versions of articles and links, articles, links of the second.
+        with self.assertNumQueries(6):
+            _, content = self.request_list('GET')
+        self.assertEquals([1, 1], [
+            len(each["related_resources"]["image_links"])
+            for each in content["objects"]])
+
+    def test_update_is_not_served_stale(self):
+        link = self.make_link()
+        self.request_detail('GET', link.article_id)
+        self.request_detail('PUT', link.article_id, {"title": "New"})
+        _, content = self.request_detail('GET', link.article_id)
+        self.assertEquals("New", content["title"])
+
+    def test_link_changes_invalidate_article(self):
+        link = self.make_link()
+        self.request_detail('GET', link.article_id)
+        moved_to = self.make_link().article_id
+        self.request_detail('GET', moved_to)
+        link = resources.ImageLinkResource.MODEL.objects.get(id=link.id)
+        self.request_detail('GET', link.article_id)
+        link.article_id = moved_to
+        moved_from = link._loaded_values['article_id']
+        link.save()
+        _, old = self.request_detail('GET', moved_from)
+        _, new = self.request_detail('GET', moved_to)
+        self.assertEquals([], old["related_resources"]["image_links"])
+        self.assertEquals(2, len(new["related_resources"]["image_links"]))
+        link.delete()
+        _, new = self.request_detail('GET', moved_to)
+        self.assertEquals(1, len(new["related_resources"]["image_links"]))
+
+    def test_link_changes_of_other_processes_show(self):
+        link = self.make_link()
+        self.request_detail('GET', link.article_id)
+        # Another process saves a link; this one gets no signal of it.
+        post_save.disconnect(cache.invalidate_linked, sender=ImageLink)
+        self.addCleanup(post_save.connect, cache.invalidate_linked,
+                        sender=ImageLink)
+        data = resources_tests.ImageLinkTest.make_data()
+        data["article_id"] = link.article_id
+        ImageLink.objects.create(**data)
+        _, content = self.request_detail('GET', link.article_id)
+        self.assertEquals(2, len(content["related_resources"]["image_links"]))
+
+    def test_bulk_created_links_invalidate_article(self):
+        link = self.make_link()
+        self.request_detail('GET', link.article_id)
+        data = resources_tests.ImageLinkTest.make_data()
+        data["article_id"] = link.article_id
+        link_resource = resources.ImageLinkResource.as_view('bulk')
+        request = RequestFactory().post(
+            '/image_links/bulk/', json.dumps([data]),
+            content_type='application/json')
+        self.assertEquals(201, link_resource(request).status_code)
+        _, content = self.request_detail('GET', link.article_id)
+        self.assertEquals(2, len(content["related_resources"]["image_links"]))
+
+
+class LRUCachedResourceTest(CachedResourceMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'rest_api-tests',
+}})
+class DjangoCachedResourceTest(CachedResourceMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+    CACHE_SETTINGS = {'BACKEND': 'django', 'ALIAS': 'default'}
+
+    def setUp(self):
+        super(DjangoCachedResourceTest, self).setUp()
+        cache.get_backend().clear()
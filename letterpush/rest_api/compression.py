@@ -0,0 +1,104 @@
+"""
+Negotiated compression of API responses.
+
+A response of at least MIN_SIZE bytes, or any streaming response, is
+compressed if the request's Accept-Encoding allows it. Brotli is used
+if the brotli package is installed and the client takes it, else gzip.
+Streaming responses are compressed as they go, so their memory use
+stays bounded.
+
+Configured by settings.REST_API_COMPRESSION:
+
+    'ENABLED': False to send everything as is.
+    'MIN_SIZE': bytes below which compressing is not worth it.
+    'GZIP_LEVEL': 1 (fast) to 9 (small).
+    'BROTLI_QUALITY': 0 (fast) to 11 (small); the high ones are too
+        slow for responses made on the fly.
+"""
+
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'REST_API_COMPRESSION', {}))
+
+
+def negotiate(accept_encoding):
+    """Return 'br', 'gzip' or None, the best encoding both sides take."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    wildcard = accepted.get('*', 0.0)
+    choices = (('br', 'gzip') if brotli is not None else ('gzip',))
+    ranked = sorted(
+        ((accepted.get(name, wildcard), -index, name)
+         for index, name in enumerate(choices)), reverse=True)
+    quality, _, name = ranked[0]
+    return name if quality > 0 else None
+
+
+def make_compressor(encoding, config):
+    """Return (compress(bytes), flush()) functions of a stream."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=config['BROTLI_QUALITY'])
+        return compressor.process, compressor.finish
+    compressor = zlib.compressobj(config['GZIP_LEVEL'], zlib.DEFLATED,
+                                  16 + zlib.MAX_WBITS)  # A gzip header.
+    return compressor.compress, compressor.flush
+
+
+def compress_chunks(chunks, encoding, config):
+    compress, flush = make_compressor(encoding, config)
+    for chunk in chunks:
+        if not isinstance(chunk, bytes):
+            chunk = chunk.encode('utf-8')
+        compressed = compress(chunk)
+        if compressed:  # The compressor buffers small chunks.
+            yield compressed
+    yield flush()
+
+
+def compress_response(request, response):
+    """Compress the response in place, if the request takes it."""
+    config = get_config()
+    if not config['ENABLED'] or response.has_header('Content-Encoding'):
+        return response
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if not response.streaming and len(response.content) < config['MIN_SIZE']:
+        return response
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+    if response.streaming:
+        response.streaming_content = compress_chunks(
+            response.streaming_content, encoding, config)
+        del response['Content-Length']
+    else:
+        response.content = b''.join(
+            compress_chunks([response.content], encoding, config))
+        response['Content-Length'] = str(len(response.content))
+    response['Content-Encoding'] = encoding
+    return response
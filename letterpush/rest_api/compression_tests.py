@@ -0,0 +1,99 @@
+"""Tests of compression.py and serializers.py."""
+
+import gzip
+import io
+import json
+
+from django.test import SimpleTestCase, TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from . import compression
+from . import resources
+from . import serializers
+from .models import Article
+
+
+class NegotiateTest(SimpleTestCase):
+
+    def test_picks_gzip(self):
+        self.assertEquals('gzip', compression.negotiate('gzip, deflate'))
+        self.assertEquals('gzip', compression.negotiate('*'))
+
+    def test_honours_quality(self):
+        self.assertEquals(None, compression.negotiate('gzip;q=0'))
+        self.assertEquals(None, compression.negotiate('identity, *;q=0'))
+        self.assertEquals(None, compression.negotiate(''))
+
+    def test_picks_brotli_if_installed(self):
+        expected = 'br' if compression.brotli is not None else 'gzip'
+        self.assertEquals(expected, compression.negotiate('gzip, br'))
+        self.assertEquals('gzip', compression.negotiate('gzip, br;q=0.5'))
+
+
+class SerializerTest(SimpleTestCase):
+
+    def test_compact(self):
+        serializer = serializers.CompactJSONSerializer()
+        data = {"a": [1, 2]}
+        self.assertEquals('{"a":[1,2]}', serializer.serialize(data))
+        if serializers.orjson is None:
+            with override_settings(REST_API_JSON={'COMPACT': False}):
+                self.assertEquals('{"a": [1, 2]}', serializer.serialize(data))
+
+
+class CompressedResponseTest(TestCase):
+
+    def setUp(self):
+        Article.objects.bulk_create(
+            Article(title='Title %d' % index, body='Body ' * 50)
+            for index in range(20))
+
+    def request(self, view_type, accept_encoding, params=None, **kwargs):
+        path = '/articles/%s' % ('%d/' % kwargs['pk'] if kwargs else '')
+        request = RequestFactory().get(
+            path, params, HTTP_ACCEPT_ENCODING=accept_encoding)
+        return resources.ArticleResource.as_view(view_type)(request, **kwargs)
+
+    def decompress(self, response):
+        self.assertEquals('gzip', response['Content-Encoding'])
+        with gzip.GzipFile(fileobj=io.BytesIO(response.getvalue())) as f:
+            return json.loads(f.read().decode('utf-8'))
+
+    def test_gzips_list(self):
+        response = self.request('list', 'gzip')
+        self.assertEquals(20, len(self.decompress(response)["objects"]))
+
+    def test_gzips_streamed_list(self):
+        response = self.request('list', 'gzip', {"stream": "1"})
+        self.assertTrue(response.streaming)
+        self.assertEquals(20, len(self.decompress(response)["objects"]))
+        self.assertEquals('Accept-Encoding', response['Vary'])
+
+    def test_gzips_large_detail(self):
+        pk = Article.objects.first().pk
+        with override_settings(REST_API_COMPRESSION={'MIN_SIZE': 100}):
+            response = self.request('detail', 'gzip', pk=pk)
+        self.assertEquals(pk, self.decompress(response)["id"])
+        self.assertEquals(str(len(response.content)),
+                          response['Content-Length'])
+        self.assertTrue(response['ETag'].startswith('W/"'))
+
+    def test_leaves_small_detail(self):
+        response = self.request('detail', 'gzip',
+                                pk=Article.objects.first().pk)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response['ETag'].startswith('W/'))
+        self.assertEquals('Accept-Encoding', response['Vary'])
+
+    def test_leaves_unaccepted(self):
+        response = self.request('list', 'identity')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEquals(20, len(json.loads(
+            response.getvalue().decode('utf-8'))["objects"]))
+
+    @override_settings(REST_API_COMPRESSION={'ENABLED': False})
+    def test_disabled(self):
+        response = self.request('list', 'gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertFalse(response.has_header('Vary'))
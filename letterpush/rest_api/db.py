@@ -0,0 +1,19 @@
+"""Database connection setup."""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_sqlite_pragmas(connection, pragmas):
+    """Run PRAGMA name = value for every item of pragmas."""
+    with connection.cursor() as cursor:
+        for name, value in sorted(pragmas.items()):
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+
+
+@receiver(connection_created)
+def setup_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_sqlite_pragmas(connection,
+                             getattr(settings, 'SQLITE_PRAGMAS', {}))
@@ -0,0 +1,17 @@
+"""Tests of the database connection setup."""
+
+from django.db import connection
+from django.test import TestCase
+
+from . import db
+
+
+class SqlitePragmasTest(TestCase):
+
+    def test_applies_pragmas(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest("SQLite only")
+        db.apply_sqlite_pragmas(connection, {'cache_size': -1234})
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEquals(-1234, cursor.fetchone()[0])
@@ -0,0 +1,237 @@
+"""
+Access to image files under settings.IMAGES_ROOT.
+
+Image.path is relative to IMAGES_ROOT. The metadata of a file (format,
+dimensions, size and SHA-256) is read once, when an Image is saved with
+a new path, and kept in its columns; dimensions come from the headers,
+without decoding the pixels.
+
+Resized copies ("derivatives") are made on demand on a pool of
+settings.IMAGE_WORKERS threads and kept in IMAGE_DERIVATIVES_ROOT under
+the content hash, so that they survive renames, are shared by copies,
+and never go stale: a changed file has a different hash. Resizing needs
+Pillow; reading the metadata does not.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    from PIL import Image as PILImage
+except ImportError:
+    PILImage = None
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Pillow's format names to the content types we can read the headers of.
+CONTENT_TYPES = {
+    'PNG': 'image/png',
+    'GIF': 'image/gif',
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+EXTENSIONS = {
+    'image/png': 'png',
+    'image/gif': 'gif',
+    'image/jpeg': 'jpg',
+    'image/webp': 'webp',
+}
+
+# JPEG start-of-frame markers, which carry the dimensions: 0xC0-0xCF,
+# except DHT, JPG and DAC.
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - set((0xC4, 0xC8, 0xCC))
+# Markers with no length and payload after them.
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xDA)) | set((0x01,))
+
+
+class ImageError(Exception):
+    """A file is missing, out of reach or not an image we can read."""
+
+
+def full_path(path):
+    """Return the absolute path to an Image.path, which must stay inside."""
+    root = os.path.abspath(settings.IMAGES_ROOT)
+    result = os.path.abspath(os.path.join(root, path))
+    if not result.startswith(root + os.sep):
+        raise ImageError("Path %r is outside of the images" % path)
+    return result
+
+
+def read_exactly(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ImageError("Truncated image")
+    return data
+
+
+def read_jpeg_size(stream):
+    """Return (width, height) from the first frame header of a JPEG."""
+    while True:
+        byte = read_exactly(stream, 1)
+        if byte != b'\xff':
+            raise ImageError("Bad JPEG marker")
+        marker = ord(read_exactly(stream, 1))
+        while marker == 0xFF:  # Fill bytes.
+            marker = ord(read_exactly(stream, 1))
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker == 0xD9:  # End of image.
+            raise ImageError("JPEG without a frame")
+        length, = struct.unpack('>H', read_exactly(stream, 2))
+        if marker in JPEG_SOF_MARKERS:
+            _, height, width = struct.unpack('>BHH', read_exactly(stream, 5))
+            return width, height
+        stream.seek(length - 2, os.SEEK_CUR)
+
+
+def read_webp_size(stream):
+    chunk = read_exactly(stream, 4)
+    read_exactly(stream, 4)  # Chunk size.
+    if chunk == b'VP8 ':
+        data = read_exactly(stream, 10)
+        width, height = struct.unpack('<HH', data[6:10])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L':
+        bits, = struct.unpack('<I', read_exactly(stream, 5)[1:])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X':
+        data = read_exactly(stream, 10)
+        return (struct.unpack('<I', data[4:7] + b'\0')[0] + 1,
+                struct.unpack('<I', data[7:10] + b'\0')[0] + 1)
+    raise ImageError("Unknown WebP chunk")
+
+
+def read_header(stream):
+    """Return (content type, width, height) from the start of a file."""
+    start = stream.read(12)
+    if start.startswith(b'\x89PNG\r\n\x1a\n'):
+        data = read_exactly(stream, 12)  # The rest of the IHDR start.
+        if data[:4] != b'IHDR':
+            raise ImageError("PNG without a header")
+        width, height = struct.unpack('>II', data[4:12])
+        return CONTENT_TYPES['PNG'], width, height
+    if start[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', start[6:10])
+        return CONTENT_TYPES['GIF'], width, height
+    if start[:2] == b'\xff\xd8':
+        stream.seek(2)
+        width, height = read_jpeg_size(stream)
+        return CONTENT_TYPES['JPEG'], width, height
+    if start[:4] == b'RIFF' and start[8:12] == b'WEBP':
+        width, height = read_webp_size(stream)
+        return CONTENT_TYPES['WEBP'], width, height
+    raise ImageError("Not a PNG, GIF, JPEG or WebP image")
+
+
+def read_info(path):
+    """
+    Return the metadata of the file at an Image.path, as a dict of Image
+    field values. Reads the headers and hashes the file, in chunks.
+    """
+    try:
+        with open(full_path(path), 'rb') as stream:
+            # Before reading: a change while at it shows next time.
+            mtime = os.fstat(stream.fileno()).st_mtime
+            content_type, width, height = read_header(stream)
+            stream.seek(0)
+            sha256 = hashlib.sha256()
+            size = 0
+            for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+                size += len(chunk)
+    except (IOError, OSError) as e:
+        raise ImageError("Cannot read %s: %s" % (path, e.strerror or e))
+    return {"content_type": content_type, "width": width, "height": height,
+            "size": size, "sha256": sha256.hexdigest(), "mtime": mtime}
+
+
+def stat(path):
+    """Return os.stat() of the file at an Image.path, or raise ImageError."""
+    try:
+        return os.stat(full_path(path))
+    except (IOError, OSError) as e:
+        raise ImageError("Cannot read %s: %s" % (path, e.strerror or e))
+
+
+def blank_png(width, height):
+    """Return a blank grayscale PNG, e.g. a placeholder, without Pillow."""
+    def chunk(kind, data):
+        return (struct.pack('>I', len(data)) + kind + data +
+                struct.pack('>I', zlib.crc32(kind + data) & 0xFFFFFFFF))
+    rows = b''.join(b'\0' + b'\xff' * width for _ in range(height))
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0,
+                                       0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(rows)) +
+            chunk(b'IEND', b''))
+
+
+def derivative_path(sha256, content_type, width):
+    """Return where the copy of a content resized to width is kept."""
+    return os.path.join(
+        settings.IMAGE_DERIVATIVES_ROOT, sha256[:2],
+        '%s-%d.%s' % (sha256, width, EXTENSIONS[content_type]))
+
+
+def make_derivative(source, target, width):
+    """Resize the source file to width, save it as target; return target."""
+    if os.path.exists(target):
+        return target
+    if PILImage is None:
+        raise ImproperlyConfigured("Resizing images needs Pillow")
+    directory = os.path.dirname(target)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:  # Made by another thread meanwhile.
+            if not os.path.isdir(directory):
+                raise
+    image = PILImage.open(source)
+    height = max(1, int(round(image.size[1] * width / float(image.size[0]))))
+    resized = image.resize((width, height), PILImage.LANCZOS)
+    # Write aside and rename, so that readers never see a partial file.
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as stream:
+            resized.save(stream, format=image.format)
+        os.rename(temporary, target)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return target
+
+
+_executor = None
+_pending = {}  # Target path: its future, while being made.
+_lock = threading.Lock()
+
+
+def get_derivative(image, width):
+    """
+    Return a future of the path to a copy of an Image resized to width,
+    at most its own width. Copies being made are not made twice.
+    """
+    global _executor
+    from concurrent.futures import ThreadPoolExecutor  # Python 3.2+.
+    if not image.sha256:
+        raise ImageError("No metadata of %s" % image.path)
+    width = min(width, image.width)
+    target = derivative_path(image.sha256, image.content_type, width)
+    with _lock:
+        future = _pending.get(target)
+        if future is None:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.IMAGE_WORKERS)
+            future = _executor.submit(
+                make_derivative, full_path(image.path), target, width)
+            _pending[target] = future
+            future.add_done_callback(lambda _: _pending.pop(target, None))
+    return future
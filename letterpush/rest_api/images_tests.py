@@ -0,0 +1,92 @@
+"""Tests of reading image files, see images.py."""
+
+import io
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from . import images
+from .models import Image
+
+
+class ReadHeaderTest(SimpleTestCase):
+
+    def read(self, content):
+        return images.read_header(io.BytesIO(content))
+
+    def test_png(self):
+        self.assertEquals(('image/png', 640, 480),
+                          self.read(images.blank_png(640, 480)))
+
+    def test_gif(self):
+        content = b'GIF89a' + struct.pack('<HH', 320, 200) + b'\0' * 20
+        self.assertEquals(('image/gif', 320, 200), self.read(content))
+
+    def test_jpeg_skips_to_frame(self):
+        content = (b'\xff\xd8' +
+                   b'\xff\xe0' + struct.pack('>H', 12) + b'JFIF\0' * 2 +
+                   b'\xff\xff\xc2' + struct.pack('>HBHH', 17, 8, 600, 800) +
+                   b'\0' * 12)
+        self.assertEquals(('image/jpeg', 800, 600), self.read(content))
+
+    def test_webp(self):
+        content = (b'RIFF\0\0\0\0WEBPVP8X' + b'\0' * 8 +
+                   struct.pack('<I', 1023)[:3] + struct.pack('<I', 767)[:3])
+        self.assertEquals(('image/webp', 1024, 768), self.read(content))
+
+    def test_rejects_other_files(self):
+        for content in (b'', b'Hello, world!', b'\xff\xd8\xff\xd9'):
+            with self.assertRaises(images.ImageError):
+                self.read(content)
+
+
+class FilesTest(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        overridden = override_settings(
+            IMAGES_ROOT=os.path.join(self.root, 'images'),
+            IMAGE_DERIVATIVES_ROOT=os.path.join(self.root, 'derivatives'))
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+        os.mkdir(os.path.join(self.root, 'images'))
+        with open(images.full_path('a.png'), 'wb') as stream:
+            stream.write(images.blank_png(40, 20))
+
+    def test_keeps_paths_inside(self):
+        for path in ('../a.png', '/etc/passwd', 'x/../../a.png'):
+            with self.assertRaises(images.ImageError):
+                images.full_path(path)
+
+    def test_reads_info(self):
+        info = images.read_info('a.png')
+        self.assertEquals(
+            {'content_type': 'image/png', 'width': 40, 'height': 20,
+             'size': os.path.getsize(images.full_path('a.png'))},
+            {name: info[name] for name in ('content_type', 'width', 'height',
+                                           'size')})
+        with self.assertRaises(images.ImageError):
+            images.read_info('missing.png')
+
+    def test_reuses_derivatives_by_content(self):
+        image = Image(path='a.png', **images.read_info('a.png'))
+        target = images.derivative_path(image.sha256, 'image/png', 40)
+        os.makedirs(os.path.dirname(target))
+        open(target, 'wb').close()
+        # No wider than the original, and made already.
+        self.assertEquals(target, image.get_derivative(100).result())
+
+    @unittest.skipIf(images.PILImage is None, "Needs Pillow")
+    def test_makes_derivatives(self):
+        image = Image(path='a.png', **images.read_info('a.png'))
+        path = image.get_derivative(10).result()
+        self.assertEquals(
+            images.derivative_path(image.sha256, 'image/png', 10), path)
+        with open(path, 'rb') as stream:
+            self.assertEquals(('image/png', 10, 5), images.read_header(stream))
@@ -0,0 +1,58 @@
+"""The clients of `manage.py loadtest --mode asgi`; needs Python 3.5+."""
+
+import asyncio
+import random
+import time
+
+from django.core.wsgi import get_wsgi_application
+
+from letterpush import asgi
+
+
+def run_clients(threads, clients, requests, slow, next_request, record):
+    """
+    Run clients coroutines at once, each making requests through an ASGI
+    application one after another, and spending slow seconds of each on
+    sending the request and reading the response.
+    """
+    application = asgi.WsgiToAsgi(get_wsgi_application(), threads)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    async def call(method, path, body):
+        sent = []
+
+        async def receive():
+            await asyncio.sleep(slow / 2)
+            return {'type': 'http.request', 'body': body}
+
+        async def send(message):
+            sent.append(message)
+            if (message['type'] == 'http.response.body' and
+                    not message.get('more_body', False)):
+                await asyncio.sleep(slow / 2)
+
+        await application({
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': b'',
+            'headers': [(b'content-type', b'application/json'),
+                        (b'host', b'testserver')],
+        }, receive, send)
+        return sent[0]['status'], b''.join(
+            message['body'] for message in sent[1:])
+
+    async def client(seed):
+        rng = random.Random(seed)
+        for _ in range(requests):
+            method, path, body = next_request(rng)
+            started = time.time()
+            status, content = await call(method, path, body)
+            record(method, status, content, time.time() - started)
+
+    try:
+        loop.run_until_complete(asyncio.gather(
+            *[client(index) for index in range(clients)]))
+    finally:
+        application.shutdown()
+        asyncio.set_event_loop(None)
+        loop.close()
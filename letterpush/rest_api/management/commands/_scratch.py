@@ -0,0 +1,45 @@
+"""Helpers for commands that exercise the API on a scratch database."""
+
+import contextlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment)
+
+
+@contextlib.contextmanager
+def scratch_database():
+    """
+    Run the block against a freshly migrated copy of the configured
+    database, like the test runner does, then drop it.
+    SQLite gets a real file instead of :memory:, so that its journaling
+    settings matter. Image files go to a temporary directory, too.
+    """
+    old_name = connection.settings_dict['NAME']
+    old_debug = settings.DEBUG
+    temp_dir = tempfile.mkdtemp(prefix='letterpush-')
+    if connection.vendor == 'sqlite':
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = (
+            os.path.join(temp_dir, 'scratch.sqlite3'))
+    images_settings = override_settings(
+        IMAGES_ROOT=os.path.join(temp_dir, 'images'),
+        IMAGE_DERIVATIVES_ROOT=os.path.join(temp_dir, 'derivatives'))
+    images_settings.enable()
+    setup_test_environment()
+    settings.DEBUG = False  # Do not keep every query in memory.
+    try:
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        settings.DEBUG = old_debug
+        teardown_test_environment()
+        images_settings.disable()
+        shutil.rmtree(temp_dir, ignore_errors=True)
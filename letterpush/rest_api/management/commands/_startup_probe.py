@@ -0,0 +1,71 @@
+"""
+Start a worker and serve one request, for `manage.py startup`; run as
+
+    python -m rest_api.management.commands._startup_probe <path> <database>
+
+with DJANGO_SETTINGS_MODULE set; database is the NAME of the default one
+to use instead of the configured one. Prints the timings as JSON.
+"""
+
+import json
+import sys
+import timeit
+
+started = timeit.default_timer()
+
+
+def call(application, path):
+    """Return the status of a GET of path through a WSGI application."""
+    path, _, query = path.partition('?')
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SCRIPT_NAME': '', 'SERVER_NAME': 'localhost', 'SERVER_PORT': '80',
+        'HTTP_HOST': 'localhost', 'REMOTE_ADDR': '127.0.0.1',
+        'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http', 'wsgi.input': sys.stdin,
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': False,
+        'wsgi.multiprocess': True, 'wsgi.run_once': False,
+    }
+    statuses = []
+    body = application(environ, lambda status, headers, *_: statuses.append(
+        status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return int(statuses[0].split()[0])
+
+
+def main(path, database):
+    def since(moment):
+        return round((timeit.default_timer() - moment) * 1000, 1)
+
+    import django
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = database  # Before connecting.
+    django.setup()
+    setup_ms = since(started)
+    moment = timeit.default_timer()
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()  # Loads the middleware.
+    wsgi_ms = since(moment)
+    moment = timeit.default_timer()
+    status = call(application, path)  # Loads the URLconf and views.
+    first_request_ms = since(moment)
+    moment = timeit.default_timer()
+    call(application, path)
+    second_request_ms = since(moment)
+    print(json.dumps({
+        "setup_ms": setup_ms,
+        "wsgi_ms": wsgi_ms,
+        "first_request_ms": first_request_ms,
+        "second_request_ms": second_request_ms,
+        "status": status,
+        "modules": len(sys.modules),
+    }))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1], sys.argv[2])
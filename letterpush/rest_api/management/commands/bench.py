@@ -0,0 +1,57 @@
+"""
+Benchmark the REST resources at growing volumes of data.
+
+    python ./manage.py bench --volumes 1000,10000 --output bench.json
+    python ./manage.py bench --baseline bench.json
+    python ./manage.py bench --accept-encoding gzip
+
+With --baseline, exits with an error if anything got slower, bigger or
+chattier than the baseline allows, see benchmarks.THRESHOLDS. Compare
+results of the same --accept-encoding only.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ... import benchmarks
+from ._scratch import scratch_database
+
+
+class Command(BaseCommand):
+    help = "Time list/detail/create/update/delete of every resource."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--volumes', default='1000',
+                            help="Comma-separated numbers of objects to seed.")
+        parser.add_argument('--repeat', type=int, default=20,
+                            help="Requests per operation.")
+        parser.add_argument('--output', help="Write results as JSON here.")
+        parser.add_argument('--baseline', help="Compare to these results.")
+        parser.add_argument('--tolerance', type=float,
+                            help="Allowed growth of timings and memory, "
+                                 "e.g. 0.2 for 20%%.")
+        parser.add_argument('--accept-encoding',
+                            help="Send this Accept-Encoding, e.g. gzip, to "
+                                 "measure compressed responses.")
+
+    def handle(self, **options):
+        results = {}
+        for volume in [int(each) for each in options['volumes'].split(',')]:
+            with scratch_database():
+                results[str(volume)] = benchmarks.Benchmark(
+                    volume, repeat=options['repeat'],
+                    accept_encoding=options['accept_encoding']).run()
+        text = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(text)
+        else:
+            self.stdout.write(text)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                regressions = benchmarks.find_regressions(
+                    results, json.load(baseline), options['tolerance'])
+            if regressions:
+                raise CommandError("Regressions:\n" + "\n".join(regressions))
+            self.stdout.write("No regressions.")
@@ -0,0 +1,48 @@
+"""
+Hand the outbox events to the consumers in settings.REST_API_OUTBOX, see
+rest_api/outbox.py. Runs until stopped, polling every --interval seconds
+when there is nothing due; with --once, until nothing is due. Prints the
+metrics of every batch as a JSON line.
+
+    python ./manage.py drain_outbox
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ... import outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver the outbox events to their consumers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help="Stop when nothing is due.")
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help="Seconds to wait when nothing is due.")
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--threads', type=int)
+
+    def handle(self, **options):
+        config = outbox.get_config()
+        if options['batch_size']:
+            config['BATCH_SIZE'] = options['batch_size']
+        if options['threads']:
+            config['THREADS'] = options['threads']
+        drainer = outbox.Drainer(config)
+        try:
+            while True:
+                metrics = drainer.drain()
+                if metrics["events"]:
+                    self.stdout.write(json.dumps(metrics, sort_keys=True))
+                    continue
+                if options['once']:
+                    return
+                connection.close()  # Do not hold it while idle.
+                time.sleep(options['interval'])
+        finally:
+            drainer.close()
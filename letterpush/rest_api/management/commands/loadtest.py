@@ -0,0 +1,139 @@
+"""
+Hammer the API with concurrent writers and readers, report throughput.
+
+Runs on a scratch database made like the configured one, so database
+profiles can be compared as e.g.
+
+    LETTERPUSH_DB=sqlite python ./manage.py loadtest
+    LETTERPUSH_DB=sqlite-tuned python ./manage.py loadtest
+
+Deployments can be compared with slow clients, which take --slow-ms to
+send each request and read its response: --mode wsgi has --threads
+workers, each tied up for the whole exchange, like a threaded WSGI
+server; --mode asgi serves all the clients from one event loop, with
+--threads for Django, see letterpush/asgi.py.
+
+    python ./manage.py loadtest --clients 64 --slow-ms 50 --mode wsgi
+    python ./manage.py loadtest --clients 64 --slow-ms 50 --mode asgi
+"""
+
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+
+from ._scratch import scratch_database
+
+
+class Command(BaseCommand):
+    help = "Run concurrent POSTs and GETs through the test client."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200,
+                            help="Requests per client.")
+        parser.add_argument('--write-share', type=float, default=0.3,
+                            help="Part of requests that are POSTs.")
+        parser.add_argument('--mode', choices=('wsgi', 'asgi'),
+                            default='wsgi')
+        parser.add_argument('--clients', type=int,
+                            help="Concurrent clients; --threads by default.")
+        parser.add_argument('--slow-ms', type=float, default=0,
+                            help="Time a client takes per request on its "
+                                 "side of the connection.")
+
+    def handle(self, **options):
+        self.write_share = options['write_share']
+        clients = options['clients'] or options['threads']
+        run_load = (self.run_asgi_load if options['mode'] == 'asgi'
+                    else self.run_load)
+        with scratch_database():
+            result = run_load(options['threads'], clients,
+                              options['requests'], options['slow_ms'] / 1000)
+        result.update({"profile": settings.DB_PROFILE,
+                       "mode": options['mode'], "clients": clients,
+                       "slow_ms": options['slow_ms']})
+        self.stdout.write(json.dumps(result, indent=2, sort_keys=True))
+
+    def seed(self):
+        """Have something to read from the start."""
+        seed = Client()
+        self.article_ids = [json.loads(seed.post(
+            '/api/articles/', json.dumps({"title": "Seed", "body": "Seed"}),
+            content_type='application/json').content.decode('utf-8'))["id"]]
+        self.lock = threading.Lock()
+        self.statuses = {}
+        self.latencies = []
+
+    def next_request(self, rng):
+        """Return (method, path, body) of a random request."""
+        if rng.random() < self.write_share:
+            return 'POST', '/api/articles/', json.dumps(
+                {"title": "Load", "body": "Test"}).encode('utf-8')
+        with self.lock:
+            pk = rng.choice(self.article_ids)
+        return 'GET', '/api/articles/%d/' % pk, b''
+
+    def record(self, method, status, content, elapsed):
+        with self.lock:
+            if method == 'POST' and status == 201:
+                self.article_ids.append(
+                    json.loads(content.decode('utf-8'))["id"])
+            self.latencies.append(elapsed)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def run_load(self, threads, clients, requests, slow):
+        self.seed()
+        workers = threading.BoundedSemaphore(threads)
+
+        def client_thread(seed):
+            rng = random.Random(seed)
+            client = Client()
+            try:
+                for _ in range(requests):
+                    method, path, body = self.next_request(rng)
+                    started = time.time()
+                    with workers:  # Held while the client is slow, too.
+                        time.sleep(slow / 2)
+                        response = client.generic(
+                            method, path, body,
+                            content_type='application/json')
+                        time.sleep(slow / 2)
+                    self.record(method, response.status_code,
+                                response.content, time.time() - started)
+            finally:
+                connection.close()  # This thread's own one.
+
+        client_threads = [threading.Thread(target=client_thread, args=(index,))
+                          for index in range(clients)]
+        started = time.time()
+        for each in client_threads:
+            each.start()
+        for each in client_threads:
+            each.join()
+        return self.report(threads, time.time() - started)
+
+    def run_asgi_load(self, threads, clients, requests, slow):
+        from ._asgi_load import run_clients  # Python 3.5+.
+        self.seed()
+        started = time.time()
+        run_clients(threads, clients, requests, slow, self.next_request,
+                    self.record)
+        return self.report(threads, time.time() - started)
+
+    def report(self, threads, elapsed):
+        latencies = sorted(self.latencies)
+        return {
+            "threads": threads,
+            "requests": len(latencies),
+            "seconds": round(elapsed, 3),
+            "requests_per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+            "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+            "statuses": self.statuses,
+        }
@@ -0,0 +1,93 @@
+"""
+Measure how fast a worker starts, per settings module, so that the boot
+time can be followed from release to release.
+
+    python ./manage.py startup --output startup.json
+
+Every run is a new process (see _startup_probe.py), which reports:
+setup_ms, the imports and django.setup(); wsgi_ms, loading the
+middleware; first_request_ms, the first request, which loads the URLconf
+and views; second_request_ms, a warm request to compare; and modules,
+how many got imported. process_ms is the whole run as seen from here,
+starting the interpreter included. The numbers are medians of --repeat
+runs.
+
+The requests GET --path, by default a page of articles, so that they
+take the first connection to the database and its queries, too. The
+database is a migrated scratch one with SEED articles, not the
+configured one.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import timeit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ...models import Article
+from ._scratch import scratch_database
+
+PROBE = 'rest_api.management.commands._startup_probe'
+METRICS = ('process_ms', 'setup_ms', 'wsgi_ms', 'first_request_ms',
+           'second_request_ms', 'modules')
+SEED = 100
+
+
+def median(values):
+    return sorted(values)[len(values) // 2]
+
+
+class Command(BaseCommand):
+    help = "Time the start of a worker and its first request."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles',
+            default='letterpush.settings,letterpush.settings_api',
+            help="Comma-separated settings modules to compare.")
+        parser.add_argument('--path', default='/api/articles/',
+                            help="What the requests GET.")
+        parser.add_argument('--repeat', type=int, default=5,
+                            help="Processes to start per settings module.")
+        parser.add_argument('--output', help="Write results as JSON here.")
+
+    def handle(self, **options):
+        results = {}
+        with scratch_database():
+            Article.objects.bulk_create(
+                Article(title='Title %d' % index, body='Body ' * 50)
+                for index in range(SEED))
+            database = connection.settings_dict['NAME']
+            for profile in options['profiles'].split(','):
+                runs = [self.probe(profile, options['path'], database)
+                        for _ in range(options['repeat'])]
+                result = dict((name, median([run[name] for run in runs]))
+                              for name in METRICS)
+                result["status"] = runs[-1]["status"]
+                results[profile] = result
+        text = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(text)
+        else:
+            self.stdout.write(text)
+
+    def probe(self, profile, path, database):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+        started = timeit.default_timer()
+        process = subprocess.Popen(
+            [sys.executable, '-m', PROBE, path, database],
+            cwd=settings.BASE_DIR,
+            env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        out, err = process.communicate()
+        elapsed = timeit.default_timer() - started
+        if process.returncode:
+            raise CommandError("%s failed:\n%s" % (
+                profile, err.decode('utf-8', 'replace')))
+        run = json.loads(out.decode('utf-8').strip().splitlines()[-1])
+        run["process_ms"] = round(elapsed * 1000, 1)
+        return run
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.8 on 2026-10-18 12:29
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0003_changes_feed'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='imagelink',
+            index_together=set([('image', 'role')]),
+        ),
+    ]
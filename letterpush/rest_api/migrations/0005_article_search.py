@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.8 on 2026-10-18 12:30
+from __future__ import unicode_literals
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# A frozen copy of the weighing in rest_api/search.py as of this migration;
+# migrations must not change as the app code does.
+TITLE_WEIGHT = 5
+MAX_TERM_LENGTH = 100
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'with',
+))
+_word = re.compile(r'\w+', re.UNICODE)
+
+
+def split_words(text):
+    return [word for word in _word.findall(text.lower())
+            if word not in STOP_WORDS and len(word) <= MAX_TERM_LENGTH]
+
+
+def weigh_terms(title, body):
+    weights = Counter(split_words(body))
+    for word in split_words(title):
+        weights[word] += TITLE_WEIGHT
+    return weights
+
+
+def index_articles(apps, schema_editor):
+    Article = apps.get_model('rest_api', 'Article')
+    SearchTerm = apps.get_model('rest_api', 'SearchTerm')
+    for article in Article.objects.iterator():
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, article_id=article.pk, weight=weight)
+            for term, weight in weigh_terms(article.title,
+                                            article.body).items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0004_link_filters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('weight', models.PositiveIntegerField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='rest_api.Article')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchterm',
+            unique_together=set([('term', 'article')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='searchterm',
+            index_together=set([('term', 'weight', 'article')]),
+        ),
+        migrations.RunPython(index_articles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.8 on 2026-10-18 12:56
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+from ._image_files import ImageError, read_info  # Frozen, not the app's.
+
+
+def read_files(apps, schema_editor):
+    Image = apps.get_model('rest_api', 'Image')
+    for image in Image.objects.iterator():
+        try:
+            info = read_info(image.path)
+        except ImageError:  # Left blank until the path gets fixed.
+            continue
+        Image.objects.filter(pk=image.pk).update(**info)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0005_article_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='content_type',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='image',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(read_files, migrations.RunPython.noop),
+    ]
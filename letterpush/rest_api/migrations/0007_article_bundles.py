@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.8 on 2026-10-18 12:59
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0006_image_files'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleBundle',
+            fields=[
+                ('article', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='rest_api.Article')),
+                ('content', models.TextField()),
+                ('updated', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.8 on 2026-10-18 13:06
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0007_article_bundles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.CharField(max_length=50)),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.IntegerField(db_index=True)),
+                ('action', models.CharField(max_length=10)),
+                ('created', models.DateTimeField()),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(db_index=True)),
+                ('failed', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
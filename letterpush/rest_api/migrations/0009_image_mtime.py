@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.9.8 on 2026-10-18 18:02
+from __future__ import unicode_literals
+
+import os
+
+from django.db import migrations, models
+
+from ._image_files import (  # Frozen, not the app's.
+    ImageError, full_path, read_info)
+
+
+def read_files(apps, schema_editor):
+    # Read again: a file may have changed since, at the same size.
+    Image = apps.get_model('rest_api', 'Image')
+    for image in Image.objects.iterator():
+        try:
+            # Before reading: a change while at it shows next time.
+            mtime = os.stat(full_path(image.path)).st_mtime
+            info = read_info(image.path)
+        except (ImageError, IOError, OSError):  # Left until it is fixed.
+            continue
+        Image.objects.filter(pk=image.pk).update(mtime=mtime, **info)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rest_api', '0008_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='mtime',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(read_files, migrations.RunPython.noop),
+    ]
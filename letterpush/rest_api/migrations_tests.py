@@ -0,0 +1,40 @@
+"""Tests of the data migrations, see migrations/."""
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from . import images
+from . import resources_tests
+
+
+class DataMigrationTest(resources_tests.ImageFilesMixin, TransactionTestCase):
+    """Runs the migrations from before the data ones on rows of then."""
+
+    def migrate(self, target=None):
+        """Migrate to target, or the last migration; return its apps."""
+        executor = MigrationExecutor(connection)
+        if target is None:
+            target = executor.loader.graph.leaf_nodes('rest_api')[0][1]
+        executor.migrate([('rest_api', target)])
+        return executor.loader.project_state(('rest_api', target)).apps
+
+    def tearDown(self):
+        self.migrate()
+
+    def test_fills_search_and_file_columns(self):
+        apps = self.migrate('0004_link_filters')
+        article = apps.get_model('rest_api', 'Article').objects.create(
+            title="Cats", body="The cats.")
+        self.write_image('a.png', images.blank_png(3, 2))
+        image = apps.get_model('rest_api', 'Image').objects.create(
+            path='a.png', note='')
+        apps = self.migrate()
+        terms = apps.get_model('rest_api', 'SearchTerm').objects.filter(
+            article_id=article.pk).values_list('term', 'weight')
+        self.assertEquals([('cats', 6)], list(terms))
+        image = apps.get_model('rest_api', 'Image').objects.get(pk=image.pk)
+        self.assertEquals(('image/png', 3, 2), (
+            image.content_type, image.width, image.height))
+        self.assertEquals(images.read_info('a.png')["sha256"], image.sha256)
+        self.assertIsNotNone(image.mtime)
@@ -1,8 +1,16 @@
 from __future__ import unicode_literals
 
+import contextlib
+import threading
 from collections import namedtuple
 
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import images
 
 # Create your models here.
 
@@ -12,7 +20,8 @@ class DateTrackingModel(models.Model):
     class Meta:
         abstract = True
     created = models.DateTimeField(auto_now_add=True, blank=True)
-    updated = models.DateTimeField(auto_now=True, blank=True)
+    # Indexed for the "changes since" feeds.
+    updated = models.DateTimeField(auto_now=True, blank=True, db_index=True)
 
 
 class Article(DateTrackingModel):
@@ -27,7 +36,43 @@ class Image(DateTrackingModel):
     note = models.CharField(max_length=200)
     path = models.CharField(max_length=200, unique=True,
                             help_text="Part on top of /static/images")
-    # TODO: Add filesystem access methods.
+    # Read from the file by clean(), see images.py.
+    content_type = models.CharField(max_length=50, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    size = models.BigIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True)
+    mtime = models.FloatField(null=True, blank=True)  # When sha256 was read.
+    FILE_INFO_FIELDS = ('content_type', 'width', 'height', 'size', 'sha256',
+                        'mtime')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Image, cls).from_db(db, field_names, values)
+        # Remember the path, to tell if the file has to be read again.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def clean(self):
+        """
+        Ensure the file exists; read its metadata if it is a new one. A
+        file changed in place is told by its size or modification time.
+        """
+        super(Image, self).clean()
+        loaded = getattr(self, '_loaded_values', {})
+        try:
+            found = images.stat(self.path)
+            if (not self.sha256 or self.size != found.st_size or
+                    self.mtime != found.st_mtime or
+                    loaded.get('path') != self.path):
+                for name, value in images.read_info(self.path).items():
+                    setattr(self, name, value)
+        except images.ImageError as e:
+            raise ValidationError({'path': str(e)})
+
+    def get_derivative(self, width):
+        """Return a future of the path to a copy resized to width."""
+        return images.get_derivative(self, width)
 
 
 class ImageLink(DateTrackingModel):
@@ -36,17 +81,141 @@ class ImageLink(DateTrackingModel):
         unique_together = (
             ('article', 'role', 'image'),  # Also a useful index by article.
         )
+        index_together = (
+            ('image', 'role'),  # The same, by image.
+        )
     ROLE_CHOICES = (
         ("G", "gallery"),
         ("L", "lead"),
         ("S", "social"),
     )
     # Role choices as a nicer enum-like object: e.g. ROLES.gallery == "G".
-    # Not used anywhere currently, though.
-    ROLES = namedtuple('enum', [name for name, _ in ROLE_CHOICES])(
-        *[value for _, value in ROLE_CHOICES])
+    ROLES = namedtuple('enum', [name for _, name in ROLE_CHOICES])(
+        *[value for value, _ in ROLE_CHOICES])
     # Prevent attempts to delete images linked to any articles.
     image = models.ForeignKey(Image, on_delete=models.PROTECT)
     # Allow deletion of artcles, unlinking any related images.
     article = models.ForeignKey(Article, on_delete=models.CASCADE)
     role = models.CharField(max_length=1, choices=ROLE_CHOICES)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(ImageLink, cls).from_db(db, field_names, values)
+        # Remember what the link pointed to, to tell if it gets moved.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+
+class ArticleBundle(models.Model):
+    """An article and its linked images, as served, see bundles.py."""
+    article = models.OneToOneField(Article, on_delete=models.CASCADE,
+                                   primary_key=True)
+    content = models.TextField()  # JSON.
+    updated = models.DateTimeField()
+
+
+class SearchTerm(models.Model):
+    """An entry of the inverted index of articles, see search.py."""
+    class Meta:
+        unique_together = (
+            ('term', 'article'),
+        )
+        index_together = (
+            ('term', 'weight', 'article'),  # Best ranked first, by term.
+        )
+    term = models.CharField(max_length=100)
+    article = models.ForeignKey(Article, on_delete=models.CASCADE)
+    weight = models.PositiveIntegerField()
+
+
+class OutboxEvent(models.Model):
+    """A change to hand to a downstream consumer, see outbox.py."""
+    consumer = models.CharField(max_length=50)
+    model = models.CharField(max_length=100)  # As in _meta.label_lower.
+    object_id = models.IntegerField(db_index=True)
+    action = models.CharField(max_length=10)  # created, updated, deleted.
+    created = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(db_index=True)
+    failed = models.BooleanField(default=False)  # Given up on.
+
+
+class Tombstone(models.Model):
+    """Remembers a deleted object, for the "changes since" feeds."""
+    class Meta:
+        index_together = (
+            ('model', 'deleted', 'object_id'),  # As the feeds walk them.
+        )
+    model = models.CharField(max_length=100)  # As in _meta.label_lower.
+    object_id = models.IntegerField()
+    deleted = models.DateTimeField(auto_now_add=True)
+
+
+@receiver(post_delete)
+def remember_deletion(sender, instance, **kwargs):
+    # Cascaded deletions get here, too.
+    if issubclass(sender, DateTrackingModel):
+        Tombstone.objects.create(model=sender._meta.label_lower,
+                                 object_id=instance.pk)
+
+
+# Sent with the sets of article_ids and image_ids whose links were saved
+# or deleted: right after each link, or once for all the links of a
+# batch_link_changes() block, at its end. Receivers run in the order
+# they were connected.
+links_changed = Signal(providing_args=['article_ids', 'image_ids'])
+
+_batch = threading.local()
+
+
+@contextlib.contextmanager
+def batch_link_changes():
+    """
+    Send one links_changed for all the links saved or deleted in the
+    block, at its end, rather than one per link; none if it raises.
+    Nested blocks go with the outermost one.
+    """
+    if getattr(_batch, 'changes', None) is not None:
+        yield
+        return
+    _batch.changes = (set(), set())
+    try:
+        yield
+        article_ids, image_ids = _batch.changes
+    finally:
+        _batch.changes = None
+    if article_ids or image_ids:
+        links_changed.send(sender=ImageLink, article_ids=article_ids,
+                           image_ids=image_ids)
+
+
+@receiver(post_save, sender=ImageLink)
+@receiver(post_delete, sender=ImageLink)
+def collect_link_change(sender, instance, **kwargs):
+    article_ids = set([instance.article_id])
+    image_ids = set([instance.image_id])
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded:  # The link may have been moved from another article / image.
+        article_ids.add(loaded.get('article_id'))
+        image_ids.add(loaded.get('image_id'))
+    article_ids.discard(None)
+    image_ids.discard(None)
+    changes = getattr(_batch, 'changes', None)
+    if changes is None:
+        links_changed.send(sender=ImageLink, article_ids=article_ids,
+                           image_ids=image_ids)
+    else:
+        changes[0].update(article_ids)
+        changes[1].update(image_ids)
+
+
+@receiver(links_changed)
+def touch_linked(sender, article_ids, image_ids, **kwargs):
+    """
+    A link shows in the representations of its article and its image, so
+    move their `updated` as if they changed, in the same transaction: the
+    caches of every process tell them stale by it.
+    """
+    now = timezone.now()
+    Article.objects.filter(id__in=list(article_ids)).update(updated=now)
+    Image.objects.filter(id__in=list(image_ids)).update(updated=now)
@@ -0,0 +1,204 @@
+"""
+Transactional outbox of changes, for downstream consumers.
+
+Every save or deletion of an article, image or link adds an OutboxEvent
+per consumer in settings.REST_API_OUTBOX, by the signal receivers below,
+in the transaction of the change: an event exists if and only if its
+change was committed, and writes do not wait for the consumers.
+
+`manage.py drain_outbox` hands the events over (see Drainer): batches in
+the order of ids, the events of each object to each consumer in one call
+on a thread pool, the objects in parallel. A failed call is retried
+later, with the delay doubling up to MAX_ATTEMPTS; until then, later
+events of the same object wait for it, so that each consumer sees the
+changes of an object in order. Delivered events are deleted; the ones
+given up on stay, marked failed.
+
+Configured by settings.REST_API_OUTBOX:
+
+    'CONSUMERS': {name: dotted path to a callable taking a list of event
+        dicts}; none by default, so no events are written.
+    'BATCH_SIZE': events to take at a time.
+    'THREADS': consumer calls to run at once.
+    'MAX_ATTEMPTS': calls of a consumer with an event before giving up.
+    'RETRY_DELAY': seconds before the first retry.
+
+Run one drain_outbox at a time.
+"""
+
+import datetime
+import logging
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count, F, Min
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import six
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Article, Image, ImageLink, OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'CONSUMERS': {},
+    'BATCH_SIZE': 200,
+    'THREADS': 4,
+    'MAX_ATTEMPTS': 8,
+    'RETRY_DELAY': 1.0,
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'REST_API_OUTBOX', {}))
+
+
+def log_events(events):
+    """A consumer that only logs the events, e.g. to try things out."""
+    for event in events:
+        logger.info("%(action)s %(model)s %(object_id)d", event)
+
+
+def add_events(instance, action):
+    consumers = get_config()['CONSUMERS']
+    if not consumers:
+        return
+    now = timezone.now()
+    OutboxEvent.objects.bulk_create(
+        OutboxEvent(consumer=name, model=instance._meta.label_lower,
+                    object_id=instance.pk, action=action, created=now,
+                    next_attempt=now)
+        for name in sorted(consumers))
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Image)
+@receiver(post_save, sender=ImageLink)
+def add_saved(sender, instance, created, **kwargs):
+    add_events(instance, 'created' if created else 'updated')
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Image)
+@receiver(post_delete, sender=ImageLink)
+def add_deleted(sender, instance, **kwargs):
+    # Cascaded deletions get here, too.
+    add_events(instance, 'deleted')
+
+
+def to_message(event):
+    """Return what a consumer gets of an event."""
+    return {"id": event.id, "model": event.model,
+            "object_id": event.object_id, "action": event.action,
+            "created": event.created.isoformat()}
+
+
+class Drainer(object):
+    """Delivers the outbox a batch at a time, see drain()."""
+
+    def __init__(self, config=None):
+        from concurrent.futures import ThreadPoolExecutor  # Python 3.2+.
+        config = config or get_config()
+        self.consumers = dict(
+            (name, import_string(path)
+             if isinstance(path, six.string_types) else path)
+            for name, path in config['CONSUMERS'].items())
+        self.batch_size = config['BATCH_SIZE']
+        self.max_attempts = config['MAX_ATTEMPTS']
+        self.retry_delay = config['RETRY_DELAY']
+        self.executor = ThreadPoolExecutor(max_workers=config['THREADS'])
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    def take_batch(self, now):
+        """
+        Return the next due events as an OrderedDict of
+        {(consumer, model, object id): [events in order]}, without the
+        objects that still have an earlier event to retry. Events of
+        consumers no longer configured stay, out of the way.
+        """
+        events = OutboxEvent.objects.filter(
+            consumer__in=list(self.consumers), failed=False,
+            next_attempt__lte=now).order_by('id')[:self.batch_size]
+        groups = OrderedDict()
+        for event in events:
+            groups.setdefault(
+                (event.consumer, event.model, event.object_id), []).append(
+                event)
+        waiting = OutboxEvent.objects.filter(
+            failed=False, next_attempt__gt=now,
+            object_id__in=set(key[2] for key in groups)).values_list(
+            'consumer', 'model', 'object_id', 'id')
+        for consumer, model, object_id, pk in waiting:
+            group = groups.get((consumer, model, object_id))
+            if group is not None and pk < group[0].id:
+                del groups[(consumer, model, object_id)]
+        return groups
+
+    def deliver(self, consumer, events):
+        """Call the consumer in a pool thread; return the error, if any."""
+        try:
+            self.consumers[consumer]([to_message(event) for event in events])
+        except Exception as e:
+            logger.warning("Outbox consumer %s failed: %r", consumer, e)
+            return e
+        return None
+
+    def drain(self):
+        """Deliver a batch of due events; return metrics of how it went."""
+        now = timezone.now()
+        groups = self.take_batch(now)
+        futures = [
+            (events, self.executor.submit(self.deliver, key[0], events))
+            for key, events in groups.items()]
+        delivered, retried, failed, lags = [], 0, 0, []
+        for events, future in futures:
+            if future.result() is None:
+                delivered.extend(event.id for event in events)
+                done = timezone.now()
+                lags.extend((done - event.created).total_seconds()
+                            for event in events)
+                continue
+            attempts = max(event.attempts for event in events) + 1
+            given_up = attempts >= self.max_attempts
+            delay = self.retry_delay * 2 ** (attempts - 1)
+            next_attempt = now + datetime.timedelta(seconds=delay)
+            OutboxEvent.objects.filter(
+                id__in=[event.id for event in events]).update(
+                attempts=F('attempts') + 1, failed=given_up,
+                next_attempt=next_attempt)
+            if not given_up:  # Keep the ones behind out of the batches.
+                OutboxEvent.objects.filter(
+                    consumer=events[0].consumer, model=events[0].model,
+                    object_id=events[0].object_id, id__gt=events[-1].id,
+                    failed=False).update(next_attempt=next_attempt)
+            if given_up:
+                failed += len(events)
+            else:
+                retried += len(events)
+        if delivered:
+            OutboxEvent.objects.filter(id__in=delivered).delete()
+        return self.get_metrics(
+            sum(len(events) for events, _ in futures), len(delivered),
+            retried, failed, sorted(lags))
+
+    def get_metrics(self, taken, delivered, retried, failed, lags):
+        pending = OutboxEvent.objects.filter(
+            consumer__in=list(self.consumers), failed=False).aggregate(
+            count=Count('id'), oldest=Min('created'))
+        return {
+            "events": taken,
+            "delivered": delivered,
+            "retried": retried,
+            "failed": failed,
+            # From a change to its delivery.
+            "lag_ms_p50": (round(lags[len(lags) // 2] * 1000, 1)
+                           if lags else None),
+            "lag_ms_max": round(lags[-1] * 1000, 1) if lags else None,
+            "pending": pending["count"],
+            "oldest_pending_s": pending["oldest"] and round(
+                (timezone.now() - pending["oldest"]).total_seconds(), 1),
+        }
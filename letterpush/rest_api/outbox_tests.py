@@ -0,0 +1,153 @@
+"""Tests of the outbox and its worker, see outbox.py."""
+
+import datetime
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import six
+from django.utils import timezone
+
+from . import outbox
+from . import resources
+from . import resources_tests
+from .models import Article, OutboxEvent
+
+# What the stub consumers below got, and how many more calls to fail.
+received = {"cdn": [], "search": []}
+failures = {"cdn": 0, "search": 0}
+
+
+def cdn(events):
+    stub('cdn', events)
+
+
+def search(events):
+    stub('search', events)
+
+
+def stub(name, events):
+    if failures[name]:
+        failures[name] -= 1
+        raise IOError("%s is down" % name)
+    received[name].append([(event["action"], event["object_id"])
+                           for event in events])
+
+
+CONFIG = {
+    'CONSUMERS': {'cdn': 'rest_api.outbox_tests.cdn',
+                  'search': 'rest_api.outbox_tests.search'},
+    'THREADS': 2,
+    'RETRY_DELAY': 0,
+}
+
+
+@override_settings(REST_API_OUTBOX=CONFIG)
+class OutboxTest(resources_tests.RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        for name in received:
+            received[name] = []
+            failures[name] = 0
+        self.drainer = outbox.Drainer()
+        self.addCleanup(self.drainer.close)
+
+    def test_writes_events_with_changes(self):
+        status, article = self.request_list(
+            'POST', resources_tests.ArticleTest.make_data())
+        self.assertEquals(201, status)
+        self.request_detail('PUT', article["id"], {"title": "New"})
+        self.request_detail('DELETE', article["id"])
+        self.assertEquals(
+            [('cdn', 'created'), ('search', 'created'),
+             ('cdn', 'updated'), ('search', 'updated'),
+             ('cdn', 'deleted'), ('search', 'deleted')],
+            list(OutboxEvent.objects.order_by('id').values_list(
+                'consumer', 'action')))
+
+    def test_writes_nothing_for_failed_changes(self):
+        status, _ = self.request_list('POST', {"title": "", "body": ""})
+        self.assertEquals(400, status)
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_delivers_in_order_per_object(self):
+        first = Article.objects.create(title="First", body="")
+        second = Article.objects.create(title="Second", body="")
+        first.title = "Changed"
+        first.save()
+        metrics = self.drainer.drain()
+        self.assertEquals((6, 6, 0), (metrics["events"], metrics["delivered"],
+                                      metrics["pending"]))
+        self.assertEquals(sorted([
+            [('created', first.id), ('updated', first.id)],
+            [('created', second.id)],
+        ]), sorted(received["cdn"]))
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_retries_failed_consumer_only(self):
+        article = Article.objects.create(title="Title", body="")
+        failures["search"] = 1
+        with self.assertLogs('rest_api.outbox', 'WARNING') as logs:
+            metrics = self.drainer.drain()
+        self.assertEquals((1, 1), (metrics["delivered"], metrics["retried"]))
+        self.assertIn("Outbox consumer search failed", logs.output[0])
+        self.assertEquals([[('created', article.id)]], received["cdn"])
+        self.drainer.drain()
+        self.assertEquals([[('created', article.id)]], received["search"])
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_later_events_wait_for_retry(self):
+        self.drainer.retry_delay = 60
+        article = Article.objects.create(title="Title", body="")
+        failures["cdn"] = 1
+        with self.assertLogs('rest_api.outbox', 'WARNING'):
+            self.drainer.drain()
+        article.save()
+        other = Article.objects.create(title="Other", body="")
+        self.drainer.drain()
+        self.assertEquals([[('created', other.id)]], received["cdn"])
+        OutboxEvent.objects.update(next_attempt=timezone.now())
+        self.drainer.drain()
+        self.assertEquals([('created', article.id), ('updated', article.id)],
+                          received["cdn"][-1])
+
+    def test_skips_removed_consumers(self):
+        with override_settings(REST_API_OUTBOX=dict(
+                CONFIG, CONSUMERS={'gone': 'rest_api.outbox_tests.cdn'})):
+            for _ in range(4):
+                Article.objects.create(title="Title", body="")
+        article = Article.objects.create(title="Title", body="")
+        self.drainer.batch_size = 3
+        metrics = self.drainer.drain()
+        self.assertEquals((2, 0), (metrics["delivered"], metrics["pending"]))
+        self.assertEquals([[('created', article.id)]], received["cdn"])
+        self.assertEquals(4, OutboxEvent.objects.filter(
+            consumer='gone').count())
+
+    def test_gives_up(self):
+        self.drainer.max_attempts = 2
+        Article.objects.create(title="Title", body="")
+        failures["cdn"] = 2
+        with self.assertLogs('rest_api.outbox', 'WARNING') as logs:
+            self.drainer.drain()
+            metrics = self.drainer.drain()
+        self.assertEquals(2, len(logs.output))
+        self.assertEquals((1, 0), (metrics["failed"], metrics["pending"]))
+        self.assertTrue(OutboxEvent.objects.get(consumer='cdn').failed)
+
+    def test_reports_lag(self):
+        Article.objects.create(title="Title", body="")
+        OutboxEvent.objects.update(
+            created=timezone.now() - datetime.timedelta(seconds=2))
+        metrics = self.drainer.drain()
+        self.assertGreaterEqual(metrics["lag_ms_max"], 2000)
+
+    def test_command_drains(self):
+        Article.objects.create(title="Title", body="")
+        out = six.StringIO()
+        call_command('drain_outbox', once=True, stdout=out)
+        self.assertIn('"delivered": 2', out.getvalue())
+        self.assertEquals(1, len(received["search"]))
+        self.assertFalse(OutboxEvent.objects.exists())
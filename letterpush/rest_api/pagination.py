@@ -0,0 +1,92 @@
+"""
+Keyset (a.k.a. cursor) pagination helpers.
+
+A page is fetched by a WHERE clause on the ordering key, never by OFFSET,
+so the cost of any page does not depend on how deep into the list it is.
+The key is a tuple of field names, optionally '-'-prefixed for descending
+order, and must end with a unique field (normally 'id') to be a total order.
+"""
+
+import base64
+import datetime
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """The cursor token is malformed or belongs to a different ordering."""
+
+
+def field_names(key):
+    """Return the bare field names of a key, e.g. ('updated', 'id')."""
+    return tuple(field.lstrip('-') for field in key)
+
+
+def ordering(key, backwards=False):
+    """Return order_by() arguments to walk the key forwards or backwards."""
+    if not backwards:
+        return list(key)
+    return [field[1:] if field.startswith('-') else '-' + field
+            for field in key]
+
+
+def encode_cursor(key, values, backwards=False):
+    """Make an opaque token pointing just after (or before) values."""
+    # NOTE: DjangoJSONEncoder would cut datetimes to milliseconds.
+    values = [value.isoformat() if isinstance(value, datetime.datetime)
+              else value for value in values]
+    payload = {"o": list(key), "k": values, "b": backwards}
+    raw = json.dumps(payload, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(token, key, model):
+    """
+    Parse a token made by encode_cursor() for the same key.
+    Returns (values, backwards); values are converted to the model field
+    types, so they can be compared against in a query. Values of names
+    that are not model fields (e.g. annotations) are left as they are.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token.encode('ascii'))
+        payload = json.loads(raw.decode('utf-8'))
+        if payload["o"] != list(key) or len(payload["k"]) != len(key):
+            raise InvalidCursor("Cursor is for a different ordering")
+        values = [to_python(model, name, value)
+                  for name, value in zip(field_names(key), payload["k"])]
+        return values, bool(payload["b"])
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError, ValidationError) as e:
+        raise InvalidCursor("Malformed cursor: %s" % e)
+
+
+def to_python(model, name, value):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return value
+    return field.to_python(value)
+
+
+def after(key, values, backwards=False):
+    """
+    Return a Q selecting rows strictly after values in the key order
+    (or strictly before them if backwards), i.e. the row-value comparison
+    (a, b) > (x, y) spelled out as a > x OR (a = x AND b > y).
+    """
+    clauses = []
+    equal_so_far = {}
+    for field, value in zip(key, values):
+        name = field.lstrip('-')
+        descending = field.startswith('-')
+        operator = 'lt' if descending != backwards else 'gt'
+        clause = dict(equal_so_far)
+        clause['%s__%s' % (name, operator)] = value
+        clauses.append(Q(**clause))
+        equal_so_far[name] = value
+    return reduce(or_, clauses)
@@ -0,0 +1,80 @@
+"""
+Preparers compiled once per resource class.
+
+FieldsPreparer walks the lookup of every field of every object, trying
+keys, then attributes. CompiledPreparer resolves its field map against
+the model once: every field is a plain column, read from a values() row
+by key, and dates come out as the ISO 8601 strings the JSON encoder would
+make of them, so encoding needs no callbacks either.
+"""
+
+import operator
+
+from django.db import models
+
+from restless.preparers import FieldsPreparer
+
+
+class Row(dict):
+    """A values() row that also reads as attributes, like an instance."""
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
+def read_rows(queryset, columns):
+    """Return a list of Rows of columns, without creating any instances."""
+    return [Row(zip(columns, values))
+            for values in queryset.values_list(*columns)]
+
+
+class CompiledPreparer(FieldsPreparer):
+    """
+    Prepares the same dicts a FieldsPreparer with the same fields would,
+    from Rows or from model instances. Lookups must be column names of
+    model, e.g. 'title' or 'article_id'; dotted paths are not supported.
+    """
+
+    def __init__(self, model, fields):
+        super(CompiledPreparer, self).__init__(fields)
+        self.model = model
+        self.columns = []  # To read rows with, see read_rows().
+        self._steps = []
+        # Same order as FieldsPreparer, so the JSON comes out the same.
+        for name, lookup in fields.items():
+            try:
+                field = model._meta.get_field(lookup)
+            except models.FieldDoesNotExist:
+                raise ValueError("%s has no column %r" % (
+                    model.__name__, lookup))
+            if isinstance(field, (models.DateField, models.TimeField)):
+                convert = operator.methodcaller('isoformat')
+            else:
+                convert = None
+            if lookup not in self.columns:
+                self.columns.append(lookup)
+            self._steps.append((name, lookup, convert))
+
+    def select(self, names):
+        """Return a preparer of just the named fields."""
+        return CompiledPreparer(self.model, dict(
+            (name, lookup) for name, lookup in self.fields.items()
+            if name in names))
+
+    def prepare(self, data):
+        if isinstance(data, dict):
+            read = data.__getitem__
+        else:
+            read = data.__getattribute__
+        result = {}
+        for name, lookup, convert in self._steps:
+            value = read(lookup)
+            if convert is not None and value is not None:
+                value = convert(value)
+            result[name] = value
+        return result
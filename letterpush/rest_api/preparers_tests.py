@@ -0,0 +1,63 @@
+"""Tests of the compiled preparers."""
+
+from django.test import TestCase
+
+from restless.preparers import FieldsPreparer
+
+from . import preparers
+from . import resources
+from . import resources_tests
+from .models import Article, ImageLink
+
+
+class CompiledPreparerTest(TestCase):
+
+    def test_rejects_dotted_lookups(self):
+        with self.assertRaises(ValueError):
+            preparers.CompiledPreparer(ImageLink, fields={'title':
+                                                          'article.title'})
+
+    def test_prepares_rows_and_instances_alike(self):
+        link = ImageLink(**resources_tests.ImageLinkTest.make_data())
+        link.save()
+        preparer = resources.ImageLinkResource.preparer
+        row, = preparers.read_rows(ImageLink.objects.all(), preparer.columns)
+        self.assertEquals(preparer.prepare(link), preparer.prepare(row))
+        self.assertEquals(link.article_id, row.article_id)
+
+
+class SameOutputTest(resources_tests.RestRequestMixin, TestCase):
+    """The responses are byte for byte what FieldsPreparer used to make."""
+
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def prepare_old_way(self, article):
+        serialized = FieldsPreparer(
+            self.RESOURCE.preparer.fields).prepare(article)
+        link_preparer = FieldsPreparer(
+            resources.ImageLinkResource.preparer.fields)
+        serialized["related_resources"] = {"image_links": [
+            link_preparer.prepare(link)
+            for link in article.imagelink_set.order_by('id')]}
+        return serialized
+
+    def test_list_and_detail(self):
+        for _ in range(3):
+            ImageLink(**resources_tests.ImageLinkTest.make_data()).save()
+        second = resources_tests.ImageLinkTest.make_data()
+        second["article_id"] = ImageLink.objects.first().article_id
+        ImageLink(**second).save()
+        articles = Article.objects.order_by('id')
+        _, content = self.request_list('GET', params={'limit': 2})
+        expected = self.RESOURCE().serializer.serialize({
+            "objects": [self.prepare_old_way(each) for each in articles[:2]],
+            "meta": content["meta"],
+        })
+        self.assertEquals(expected.encode('utf-8'),
+                          self.last_response.content)
+        self.request_detail('GET', articles[0].id)
+        expected = self.RESOURCE().serializer.serialize(
+            self.prepare_old_way(articles[0]))
+        self.assertEquals(expected.encode('utf-8'),
+                          self.last_response.content)
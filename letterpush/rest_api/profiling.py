@@ -0,0 +1,136 @@
+"""
+Per-request instrumentation of the resources, off by default.
+
+Configured by settings.REST_API_PROFILING:
+
+    'ENABLED': record query count, SQL time, preparer time, JSON
+        encoding time and response size of every request; send them as
+        a Server-Timing header and log them to the 'rest_api.profiling'
+        logger as JSON.
+    'PROFILE_DIR': where to dump cProfile stats of some requests;
+        None disables the dumps.
+    'PROFILE_HEADER': a request header (as in request.META) that asks to
+        profile the request, e.g. 'HTTP_X_PROFILE'; None to ignore.
+    'SAMPLE_RATE': share of other requests to profile, e.g. 0.01.
+
+When not enabled, the only cost is one settings lookup per request.
+"""
+
+import cProfile
+import json
+import logging
+import os
+import random
+import time
+import timeit
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+logger = logging.getLogger(__name__)
+
+
+def get_config():
+    """Return the settings dict if profiling is enabled, else None."""
+    config = getattr(settings, 'REST_API_PROFILING', None)
+    if config and config.get('ENABLED'):
+        return config
+    return None
+
+
+class TimedSerializer(object):
+    """Wraps a Restless serializer, adds up the time spent encoding."""
+
+    def __init__(self, serializer, profile):
+        self.serializer = serializer
+        self.profile = profile
+
+    def serialize(self, data):
+        started = timeit.default_timer()
+        try:
+            return self.serializer.serialize(data)
+        finally:
+            self.profile.encode += timeit.default_timer() - started
+
+    def get_separators(self):
+        return self.serializer.get_separators()
+
+    def deserialize(self, body):
+        return self.serializer.deserialize(body)
+
+
+class TimedPreparer(object):
+    """Wraps a Restless preparer, adds up the time spent preparing."""
+
+    def __init__(self, preparer, profile):
+        self.preparer = preparer
+        self.profile = profile
+
+    def prepare(self, data):
+        started = timeit.default_timer()
+        try:
+            return self.preparer.prepare(data)
+        finally:
+            self.profile.prepare += timeit.default_timer() - started
+
+    def __getattr__(self, name):
+        return getattr(self.preparer, name)
+
+
+class RequestProfile(object):
+    """Collects the numbers of one request to a resource."""
+
+    def __init__(self, config, request, name):
+        self.config = config
+        self.request = request
+        self.name = name  # E.g. 'ArticleResource.detail'.
+        self.prepare = self.encode = 0.0
+
+    def should_dump(self):
+        if not self.config.get('PROFILE_DIR'):
+            return False
+        header = self.config.get('PROFILE_HEADER')
+        if header and self.request.META.get(header):
+            return True
+        return random.random() < self.config.get('SAMPLE_RATE', 0)
+
+    def run(self, func, *args, **kwargs):
+        """Call func, note what it cost, return the response it makes."""
+        profiler = cProfile.Profile() if self.should_dump() else None
+        started = timeit.default_timer()
+        with CaptureQueriesContext(connection) as queries:
+            if profiler is None:
+                response = func(*args, **kwargs)
+            else:
+                response = profiler.runcall(func, *args, **kwargs)
+        total = timeit.default_timer() - started
+        if profiler is not None:
+            self.dump(profiler)
+        self.report(response, total, queries.captured_queries)
+        return response
+
+    def dump(self, profiler):
+        file_name = '%s-%s-%d.prof' % (self.name, time.strftime(
+            '%Y%m%d-%H%M%S'), random.randint(0, 999999))
+        profiler.dump_stats(os.path.join(self.config['PROFILE_DIR'],
+                                         file_name))
+
+    def report(self, response, total, queries):
+        sql = sum(float(query['time']) for query in queries)
+        # A streaming body is not built yet, so it has no size, and its
+        # preparation and encoding are yet to happen.
+        size = None if response.streaming else len(response.content)
+        timings = [('db', sql), ('prepare', self.prepare),
+                   ('encode', self.encode), ('total', total)]
+        response['Server-Timing'] = ', '.join(
+            '%s;dur=%.2f' % (name, seconds * 1000)
+            for name, seconds in timings)
+        record = dict(('%s_ms' % name, round(seconds * 1000, 3))
+                      for name, seconds in timings)
+        record.update({
+            "resource": self.name, "method": self.request.method,
+            "path": self.request.path, "status": response.status_code,
+            "queries": len(queries), "bytes": size,
+        })
+        logger.info(json.dumps(record, sort_keys=True))
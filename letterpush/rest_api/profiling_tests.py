@@ -0,0 +1,61 @@
+"""Tests of the per-request instrumentation."""
+
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from . import resources
+from . import resources_tests
+
+
+class ProfilingTest(resources_tests.RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        self.article = self.RESOURCE.MODEL(
+            **resources_tests.ArticleTest.make_data())
+        self.article.save()
+
+    def profiled(self, **config):
+        config.setdefault('ENABLED', True)
+        config.setdefault('PROFILE_DIR', self.profile_dir)
+        config.setdefault('PROFILE_HEADER', 'HTTP_X_PROFILE')
+        return override_settings(REST_API_PROFILING=config)
+
+    def test_off_by_default(self):
+        self.request_detail('GET', self.article.id)
+        self.assertNotIn('Server-Timing', self.last_response)
+
+    def test_reports_server_timing_and_logs(self):
+        with self.profiled():
+            with self.assertLogs('rest_api.profiling', 'INFO') as logs:
+                status, _ = self.request_list('GET')
+        self.assertEquals(200, status)
+        timing = self.last_response['Server-Timing']
+        self.assertEquals(['db', 'prepare', 'encode', 'total'], [
+            each.split(';')[0] for each in timing.split(', ')])
+        self.assertIn('"queries": 6', logs.output[0])
+        self.assertIn('"bytes": %d' % len(self.last_response.content),
+                      logs.output[0])
+        self.assertEquals([], os.listdir(self.profile_dir))
+
+    def test_dumps_profile_on_header(self):
+        with self.profiled():
+            with self.assertLogs('rest_api.profiling', 'INFO') as logs:
+                self.request_detail('GET', self.article.id,
+                                    headers={'HTTP_X_PROFILE': '1'})
+        self.assertEquals(1, len(logs.output))
+        self.assertEquals(1, len(os.listdir(self.profile_dir)))
+
+    def test_dumps_sampled_profiles(self):
+        with self.profiled(SAMPLE_RATE=1.0):
+            with self.assertLogs('rest_api.profiling', 'INFO') as logs:
+                self.request_detail('GET', self.article.id)
+        self.assertEquals(1, len(logs.output))
+        self.assertEquals(1, len(os.listdir(self.profile_dir)))
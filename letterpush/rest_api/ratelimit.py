@@ -0,0 +1,185 @@
+"""
+Token-bucket rate limits of the API, per client and endpoint.
+
+Every client has a bucket per resource and kind of request (reads are
+GET, HEAD and OPTIONS; the rest are writes). A bucket holds up to BURST
+tokens and refills at RATE tokens a second; a request takes one, or,
+if there is none, gets a 429 with a Retry-After, before it reaches the
+database. So a client flooding one endpoint with writes gets its own
+429s, while others keep their share of the (single SQLite) writer.
+
+Configured by settings.REST_API_RATE_LIMITS:
+
+    'BACKEND': 'memory' for buckets in process memory, 'django' for
+        buckets in settings.CACHES[ALIAS], shared by the processes if the
+        cache is, or None to not limit.
+    'MAX_SIZE': number of buckets the 'memory' backend keeps.
+    'ALIAS': name of the cache in settings.CACHES for 'django'.
+    'CLIENT_KEY': the request.META key telling clients apart, e.g.
+        'HTTP_X_FORWARDED_FOR' behind proxies.
+    'TRUSTED_PROXIES': how many proxies of ours append to CLIENT_KEY;
+        the address that many from the right counts. Those further left
+        are whatever the client sent, so they would let it pose as many.
+    'READ', 'WRITE': {'RATE': tokens a second, 'BURST': bucket size}.
+    'ENDPOINTS': {resource class name or view name: {'READ' and / or
+        'WRITE'}}, to override the budgets of some endpoints.
+
+Resources are limited in ModelBasedResource.handle(), the plain views
+by the limited() decorator.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+DEFAULTS = {
+    'BACKEND': None,
+    'MAX_SIZE': 100000,
+    'ALIAS': 'default',
+    'CLIENT_KEY': 'REMOTE_ADDR',
+    'TRUSTED_PROXIES': 1,
+    'READ': {'RATE': 50.0, 'BURST': 100},
+    'WRITE': {'RATE': 10.0, 'BURST': 20},
+    'ENDPOINTS': {},
+}
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'REST_API_RATE_LIMITS', {}))
+
+
+def refill(bucket, rate, burst, now):
+    """
+    Take a token from bucket, a (tokens, time) pair or None for a new
+    one; return (the bucket after, seconds to wait or 0 if taken).
+    """
+    tokens, then = bucket or (burst, now)
+    tokens = min(burst, tokens + (now - then) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class MemoryBackend(object):
+    """Keeps up to max_size buckets, the least recently used go first."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        with self._lock:
+            bucket, wait = refill(self._buckets.pop(key, None), rate, burst,
+                                  time.time())
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_size:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class DjangoCacheBackend(object):
+    """
+    Keeps buckets in a Django cache. Reading and writing a bucket is not
+    atomic, so concurrent requests of a client may get a few more through
+    than the budget.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take(self, key, rate, burst):
+        key = 'rest_api:ratelimit:%s' % hashlib.md5(
+            repr(key).encode('utf-8')).hexdigest()
+        bucket, wait = refill(self.cache.get(key), rate, burst, time.time())
+        # Forgotten once it would be full again anyway.
+        self.cache.set(key, bucket, int(burst / rate) + 1)
+        return wait
+
+    def clear(self):
+        self.cache.clear()
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend(config):
+    """Return the configured backend, or None if limiting is off."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = config['BACKEND']
+                if name == 'memory':
+                    _backend = MemoryBackend(config['MAX_SIZE'])
+                elif name == 'django':
+                    _backend = DjangoCacheBackend(config['ALIAS'])
+                elif name is None:
+                    _backend = False  # Checked once, stays off.
+                else:
+                    raise ValueError(
+                        "Unknown REST_API_RATE_LIMITS backend %r" % name)
+    return _backend or None
+
+
+def reset_backend():
+    """Make the next get_backend() re-read the settings."""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def get_client(request, config):
+    addresses = request.META.get(config['CLIENT_KEY'], '').split(',')
+    # With fewer, the request got past some of our proxies.
+    index = max(0, len(addresses) - config['TRUSTED_PROXIES'])
+    return addresses[index].strip()
+
+
+def admit(request, endpoint):
+    """
+    Take a token of the request's bucket for endpoint (a resource class
+    or view name). Return None if admitted, else whole seconds to retry
+    after.
+    """
+    config = get_config()
+    backend = get_backend(config)
+    if backend is None:
+        return None
+    kind = 'READ' if request.method in READ_METHODS else 'WRITE'
+    budget = config['ENDPOINTS'].get(endpoint, {}).get(kind, config[kind])
+    wait = backend.take((get_client(request, config), endpoint, kind),
+                        budget['RATE'], budget['BURST'])
+    if not wait:
+        return None
+    return int(wait) + 1
+
+
+def limited(view):
+    """
+    A decorator that turns the requests of a plain view away with a 429
+    if over their limit, before the view runs; its endpoint is the name.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        retry_after = admit(request, view.__name__)
+        if retry_after is not None:
+            response = JsonResponse({"error": "Too many requests"},
+                                    status=429)
+            response['Retry-After'] = str(retry_after)
+            return response
+        return view(request, *args, **kwargs)
+    return wrapped
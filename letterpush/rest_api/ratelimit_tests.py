@@ -0,0 +1,131 @@
+"""Tests of the rate limits, see ratelimit.py."""
+
+from django.test import SimpleTestCase, TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from . import ratelimit
+from . import resources
+from . import resources_tests
+from .models import Article
+
+
+class RefillTest(SimpleTestCase):
+
+    def test_takes_tokens_then_waits(self):
+        bucket, wait = ratelimit.refill(None, 2.0, 2, 100.0)
+        self.assertEquals(((1.0, 100.0), 0), (bucket, wait))
+        bucket, wait = ratelimit.refill(bucket, 2.0, 2, 100.0)
+        bucket, wait = ratelimit.refill(bucket, 2.0, 2, 100.0)
+        self.assertEquals(0.5, wait)
+        bucket, wait = ratelimit.refill(bucket, 2.0, 2, 100.5)
+        self.assertEquals(((0.0, 100.5), 0), (bucket, wait))
+
+    def test_refills_up_to_burst(self):
+        bucket, _ = ratelimit.refill((0.0, 0.0), 2.0, 2, 100.0)
+        self.assertEquals((1.0, 100.0), bucket)
+
+    def test_memory_backend_forgets_least_recently_used(self):
+        backend = ratelimit.MemoryBackend(2)
+        for key in ('a', 'b', 'a', 'c'):
+            backend.take(key, 1.0, 1)
+        self.assertEquals(['a', 'c'], list(backend._buckets))
+
+
+class ClientTest(SimpleTestCase):
+
+    def get_client(self, forwarded_for, proxies):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR=forwarded_for)
+        return ratelimit.get_client(request, dict(
+            ratelimit.DEFAULTS, CLIENT_KEY='HTTP_X_FORWARDED_FOR',
+            TRUSTED_PROXIES=proxies))
+
+    def test_takes_address_our_proxies_saw(self):
+        self.assertEquals('10.0.0.9',
+                          self.get_client('1.2.3.4, 10.0.0.9', 1))
+        self.assertEquals('10.0.0.9',
+                          self.get_client('1.2.3.4, 10.0.0.9, 10.1.1.1', 2))
+
+    def test_ignores_spoofed_addresses(self):
+        clients = set(self.get_client('%d.0.0.1, 10.0.0.9' % index, 1)
+                      for index in range(5))
+        self.assertEquals(set(['10.0.0.9']), clients)
+        self.assertEquals('10.0.0.9', self.get_client('10.0.0.9', 2))
+
+
+LIMITS = {
+    'BACKEND': 'memory',
+    'READ': {'RATE': 0.001, 'BURST': 2},
+    'WRITE': {'RATE': 0.001, 'BURST': 1},
+    'ENDPOINTS': {'ImageLinkResource': {'WRITE': {'RATE': 0.001,
+                                                  'BURST': 0}}},
+}
+
+
+@override_settings(REST_API_RATE_LIMITS=LIMITS)
+class RateLimitTest(resources_tests.RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        ratelimit.reset_backend()
+        self.addCleanup(ratelimit.reset_backend)
+
+    def test_rejects_over_limit_without_queries(self):
+        for _ in range(2):
+            status, _ = self.request_list('GET')
+            self.assertEquals(200, status)
+        with self.assertNumQueries(0):
+            status, content = self.request_list('GET')
+        self.assertEquals(429, status)
+        self.assertEquals("Too many requests", content["error"])
+        self.assertEquals('1000', self.last_response['Retry-After'])
+
+    def test_separates_reads_writes_and_clients(self):
+        status, _ = self.request_list(
+            'POST', resources_tests.ArticleTest.make_data())
+        self.assertEquals(201, status)
+        status, _ = self.request_list(
+            'POST', resources_tests.ArticleTest.make_data())
+        self.assertEquals(429, status)
+        status, _ = self.request_list('GET')
+        self.assertEquals(200, status)
+        status, _ = self.request_list(
+            'POST', resources_tests.ArticleTest.make_data(),
+            headers={'REMOTE_ADDR': '10.0.0.2'})
+        self.assertEquals(201, status)
+
+    def test_endpoint_budgets(self):
+        self.RESOURCE = resources.ImageLinkResource
+        self.BASE_URI = '/image_links/'
+        status, _ = self.request_list('POST', {})
+        self.assertEquals(429, status)
+        status, _ = self.request_list('GET')
+        self.assertEquals(200, status)
+
+    def test_limits_plain_views(self):
+        article = Article.objects.create(title="Title", body="")
+        url = '/api/articles/%d/bundle/' % article.id
+        statuses = [self.client.get(url).status_code for _ in range(3)]
+        self.assertEquals([200, 200, 429], statuses)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEquals(429, response.status_code)
+        self.assertEquals('1000', response['Retry-After'])
+        # Its own budget, apart from the other views and resources.
+        self.assertEquals(
+            200, self.client.get('/api/_stats/cache/').status_code)
+        self.assertEquals(200, self.request_list('GET')[0])
+
+    @override_settings(REST_API_RATE_LIMITS=dict(LIMITS, BACKEND='django'))
+    def test_django_cache_backend(self):
+        ratelimit.reset_backend()
+        self.addCleanup(ratelimit.get_backend(ratelimit.get_config()).clear)
+        statuses = [self.request_list('GET')[0] for _ in range(3)]
+        self.assertEquals([200, 200, 429], statuses)
+
+    @override_settings(REST_API_RATE_LIMITS=dict(LIMITS, BACKEND=None))
+    def test_off(self):
+        ratelimit.reset_backend()
+        statuses = [self.request_list('GET')[0] for _ in range(3)]
+        self.assertEquals([200, 200, 200], statuses)
@@ -6,56 +6,654 @@ directly by a POST request to the same URL. This is to save a round-trip.
 Anything under "related_resources" is not updatable.
 """
 
+import calendar
+import datetime
+import hashlib
+import re
+from collections import defaultdict, namedtuple
+
+from django.conf.urls import url
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
 from django.db import IntegrityError
+from django.db import connection
 from django.db import transaction
+from django.db.models import Count, Max
+from django.db.models.signals import post_save
+from django.http import HttpResponseNotModified, StreamingHttpResponse
+from django.utils import six
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.csrf import csrf_exempt
 
 from restless.dj import DjangoResource
-from restless.preparers import FieldsPreparer
+from restless.resources import skip_prepare
 
-from .models import Article, Image, ImageLink
+from . import cache
+from . import compression
+from . import pagination
+from . import preparers
+from . import profiling
+from . import ratelimit
+from . import search
+from . import serializers
+from . import validation
+from .models import (
+    Article, Image, ImageLink, SearchTerm, Tombstone, batch_link_changes)
 
 
 class RequestError(Exception):
     """Allow to pass custom status in an exception, as Restless expects."""
-    def __init__(self, message, status=500):
+    def __init__(self, message, status=500, details=None):
         super(self.__class__, self).__init__(message)
         self.status = status
+        self.details = details  # Anything JSON-serializable, if not None.
+
+
+# Columns a unique constraint failed on, as SQLite and PostgreSQL say.
+UNIQUE_COLUMNS_RES = (
+    re.compile(r'UNIQUE constraint failed: (.*)$'),
+    re.compile(r'Key \(([^)]*)\)=\(.*\) already exists'),
+)
+
+
+def integrity_error_details(error):
+    """Return an IntegrityError as {field name: [messages]}, if we can."""
+    message = six.text_type(error)
+    for regex in UNIQUE_COLUMNS_RES:
+        match = regex.search(message)
+        if match is not None:
+            columns = [column.strip().split('.')[-1]
+                       for column in match.group(1).split(',')]
+            return validation.unique_error(columns).message_dict
+    return {NON_FIELD_ERRORS: [message]}
 
 
 def with_integrity_error_400(func):
     """
-    A decorator that raises RequestError(status=400) on IntegrityError.
-    On an create / update operation, it's likely bad data, not a server's fault.
+    A decorator that raises RequestError(status=400) on IntegrityError
+    or ValidationError. On an create / update operation, it's likely bad
+    data, not a server's fault. The details say what is wrong with which
+    field.
     """
-    # NOTE: the validation error message ends up being a JSON string.
-    # This is not nice, but fixing it is out of scope for now.
     def wrapped(*args, **kwargs):
         try:
             return func(*args, **kwargs)
         except IntegrityError as e:
-            raise RequestError(str(e), status=400)
+            raise RequestError("Conflicts with existing data", status=400,
+                               details=integrity_error_details(e))
+        except ValidationError as e:
+            raise RequestError("Invalid data", status=400,
+                               details=validation.error_details(e))
     return wrapped
 
 
+def with_batched_link_changes(func):
+    """
+    A decorator that has the receivers of link changes run once for all
+    the links the call saves or deletes, see models.batch_link_changes().
+    """
+    def wrapped(*args, **kwargs):
+        with batch_link_changes():
+            return func(*args, **kwargs)
+    return wrapped
+
+
+def is_not_modified(request, etag, last_modified):
+    """Tell if the request's If-None-Match or If-Modified-Since hold."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:  # Takes precedence over If-Modified-Since.
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags or 'W/' + etag in tags
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return (if_modified_since is not None and last_modified is not None
+            and last_modified <= if_modified_since)
+
+
+# A detail ETag, weak if compressed; see get_validators().
+DETAIL_ETAG_RE = re.compile(r'^(?:W/)?"(\d+)-[0-9a-f]+"$')
+
+
+def get_if_match(request):
+    """
+    Return the `updated` versions, in microseconds, the request's
+    If-Match allows, or None if any goes (no If-Match, or "*").
+    """
+    if_match = request.META.get('HTTP_IF_MATCH', '').strip()
+    if not if_match or if_match == '*':
+        return None
+    versions = set()
+    for tag in if_match.split(','):
+        match = DETAIL_ETAG_RE.match(tag.strip())
+        if match is not None:
+            versions.add(int(match.group(1)))
+    return versions  # Empty if none is ours: matches nothing.
+
+
+# Stands for an object asked for by ?ids= that does not exist.
+NotFound = namedtuple('NotFound', ['id'])
+
+
+def microseconds(moment):
+    """Return an aware datetime as microseconds since the epoch."""
+    return (calendar.timegm(moment.utctimetuple()) * 1000000 +
+            moment.microsecond)
+
+
 class ModelBasedResource(DjangoResource):
 
     # Set MODEL to the Django model we're basing off.
     # Set UPDATABLE_FILEDS to a set of names of tields that can be updated.
+    # Set validator to a validation.CompiledValidator of UPDATABLE_FIELDS.
+    # Set DERIVED_FIELDS to the names of fields Model.clean() may change.
+    DERIVED_FIELDS = ()
+
+    # Set preparer to a preparers.CompiledPreparer of MODEL; GET reads
+    # just its columns, as rows instead of instances, see get_rows().
+
+    serializer = serializers.CompactJSONSerializer()
+
+    # Batches of objects go to <things>/bulk/, see bulk_create() & co.
+    http_methods = dict(DjangoResource.http_methods, bulk={
+        'POST': 'bulk_create',
+        'PUT': 'bulk_update',
+        'DELETE': 'bulk_delete',
+    })
+    status_map = dict(DjangoResource.status_map,
+                      bulk_create=201, bulk_update=202, bulk_delete=204)
+    MAX_BULK_SIZE = 500
+
+    # Set CACHE_REPRESENTATIONS to keep prepare() results in cache.py.
+    CACHE_REPRESENTATIONS = False
+    _cached = {}  # Filled by preload().
 
-    # NOTE: creating the preparer from a field list would require a metaclass.
-    # Can live without it for now.
+    # Lists are paginated by this key, see pagination.py.
+    # ('updated', 'id') would work as well.
+    PAGE_KEY = ('id',)
+    # ?ordering=<name> pages by another key instead, see get_page_key().
+    ORDERINGS = {
+        'id': ('id',),
+        '-id': ('-id',),
+        'updated': ('updated', 'id'),
+        '-updated': ('-updated', '-id'),
+    }
+    DEFAULT_PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 500  # Whatever the client asks for.
+    # GET <things>/?ids=1,2,3 gets these objects, see list_by_ids().
+    MAX_IDS = 100
+
+    page_meta = None  # Filled by paginate().
+    streaming = False  # Set by list() if it returns chunks to stream.
+
+    # Set STREAMABLE to allow GET <things>/?stream=1, which returns all of
+    # the list unpaginated, but built and sent STREAM_CHUNK_SIZE rows at a
+    # time, so memory use does not depend on the list size.
+    STREAMABLE = False
+    STREAM_CHUNK_SIZE = 500
+
+    # GET <things>/?<filter>=<value> narrows lists down. Set FILTERS to
+    # the names allowed: a field name with an optional lookup out of
+    # FILTER_LOOKUPS, e.g. 'role' or 'updated__gte'. Mind the indexes.
+    FILTERS = ()
+    FILTER_LOOKUPS = ('', 'gt', 'gte', 'lt', 'lte', 'startswith')
+
+    # ?fields=id,title sends only these fields of the objects, and
+    # ?embed=none (or some of EMBEDS) only these related_resources,
+    # see select_fields(). Neither reads what it does not send.
+    EMBEDS = ()
+    embeds = None  # None means all of EMBEDS.
+    sparse = False  # Whether some of the representation is left out.
+
+    def get_queryset(self):
+        """All of the objects GET can see."""
+        return self.MODEL.objects.all()
+
+    def filter_queryset(self, queryset):
+        """Apply FILTERS given in the query string to queryset."""
+        for name in self.FILTERS:
+            value = self.request.GET.get(name)
+            if value is None:
+                continue
+            field_name, _, lookup = name.partition('__')
+            assert lookup in self.FILTER_LOOKUPS, name
+            field = self.MODEL._meta.get_field(field_name)
+            if field.is_relation:  # E.g. 'image_id' takes an Image id.
+                field = field.target_field
+            try:
+                value = field.to_python(value)
+            except ValidationError as e:
+                raise RequestError("Bad %s: %s" % (name, " ".join(e.messages)),
+                                   status=400)
+            if (isinstance(value, datetime.datetime) and
+                    timezone.is_naive(value)):
+                value = timezone.make_aware(value, timezone.utc)
+            if lookup == 'startswith':
+                queryset = self.filter_prefix(queryset, field_name, value)
+            else:
+                queryset = queryset.filter(**{name: value})
+        return queryset
+
+    def filter_prefix(self, queryset, field_name, prefix):
+        """
+        Filter by field_name__startswith=prefix. SQLite cannot use an index
+        for that LIKE, so also give it a range to walk the index by.
+        PostgreSQL has a varchar_pattern_ops index on indexed CharFields.
+        """
+        queryset = queryset.filter(**{field_name + '__startswith': prefix})
+        if prefix and connection.vendor == 'sqlite':
+            upper = prefix[:-1] + six.unichr(ord(prefix[-1]) + 1)
+            queryset = queryset.filter(**{field_name + '__gte': prefix,
+                                          field_name + '__lt': upper})
+        return queryset
+
+    def get_page_key(self):
+        """Return the key to page by, PAGE_KEY unless ?ordering= is given."""
+        name = self.request.GET.get('ordering')
+        if name is None:
+            return self.PAGE_KEY
+        if name not in self.ORDERINGS:
+            raise RequestError("Cannot order by %s" % name, status=400)
+        return self.ORDERINGS[name]
+
+    def get_columns(self):
+        """Columns to prepare, page through and cache objects by."""
+        columns = list(self.preparer.columns)
+        names = pagination.field_names(self.get_page_key())
+        for name in ('id', 'updated') + names:
+            if name not in columns:
+                columns.append(name)
+        return columns
+
+    def get_rows(self, queryset):
+        """Return a list of preparers.Row of queryset, to prepare()."""
+        return preparers.read_rows(queryset, self.get_columns())
+
+    # GET <things>/?updated_since=<ISO 8601> lists changes in the order
+    # they were made, including deletions, see list_changes().
+    CHANGES_KEY = ('updated', 'id')
 
     # Dataset for GET <things>/
     def list(self):
-        return self.MODEL.objects.all()
+        ids = self.get_requested_ids()
+        if ids is not None:
+            return self.list_by_ids(ids)
+        since = self.request.GET.get('updated_since')
+        if since is not None:
+            return self.list_changes(since)
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.is_streaming():
+            self.streaming = True
+            return self.iterate_chunks(queryset)
+        instances = self.paginate(queryset)
+        self.preload(instances)
+        return instances
+
+    def get_requested_ids(self):
+        """Return the ids listed by ?ids=, or None if there is none."""
+        param = self.request.GET.get('ids')
+        if param is None:
+            return None
+        try:
+            ids = [int(each) for each in param.split(',') if each.strip()]
+        except ValueError:
+            raise RequestError("ids must be integers", status=400)
+        if not ids:
+            raise RequestError("No ids", status=400)
+        if len(ids) > self.MAX_IDS:
+            raise RequestError("Cannot get more than %d ids" % self.MAX_IDS,
+                               status=400)
+        return ids
+
+    def list_by_ids(self, ids):
+        """
+        Return the objects of ids in their order, in one query, with a
+        NotFound in place of each one that does not exist (or is filtered
+        out).
+        """
+        rows = self.get_rows(self.filter_queryset(
+            self.get_queryset()).filter(id__in=set(ids)))
+        self.preload(rows)
+        by_id = dict((row.id, row) for row in rows)
+        return [by_id.get(pk) or NotFound(pk) for pk in ids]
 
     # Dataset for GET <things>/<pk>/
     def detail(self, pk):
-        return self.MODEL.objects.get(id=pk)
+        rows = self.get_rows(self.get_queryset().filter(id=pk))
+        if not rows:
+            raise self.MODEL.DoesNotExist(
+                "%s matching query does not exist." %
+                self.MODEL._meta.object_name)
+        self.preload(rows)
+        return rows[0]
+
+    def handle(self, endpoint, *args, **kwargs):
+        """
+        Turn the request away if over its rate limit, see ratelimit.py.
+        Profile the request if asked to, see profiling.py.
+        """
+        retry_after = ratelimit.admit(self.request, self.__class__.__name__)
+        if retry_after is not None:
+            response = self.handle_error(
+                RequestError("Too many requests", status=429))
+            response['Retry-After'] = str(retry_after)
+            return response
+        try:
+            self.select_fields()
+        except RequestError as err:
+            return self.handle_error(err)
+        config = profiling.get_config()
+        if config is None:
+            return self.handle_conditional(endpoint, *args, **kwargs)
+        profile = profiling.RequestProfile(config, self.request, '%s.%s' % (
+            self.__class__.__name__, endpoint))
+        self.serializer = profiling.TimedSerializer(self.serializer, profile)
+        self.preparer = profiling.TimedPreparer(self.preparer, profile)
+        return profile.run(self.handle_conditional, endpoint, *args, **kwargs)
+
+    def select_fields(self):
+        """Narrow down the preparer and embeds to ?fields= and ?embed=."""
+        def names_in(param, choices):
+            names = [name.strip() for name in param.split(',')
+                     if name.strip()]
+            unknown = set(names) - set(choices)
+            if unknown:
+                raise RequestError("Unknown name(s) %s" %
+                                   ", ".join(sorted(unknown)), status=400)
+            return names
+        fields = self.request.GET.get('fields')
+        if fields is not None:
+            names = names_in(fields, self.preparer.fields)
+            if not names:
+                raise RequestError("No fields selected", status=400)
+            self.sparse = len(set(names)) < len(self.preparer.fields)
+            self.preparer = self.preparer.select(names)
+        embed = self.request.GET.get('embed')
+        if embed is not None:
+            self.embeds = tuple(
+                [] if embed == 'none' else names_in(embed, self.EMBEDS))
+            self.sparse = self.sparse or set(self.embeds) != set(self.EMBEDS)
+
+    def is_embedded(self, name):
+        """Tell if related_resources should include name."""
+        return self.embeds is None or name in self.embeds
+
+    def handle_conditional(self, endpoint, *args, **kwargs):
+        """Answer conditional GETs without loading any objects if we can."""
+        if (self.request_method() != 'GET' or
+                endpoint not in ('list', 'detail') or
+                not self.is_authenticated()):
+            return super(ModelBasedResource, self).handle(
+                endpoint, *args, **kwargs)
+        try:
+            etag, last_modified = self.get_validators(endpoint, **kwargs)
+        except Exception as err:
+            return self.handle_error(err)
+        if etag is not None and self.is_not_modified(etag, last_modified):
+            response = HttpResponseNotModified()
+        else:
+            response = super(ModelBasedResource, self).handle(
+                endpoint, *args, **kwargs)
+        if etag is not None and response.status_code in (200, 304):
+            if response.has_header('Content-Encoding'):
+                etag = 'W/' + etag  # Not the same bytes as uncompressed.
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    # Reverse relations whose changes show up in our representation.
+    VERSIONED_RELATIONS = ()
+
+    def get_versions(self, queryset):
+        """
+        Return a list of (count, last updated) of everything whose change
+        changes the representation of queryset: the queryset itself, then
+        each of VERSIONED_RELATIONS. This is one aggregate query; no objects
+        get loaded.
+        """
+        relations = self.VERSIONED_RELATIONS
+        aggregates = {'count': Count('id', distinct=bool(relations)),
+                      'last': Max('updated')}
+        for index, relation in enumerate(relations):
+            aggregates['count%d' % index] = Count(relation, distinct=True)
+            aggregates['last%d' % index] = Max(relation + '__updated')
+        version = queryset.aggregate(**aggregates)
+        return [(version["count"], version["last"])] + [
+            (version['count%d' % index], version['last%d' % index])
+            for index in range(len(relations))]
+
+    def get_table_versions(self):
+        """
+        Return (last updated, last deleted) of MODEL, then of the model of
+        each of VERSIONED_RELATIONS: any change to these tables moves one
+        of them. Each is a lookup at the end of an index, so it costs the
+        same whatever the size of the tables, unlike get_versions() of a
+        whole list. Whole tables, not the filtered list, since an object
+        updated out of the filter would not move the filtered maximum.
+        """
+        models = [self.MODEL] + [
+            self.MODEL._meta.get_field(name).related_model
+            for name in self.VERSIONED_RELATIONS]
+        return [
+            (model.objects.order_by('-updated').values_list(
+                'updated', flat=True).first(),
+             Tombstone.objects.filter(model=model._meta.label_lower).order_by(
+                 '-deleted').values_list('deleted', flat=True).first())
+            for model in models]
+
+    def get_validators(self, endpoint, pk=None):
+        """
+        Return (ETag, Last-Modified timestamp) for a GET of endpoint,
+        or (None, None) if there's nothing to GET, or nothing cheap to
+        tell a change by.
+        A detail ETag starts with its `updated` in microseconds.
+        """
+        if endpoint == 'detail':
+            versions = self.get_versions(self.get_queryset().filter(id=pk))
+            if not versions[0][0]:
+                return None, None  # Let detail() report it missing.
+        elif self.get_requested_ids() is not None:  # Only these count.
+            versions = self.get_versions(self.get_queryset().filter(
+                id__in=set(self.get_requested_ids())))
+        elif self.request.GET.get('updated_since') is not None:
+            return None, None  # A feed costs what its changes do; no more.
+        else:
+            versions = self.get_table_versions()
+        moments = [each for version in versions for each in version
+                   if isinstance(each, datetime.datetime)]
+        digest = hashlib.md5(repr((
+            self.MODEL._meta.label_lower, endpoint, pk,
+            sorted(self.request.GET.lists()),
+            [tuple(each.isoformat() if isinstance(each, datetime.datetime)
+                   else each for each in version) for version in versions],
+        )).encode('utf-8')).hexdigest()
+        if not moments:
+            return '"%s"' % digest, None
+        last_modified = calendar.timegm(max(moments).utctimetuple())
+        if endpoint == 'detail':
+            digest = '%d-%s' % (microseconds(versions[0][1]), digest)
+        return '"%s"' % digest, last_modified
+
+    def is_not_modified(self, etag, last_modified):
+        return is_not_modified(self.request, etag, last_modified)
+
+    def get_page_size(self):
+        """Return the page size requested by ?limit=, capped."""
+        try:
+            limit = int(self.request.GET.get('limit', self.DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise RequestError("Limit must be an integer", status=400)
+        if limit < 1:
+            raise RequestError("Limit must be positive", status=400)
+        return min(limit, self.MAX_PAGE_SIZE)
+
+    def paginate(self, queryset):
+        """
+        Return a page of queryset as a list, as requested by ?cursor= and
+        ?limit=, and fill in page_meta with tokens to the adjacent pages.
+        """
+        key = self.get_page_key()
+        limit = self.get_page_size()
+        token = self.request.GET.get('cursor')
+        backwards = False
+        if token:
+            try:
+                values, backwards = pagination.decode_cursor(
+                    token, key, self.MODEL)
+            except pagination.InvalidCursor as e:
+                raise RequestError(str(e), status=400)
+            queryset = queryset.filter(
+                pagination.after(key, values, backwards))
+        queryset = queryset.order_by(*pagination.ordering(key, backwards))
+        rows = self.get_rows(queryset[:limit + 1])  # One more, if any.
+        has_more = len(rows) > limit
+        del rows[limit:]
+        if backwards:
+            rows.reverse()
+        has_next = has_more if not backwards else bool(token)
+        has_prev = has_more if backwards else bool(token)
+        names = pagination.field_names(key)
 
-    def ensure_no_extra_fields(self):
+        def cursor_at(row, backwards):
+            values = [getattr(row, name) for name in names]
+            return pagination.encode_cursor(key, values, backwards)
+
+        self.page_meta = {
+            "limit": limit,
+            "next": cursor_at(rows[-1], False) if rows and has_next else None,
+            "prev": cursor_at(rows[0], True) if rows and has_prev else None,
+        }
+        return rows
+
+    def list_changes(self, since):
+        """
+        Return a page of objects updated and deleted since the given time,
+        walked by (updated, id), with a "next" cursor to resume from even
+        after the last page. Deleted objects come as tombstones, see
+        prepare_tombstone(). Both are found by index, so the cost depends
+        on the number of changes, not on the size of the table.
+        """
+        since = parse_datetime(since)
+        if since is None:
+            raise RequestError("updated_since must be an ISO 8601 datetime",
+                               status=400)
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, timezone.utc)
+        key = self.CHANGES_KEY
+        limit = self.get_page_size()
+        token = self.request.GET.get('cursor')
+        updated = self.get_queryset().filter(updated__gte=since)
+        deleted = Tombstone.objects.filter(
+            model=self.MODEL._meta.label_lower, deleted__gte=since)
+        if token:
+            try:
+                values, _ = pagination.decode_cursor(token, key, self.MODEL)
+            except pagination.InvalidCursor as e:
+                raise RequestError(str(e), status=400)
+            updated = updated.filter(pagination.after(key, values))
+            deleted = deleted.filter(pagination.after(
+                ('deleted', 'object_id'), values))
+        updated = self.get_rows(updated.order_by(*key)[:limit + 1])
+        deleted = list(deleted.order_by('deleted', 'object_id')[:limit + 1])
+        changes = sorted(
+            [((each.updated, each.id), each) for each in updated] +
+            [((each.deleted, each.object_id), each) for each in deleted],
+            key=lambda change: change[0])
+        has_more = len(changes) > limit
+        del changes[limit:]
+        if changes:
+            token = pagination.encode_cursor(key, changes[-1][0])
+        self.page_meta = {"limit": limit, "next": token, "prev": None,
+                          "has_more": has_more}
+        page = [change for _, change in changes]
+        self.preload([each for each in page
+                      if not isinstance(each, Tombstone)])
+        return page
+
+    def is_streaming(self):
+        """Tell if the list was requested (and allowed) to be streamed."""
+        if self.request.GET.get('stream') not in ('1', 'true'):
+            return False
+        if not self.STREAMABLE:
+            raise RequestError("Cannot stream this list", status=400)
+        return True
+
+    def iterate_chunks(self, queryset):
+        """
+        Yield lists of up to STREAM_CHUNK_SIZE rows of queryset,
+        walking it by its page key, so each chunk is a cheap keyset query.
+        """
+        key = self.get_page_key()
+        names = pagination.field_names(key)
+        size = self.STREAM_CHUNK_SIZE
+        queryset = queryset.order_by(*pagination.ordering(key))
+        chunk = self.get_rows(queryset[:size])
+        while chunk:
+            yield chunk
+            if len(chunk) < size:
+                break
+            values = [getattr(chunk[-1], name) for name in names]
+            chunk = self.get_rows(
+                queryset.filter(pagination.after(key, values))[:size])
+
+    def serialize_list(self, data):
+        if not self.streaming:  # ?ids= and changes are bounded pages.
+            return super(ModelBasedResource, self).serialize_list(data)
+        return self.stream_list(data)
+
+    def stream_list(self, chunks):
+        """
+        Yield pieces of the same JSON serialize_list() would make, one
+        piece per object.
+        """
+        item_separator, key_separator = self.serializer.get_separators()
+        yield '{"objects"' + key_separator + '['
+        separator = ''
+        for chunk in chunks:
+            self.preload(chunk)
+            for instance in chunk:
+                yield separator + self.serializer.serialize(
+                    self.prepare(instance))
+                separator = item_separator
+        yield ']}'
+
+    def build_response(self, data, status=200):
+        if isinstance(data, (six.text_type, bytes)):
+            response = super(ModelBasedResource, self).build_response(
+                data, status)
+        else:
+            response = StreamingHttpResponse(
+                data, content_type='application/json')
+            response.status_code = status
+        return compression.compress_response(self.request, response)
+
+    def wrap_list_response(self, data):
+        wrapped = super(ModelBasedResource, self).wrap_list_response(data)
+        if self.page_meta is not None:
+            wrapped["meta"] = self.page_meta
+        return wrapped
+
+    @classmethod
+    def urls(cls, name_prefix=None):
+        bulk_url = url(r'^bulk/$', csrf_exempt(cls.as_view('bulk')),
+                       name=cls.build_url_name('bulk', name_prefix))
+        return [bulk_url] + list(
+            super(ModelBasedResource, cls).urls(name_prefix))
+
+    def build_error(self, err):
+        details = getattr(err, 'details', None)
+        if details is None:
+            return super(ModelBasedResource, self).build_error(err)
+        data = {'error': six.text_type(err), 'details': details}
+        return self.build_response(self.serializer.serialize(data),
+                                   status=err.status)
+
+    def ensure_no_extra_fields(self, data=None):
         """Raise a bad request"""
-        extra_fields = set(self.data) - self.UPDATABLE_FIELDS
+        if data is None:
+            data = self.data
+        extra_fields = set(data) - self.UPDATABLE_FIELDS
         if extra_fields:
             raise RequestError(
                 "Cannot accept field(s) %s" % ", ".join(extra_fields),
@@ -66,41 +664,249 @@ class ModelBasedResource(DjangoResource):
     def create(self, *args, **kwargs):
         self.ensure_no_extra_fields()
         thing = self.MODEL(**self.data)
-        thing.full_clean()  # Run model's validators.
+        self.validator.validate(thing)  # Uniqueness is left to the DB.
         thing.save()
         return thing
 
     @with_integrity_error_400
     @transaction.atomic
     def update(self, *args, **kwargs):
+        """
+        With If-Match, save only if the object is still at a version the
+        client names, by one conditional UPDATE; else 412.
+        """
         self.ensure_no_extra_fields()
+        versions = get_if_match(self.request)
         try:
             thing = self.MODEL.objects.filter(id=kwargs["pk"]).get()
-            for attr_name, value in self.data.items():
-                setattr(thing, attr_name, value)
-            thing.full_clean()  # Run model's validators.
-            thing.save()
-            return thing
         except self.MODEL.DoesNotExist as e:
             raise RequestError(str(e), status=404)  # Not Found
+        if versions is None:
+            thing.save(update_fields=self.apply_changes(thing, self.data))
+            return thing
+        if microseconds(thing.updated) not in versions:
+            raise RequestError("Changed since the If-Match version",
+                               status=412)  # Precondition Failed
+        read_version = thing.updated
+        fields = self.apply_changes(thing, self.data)
+        if not self.save_if_unchanged(thing, fields, read_version):
+            raise RequestError("Changed since the If-Match version",
+                               status=412)
+        return thing
+
+    def save_if_unchanged(self, thing, fields, version):
+        """
+        Save fields of thing in one UPDATE if its `updated` is still
+        version; tell if it was. The database locks the row for the
+        UPDATE only, not from the read before. Sends post_save as save()
+        would.
+        """
+        thing.updated = timezone.now()  # What auto_now would do.
+        saved = self.MODEL.objects.filter(
+            id=thing.pk, updated=version).update(
+            **dict((name, getattr(thing, name)) for name in fields))
+        if saved:
+            post_save.send(sender=self.MODEL, instance=thing, created=False,
+                           update_fields=frozenset(fields), raw=False,
+                           using=connection.alias)
+        return bool(saved)
 
     @with_integrity_error_400
     @transaction.atomic
     def delete(self, *args, **kwargs):
-        delete_count, _ = self.MODEL.objects.filter(id=kwargs['pk']).delete()
+        _, counts = self.MODEL.objects.filter(id=kwargs['pk']).delete()
+        delete_count = counts.get(self.MODEL._meta.label, 0)  # No cascades.
         if delete_count != 1:
             raise RequestError("Got %d objects" % delete_count, status=404)
 
+    def apply_changes(self, thing, changes, related=None):
+        """
+        Set changes on thing, validate the ones that change it, and return
+        the names of the fields to save. related is for a batch, see
+        validation.CompiledValidator.find_related().
+        """
+        changed = [name for name, value in changes.items()
+                   if getattr(thing, name) != value]
+        for name in changed:
+            setattr(thing, name, changes[name])
+        self.validator.validate(thing, changed, related)
+        return changed + ['updated'] + list(self.DERIVED_FIELDS)
+
+    def get_bulk_items(self):
+        """Return the request data as a list of items, or raise."""
+        if not isinstance(self.data, list) or not self.data:
+            raise RequestError("Expected a non-empty list", status=400)
+        if len(self.data) > self.MAX_BULK_SIZE:
+            raise RequestError(
+                "Cannot accept more than %d items" % self.MAX_BULK_SIZE,
+                status=400)
+        return self.data
+
+    def check_bulk_items(self, items, check):
+        """
+        Run check(item) on every item, collect errors the way
+        with_integrity_error_400 would report them for a single item,
+        and raise them all in one bad request. Return check() results.
+        """
+        results, errors = [], []
+        for index, item in enumerate(items):
+            try:
+                results.append(check(item))
+            except (RequestError, IntegrityError) as e:
+                errors.append({"index": index, "error": str(e)})
+            except ValidationError as e:
+                errors.append({"index": index, "error": "Invalid data",
+                               "details": validation.error_details(e)})
+        if errors:
+            raise RequestError("Invalid items, none were saved",
+                               status=400, details=errors)
+        return results
+
+    def get_bulk_ids(self, items):
+        """Ensure every item is an integer id; no duplicates."""
+        def check_id(pk):
+            if not isinstance(pk, six.integer_types):
+                raise RequestError("Expected an integer id", status=400)
+            return pk
+        ids = self.check_bulk_items(items, check_id)
+        if len(set(ids)) != len(ids):
+            raise RequestError("Repeated ids", status=400)
+        return ids
+
+    def prepare_bulk(self, things):
+        self.preload(things)
+        return {"objects": [self.prepare(thing) for thing in things]}
+
+    @skip_prepare
+    @with_integrity_error_400
+    @transaction.atomic
+    @with_batched_link_changes
+    def bulk_create(self):
+        """Create all objects in the list, or none of them."""
+        items = self.get_bulk_items()
+        related = self.validator.find_related(items)
+
+        def build(item):
+            if not isinstance(item, dict):
+                raise RequestError("Expected an object", status=400)
+            self.ensure_no_extra_fields(item)
+            thing = self.MODEL(**item)
+            self.validator.validate(thing, related=related)
+            return thing
+        things = self.check_bulk_items(items, build)
+        self.check_bulk_items(things, self.validator.check_unique(things))
+        if getattr(connection.features,
+                   'can_return_ids_from_bulk_insert', False):
+            things = self.MODEL.objects.bulk_create(things)
+        elif connection.vendor == 'sqlite':
+            # SQLite lets one writer at a time, and we're in a transaction,
+            # so whatever gets ids above the current maximum is ours.
+            last = self.MODEL.objects.order_by('-id').values_list(
+                'id', flat=True).first() or 0
+            self.MODEL.objects.bulk_create(things)
+            things = list(self.MODEL.objects.filter(
+                id__gt=last).order_by('id'))
+        else:  # Can't find out the ids; at least keep it one transaction.
+            for thing in things:
+                thing.save()
+            return self.prepare_bulk(things)
+        for thing in things:  # Bulk inserts send no signals by themselves.
+            post_save.send(sender=self.MODEL, instance=thing, created=True,
+                           update_fields=None, raw=False,
+                           using=connection.alias)
+        return self.prepare_bulk(things)
+
+    @skip_prepare
+    @with_integrity_error_400
+    @transaction.atomic
+    @with_batched_link_changes
+    def bulk_update(self):
+        """Update all objects in the list by "id", or none of them."""
+        items = self.get_bulk_items()
+        ids = self.get_bulk_ids([
+            item.get("id") if isinstance(item, dict) else None
+            for item in items])
+        existing = self.MODEL.objects.in_bulk(ids)
+        related = self.validator.find_related(items)
+
+        def apply(item):
+            changes = dict(item)
+            thing = existing.get(changes.pop("id"))
+            if thing is None:
+                raise RequestError("No such object", status=404)
+            self.ensure_no_extra_fields(changes)
+            return thing, self.apply_changes(thing, changes, related)
+        updates = self.check_bulk_items(items, apply)
+        # NOTE: no QuerySet.bulk_update() before Django 2.2.
+        for thing, fields in updates:
+            thing.save(update_fields=fields)
+        return self.prepare_bulk([thing for thing, _ in updates])
+
+    @with_integrity_error_400
+    @transaction.atomic
+    @with_batched_link_changes
+    def bulk_delete(self):
+        """Delete all objects with ids in the list, or none of them."""
+        ids = self.get_bulk_ids(self.get_bulk_items())
+        existing = set(self.MODEL.objects.filter(
+            id__in=ids).values_list('id', flat=True))
+
+        def check_exists(pk):
+            if pk not in existing:
+                raise RequestError("No such object", status=404)
+        self.check_bulk_items(ids, check_exists)
+        self.MODEL.objects.filter(id__in=ids).delete()
+
+    def is_cached(self):
+        """Tell if representations go through the cache; whole ones do."""
+        return self.CACHE_REPRESENTATIONS and not self.sparse
+
+    def preload(self, instances):
+        """
+        Get ready to prepare() instances: pick their representations from
+        the cache, and batch-load related data for the rest.
+        """
+        self._cached = {}
+        if self.is_cached():
+            for instance in instances:
+                prepared = cache.get(self.MODEL, instance.id, instance.updated)
+                if prepared is not None:
+                    self._cached[instance.id] = prepared
+        self.prefetch_related_data(
+            [each for each in instances if each.id not in self._cached])
+
+    def prefetch_related_data(self, instances):
+        """
+        Batch-load whatever get_related_data() needs for all of instances.
+        Called once per page, so that preparing it does not cost a query
+        per object.
+        """
+        pass  # Nothing related to load by default.
+
     def get_related_data(self, instance):
         """Return a dict of related_data to the object representation."""
         return None  # None means adding nothing.
 
+    def prepare_tombstone(self, tombstone):
+        """Represent a deleted object in the "changes since" feeds."""
+        return {"id": tombstone.object_id, "updated": tombstone.deleted,
+                "deleted": True}
+
     def prepare(self, instance):
         """Turns a model into a serializable representation."""
+        if isinstance(instance, Tombstone):
+            return self.prepare_tombstone(instance)
+        if isinstance(instance, NotFound):
+            return {"id": instance.id, "not_found": True}
+        prepared = self._cached.get(instance.id)
+        if prepared is not None:
+            return prepared
         prepared = super(ModelBasedResource, self).prepare(instance)
         additional = self.get_related_data(instance)
         if additional:
             prepared.setdefault("related_resources", {}).update(additional)
+        if self.is_cached():
+            cache.put(self.MODEL, instance.id, instance.updated, prepared)
         return prepared
 
     def is_authenticated(self):
@@ -110,10 +916,54 @@ class ModelBasedResource(DjangoResource):
         return True
 
 
-class ArticleResource(ModelBasedResource):
+class ImageLinkedResource(ModelBasedResource):
+    """Embeds the image links pointing to an instance as related data."""
+
+    # Set LINK_FIELD to the ImageLink column referring to MODEL.
+
+    # Keep the `IN (...)` lists under the SQLite limit of 999 parameters.
+    LINKS_BATCH_SIZE = 500
+
+    VERSIONED_RELATIONS = ('imagelink',)
+    EMBEDS = ('image_links',)
+
+    _links_by_owner = None  # Filled by prefetch_related_data().
+
+    def prefetch_related_data(self, instances):
+        """Load image links of all instances in one query per batch."""
+        if not self.is_embedded('image_links'):
+            return
+        links_by_owner = defaultdict(list)
+        ids = [instance.id for instance in instances]
+        for start in range(0, len(ids), self.LINKS_BATCH_SIZE):
+            batch = ids[start:start + self.LINKS_BATCH_SIZE]
+            links = preparers.read_rows(
+                ImageLink.objects.filter(
+                    **{self.LINK_FIELD + '__in': batch}).order_by('id'),
+                ImageLinkResource.preparer.columns + [self.LINK_FIELD])
+            for link in links:
+                links_by_owner[getattr(link, self.LINK_FIELD)].append(link)
+        self._links_by_owner = links_by_owner
+
+    def get_related_data(self, instance):
+        if not self.is_embedded('image_links'):
+            return None
+        if self._links_by_owner is not None:
+            links = self._links_by_owner.get(instance.id, [])
+        else:  # E.g. right after a create / update.
+            links = instance.imagelink_set.all()
+        return {"image_links": ImageLinkResource.get_from_collection(links)}
+
+
+class ArticleResource(ImageLinkedResource):
     MODEL = Article
+    STREAMABLE = True
+    CACHE_REPRESENTATIONS = True
+    LINK_FIELD = 'article_id'
     UPDATABLE_FIELDS = set(('title', 'body'))
-    preparer = FieldsPreparer(fields={
+    validator = validation.CompiledValidator(Article, UPDATABLE_FIELDS)
+    FILTERS = ('updated__gte', 'updated__lt')  # By the `updated` index.
+    preparer = preparers.CompiledPreparer(Article, fields={
         'id': 'id',
         'title': 'title',
         'body': 'body',
@@ -121,31 +971,119 @@ class ArticleResource(ModelBasedResource):
         'updated': 'updated',
     })
 
-    def get_related_data(self, instance):
-        return {"image_links": ImageLinkResource.get_from_collection(
-            instance.imagelink_set.all())}
+    # GET articles/search/?q=<words> finds articles by keywords.
+    http_methods = dict(ImageLinkedResource.http_methods,
+                        search={'GET': 'search'})
 
+    @classmethod
+    def urls(cls, name_prefix=None):
+        search_url = url(r'^search/$', csrf_exempt(cls.as_view('search')),
+                         name=cls.build_url_name('search', name_prefix))
+        return [search_url] + super(ArticleResource, cls).urls(name_prefix)
 
-class ImageResource(ModelBasedResource):
+    def get_search_cursor(self, terms):
+        """
+        Return the window of candidates and the RANK_KEY values of the
+        last result in it to go on from (or None) of ?cursor=.
+        """
+        token = self.request.GET.get('cursor')
+        if not token:
+            return search.first_window(terms), None
+        try:
+            values, _ = pagination.decode_cursor(
+                token, search.CURSOR_KEY, SearchTerm)
+        except pagination.InvalidCursor as e:
+            raise RequestError(str(e), status=400)
+        window, last = tuple(values[:3]), tuple(values[3:])
+        if window[0] is None:
+            window = None
+        if (window is None) != (len(terms) == 1) or (
+                window is not None and window[0] not in terms):
+            raise RequestError("Cursor is for a different search", status=400)
+        return window, (None if last[0] is None else last)
+
+    @skip_prepare
+    def search(self):
+        """
+        Return a page of articles having all the words of ?q=, best ranked
+        first, see search.py. Filters and ?fields= apply as to the list.
+        """
+        terms = search.parse_query(self.request.GET.get('q', ''))
+        if not terms:
+            raise RequestError("Nothing to search for", status=400)
+        key = search.RANK_KEY
+        limit = self.get_page_size()
+        window, last = self.get_search_cursor(terms)
+        matches = []  # (window, match) pairs.
+        following = None
+        for _ in range(search.MAX_WINDOWS):
+            ranked = search.ranked(terms, window)
+            if last is not None:
+                ranked = ranked.filter(pagination.after(key, last))
+            matches.extend((window, match) for match in
+                           ranked.order_by(*key)[:limit + 1 - len(matches)])
+            if len(matches) > limit:
+                break
+            following = search.next_window(window)  # The page runs short.
+            if following is None:
+                break
+            window, last = following, None
+        has_more = len(matches) > limit or following is not None
+        del matches[limit:]
+        rows = dict((row.id, row) for row in self.get_rows(
+            self.filter_queryset(self.get_queryset()).filter(
+                id__in=[match["article"] for _, match in matches])))
+        found = [rows[match["article"]] for _, match in matches
+                 if match["article"] in rows]
+        self.preload(found)
+        token = None
+        if has_more:
+            if len(matches) == limit:  # Else at the start of the next one.
+                window, match = matches[-1]
+                last = (match["score"], match["article"])
+            token = pagination.encode_cursor(search.CURSOR_KEY, list(
+                window or (None, None, None)) + list(last or (None, None)))
+        return {"objects": [self.prepare(row) for row in found],
+                "meta": {"limit": limit, "next": token, "prev": None,
+                         "has_more": has_more}}
+
+
+class ImageResource(ImageLinkedResource):
     MODEL = Image
+    STREAMABLE = True
+    CACHE_REPRESENTATIONS = True
+    LINK_FIELD = 'image_id'
     UPDATABLE_FIELDS = set(('note', 'path'))
-    preparer = FieldsPreparer(fields={  # Bare minimum of properties.
+    validator = validation.CompiledValidator(Image, UPDATABLE_FIELDS)
+    DERIVED_FIELDS = Image.FILE_INFO_FIELDS
+    FILTERS = ('path__startswith', 'updated__gte', 'updated__lt')
+    ORDERINGS = dict(ModelBasedResource.ORDERINGS, **{
+        'path': ('path',),  # Unique, so a total order by itself.
+        '-path': ('-path',),
+    })
+    preparer = preparers.CompiledPreparer(Image, fields={  # Bare minimum.
         'id': 'id',
         'note': 'note',
         'path': 'path',
         'created': 'created',
         'updated': 'updated',
+        # Kept in columns, so the files are not read to show them.
+        'content_type': 'content_type',
+        'width': 'width',
+        'height': 'height',
+        'size': 'size',
+        'sha256': 'sha256',
     })
 
-    def get_related_data(self, instance):
-        return {"image_links": ImageLinkResource.get_from_collection(
-            instance.imagelink_set.all())}
-
 
 class ImageLinkResource(ModelBasedResource):
     MODEL = ImageLink
+    STREAMABLE = True
     UPDATABLE_FIELDS = set(('image_id', 'article_id', 'role'))
-    preparer = FieldsPreparer(fields={  # Bare minimum of properties.
+    validator = validation.CompiledValidator(ImageLink, UPDATABLE_FIELDS)
+    # By the (article, role, image) and (image, role) indexes.
+    FILTERS = ('article_id', 'image_id', 'role')
+    preparer = preparers.CompiledPreparer(ImageLink, fields={  # Minimum.
         'id': 'id',
         'article_id': 'article_id',
         'image_id': 'image_id',
@@ -156,6 +1094,10 @@ class ImageLinkResource(ModelBasedResource):
 
     @classmethod
     def get_from_collection(cls, collection):
-        """Returns a list of representations from collection of instances."""
-        resource = cls()
-        return [resource.prepare(link) for link in collection]
+        """
+        Returns a list of representations from collection of rows or
+        instances. Links have no related data and are not cached, so the
+        preparer is all it takes.
+        """
+        prepare = cls.preparer.prepare
+        return [prepare(link) for link in collection]
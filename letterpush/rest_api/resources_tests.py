@@ -1,19 +1,68 @@
 """Tests representing the use cases."""
 
+import datetime
 import json
+import os
+import shutil
+import tempfile
 
+from django.db import connection
 from django.test import TestCase
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from django.utils.http import urlencode
 
+from . import bundles
+from . import images
 from . import resources
+from .models import Article
 
 
-class RestTestMixin(object):
+class RestRequestMixin(object):
 
     # Set RESOURCE to the resource class for testing.
-    # Set EXPECTED_FIELDS to a set of filed names to expect in the object.
     # set BASE_URI to the expected for the resource (e.g. '/articles/').
 
+    def _request(self, method, path, data, view_type, view_kwargs,
+                 headers=None):
+        body = json.dumps(data) if data is not None else ''
+        req_factory = RequestFactory()
+        req = req_factory.generic(method, path, body,
+                                  content_type='application/json',
+                                  **(headers or {}))
+        response = self.RESOURCE.as_view(view_type)(req, **view_kwargs)
+        self.last_response = response
+        raw_content = response.getvalue()
+        content = json.loads(raw_content) if raw_content else None
+        return (response.status_code, content)
+
+    def patch_resource(self, **attrs):
+        """Set RESOURCE class attributes for the duration of the test."""
+        for name, value in attrs.items():
+            self.addCleanup(setattr, self.RESOURCE, name,
+                            getattr(self.RESOURCE, name))
+            setattr(self.RESOURCE, name, value)
+
+    def request_list(self, method, data=None, params=None, headers=None):
+        path = self.BASE_URI
+        if params:
+            path += '?' + urlencode(params)
+        return self._request(method, path, data, 'list', {}, headers)
+
+    def request_detail(self, method, pk, data=None, headers=None):
+        return self._request(method, self.BASE_URI + str(pk) + '/', data,
+                             'detail', {'pk': pk}, headers)
+
+    def request_bulk(self, method, data):
+        return self._request(method, self.BASE_URI + 'bulk/', data,
+                             'bulk', {})
+
+
+class RestTestMixin(RestRequestMixin):
+
+    # Set EXPECTED_FIELDS to a set of filed names to expect in the object.
+
     # We use it to generate unique values.
     # NOTE: If we run tests in parallel, we should use a Thread.local().
     _counter = 0
@@ -33,23 +82,6 @@ class RestTestMixin(object):
         # We could use factories, etc, but it would make the code even longer.
         raise NotImplementedError("Return a dict of fields to update or create")
 
-    def _request(self, method, path, data, view_type, view_kwargs):
-        body = json.dumps(data) if data is not None else ''
-        req_factory = RequestFactory()
-        req = req_factory.generic(method, path, body,
-                                  content_type='application/json')
-        response = self.RESOURCE.as_view(view_type)(req, **view_kwargs)
-        raw_content = response.getvalue()
-        content = json.loads(raw_content) if raw_content else None
-        return (response.status_code, content)
-
-    def request_list(self, method, data=None):
-        return self._request(method, self.BASE_URI, data, 'list', {})
-
-    def request_detail(self, method, pk, data=None):
-        return self._request(method, self.BASE_URI + str(pk) + '/', data,
-                             'detail', {'pk': pk})
-
     def assert_requred_fields_present(self, content):
         self.assertIsNotNone(content)
         fields = set(content)  # we assume it's a dict.
@@ -102,17 +134,104 @@ class RestTestMixin(object):
         self.assertNotEquals(data, known_subset)
 
 
-class ImageTest(RestTestMixin, TestCase):
+class ImageFilesMixin(object):
+    """Keeps the image files of a test in a temporary IMAGES_ROOT."""
+
+    def setUp(self):
+        super(ImageFilesMixin, self).setUp()
+        images_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, images_root)
+        overridden = override_settings(IMAGES_ROOT=images_root)
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    @staticmethod
+    def write_image(path, content):
+        full_path = images.full_path(path)
+        if not os.path.isdir(os.path.dirname(full_path)):
+            os.makedirs(os.path.dirname(full_path))
+        with open(full_path, 'wb') as stream:
+            stream.write(content)
+
+
+class ImageTest(ImageFilesMixin, RestTestMixin, TestCase):
     RESOURCE = resources.ImageResource
     EXPECTED_FIELDS = set((
-        'path', 'note', 'id', 'created', 'updated', 'related_resources'))
+        'path', 'note', 'id', 'created', 'updated', 'related_resources',
+        'content_type', 'width', 'height', 'size', 'sha256'))
     BASE_URI = '/images/'
 
     @classmethod
-    def make_data(cls):
+    def make_fields(cls):
+        """Return the fields of an Image, with no file behind it."""
         return {"path": cls.unique_string('path/'),
-                "note": cls.unique_string('note-'),
-        }
+                "note": cls.unique_string('note-')}
+
+    @classmethod
+    def make_data(cls):
+        data = cls.make_fields()
+        cls.write_image(data["path"], images.blank_png(3, 2))
+        return data
+
+    def test_post_reads_file_info(self):
+        data = self.make_data()
+        status, content = self.request_list('POST', data)
+        self.assertEquals(201, status, (status, content))
+        self.assertEquals(("image/png", 3, 2), (
+            content["content_type"], content["width"], content["height"]))
+        self.assertEquals(
+            os.path.getsize(images.full_path(data["path"])), content["size"])
+        self.assertEquals(64, len(content["sha256"]))
+
+    def test_post_rejects_missing_file(self):
+        status, content = self.request_list('POST', self.make_fields())
+        self.assertEquals(400, status, (status, content))
+        self.assertFalse(self.RESOURCE.MODEL.objects.exists())
+
+    def test_post_reports_taken_path(self):
+        data = self.make_data()
+        self.request_list('POST', data)
+        status, content = self.request_list('POST', data)
+        self.assertEquals(400, status, (status, content))
+        self.assertEquals({"path": ["Already exists"]}, content["details"])
+
+    def test_post_rejects_path_outside_images(self):
+        data = dict(self.make_data(), path='../outside.png')
+        status, content = self.request_list('POST', data)
+        self.assertEquals(400, status, (status, content))
+
+    def test_put_rereads_changed_file(self):
+        data = self.make_data()
+        _, created = self.request_list('POST', data)
+        self.write_image(data["path"], images.blank_png(30, 20))
+        status, content = self.request_detail(
+            'PUT', created["id"], {"note": "Bigger"})
+        self.assertEquals(202, status, (status, content))
+        self.assertEquals((30, 20), (content["width"], content["height"]))
+        self.assertNotEquals(created["sha256"], content["sha256"])
+
+    def test_put_rereads_file_edited_in_place(self):
+        data = self.make_fields()
+        self.write_image(data["path"], images.blank_png(3, 2) + b'more')
+        _, created = self.request_list('POST', data)
+        full_path = images.full_path(data["path"])
+        stat = os.stat(full_path)
+        with open(full_path, 'r+b') as stream:  # Same size, other bytes.
+            stream.seek(-4, os.SEEK_END)
+            stream.write(b'less')
+        os.utime(full_path, (stat.st_atime, stat.st_mtime + 10))
+        status, content = self.request_detail(
+            'PUT', created["id"], {"note": "Edited"})
+        self.assertEquals(202, status, (status, content))
+        self.assertNotEquals(created["sha256"], content["sha256"])
+
+    def test_get_does_not_read_files(self):
+        data = self.make_data()
+        _, created = self.request_list('POST', data)
+        os.remove(images.full_path(data["path"]))
+        status, content = self.request_detail('GET', created["id"])
+        self.assertEquals(200, status, (status, content))
+        self.assertEquals(created["sha256"], content["sha256"])
 
 
 class ArticleTest(RestTestMixin, TestCase):
@@ -124,8 +243,7 @@ class ArticleTest(RestTestMixin, TestCase):
     @classmethod
     def make_data(cls):
         return {"title": cls.unique_string('TITLE '),
-                "body": cls.unique_string('Once upon a time, '),
-        }
+                "body": cls.unique_string('Once upon a time, ')}
 
 
 class ImageLinkTest(RestTestMixin, TestCase):
@@ -138,11 +256,565 @@ class ImageLinkTest(RestTestMixin, TestCase):
     def make_data(self, **kwargs):
         # We have to create an image and an article first.
         # We have no factories, so we directly reuse sister tests here.
-        image = resources.ImageResource.MODEL(**ImageTest.make_data())
+        image = resources.ImageResource.MODEL(**ImageTest.make_fields())
         image.save()
         article = resources.ArticleResource.MODEL(**ArticleTest.make_data())
         article.save()
         return {"image_id": image.id,
                 "article_id": article.id,
-                'role': kwargs.pop('role', 'L'),
-        }
+                'role': kwargs.pop('role', 'L')}
+
+
+class RelatedDataQueriesTest(RestRequestMixin, TestCase):
+    """Embedded image links must not cost a query per listed object."""
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def add_linked_articles(self, count):
+        for _ in range(count):
+            link_data = ImageLinkTest.make_data()
+            resources.ImageLinkResource.MODEL(**link_data).save()
+
+    def test_list_query_count_does_not_grow_with_rows(self):
+        self.add_linked_articles(1)
+        # Last update and deletion of articles and of links for the ETag,
+        # articles, then all their links.
+        with self.assertNumQueries(6):
+            self.request_list('GET')
+        self.add_linked_articles(10)
+        with self.assertNumQueries(6):
+            status, content = self.request_list('GET')
+        self.assertEquals(200, status, (status, content))
+        self.assertEquals(11, len(content["objects"]))
+        for article in content["objects"]:
+            links = article["related_resources"]["image_links"]
+            self.assertEquals(1, len(links))
+            self.assertEquals(article["id"], links[0]["article_id"])
+
+    def test_detail_embeds_image_links(self):
+        link_data = ImageLinkTest.make_data()
+        link = resources.ImageLinkResource.MODEL(**link_data)
+        link.save()
+        with self.assertNumQueries(3):
+            status, content = self.request_detail('GET', link.article_id)
+        self.assertEquals(200, status, (status, content))
+        links = content["related_resources"]["image_links"]
+        self.assertEquals([link.id], [each["id"] for each in links])
+
+
+class PaginationTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        self.ids = []
+        for _ in range(5):
+            article = self.RESOURCE.MODEL(**ArticleTest.make_data())
+            article.save()
+            self.ids.append(article.id)
+
+    def get_page(self, **params):
+        status, content = self.request_list('GET', params=params)
+        self.assertEquals(200, status, (status, content))
+        return [each["id"] for each in content["objects"]], content["meta"]
+
+    def test_walks_pages_forth_and_back(self):
+        ids, meta = self.get_page(limit=2)
+        self.assertEquals(self.ids[:2], ids)
+        self.assertIsNone(meta["prev"])
+        ids, meta = self.get_page(limit=2, cursor=meta["next"])
+        self.assertEquals(self.ids[2:4], ids)
+        ids, meta = self.get_page(limit=2, cursor=meta["next"])
+        self.assertEquals(self.ids[4:], ids)
+        self.assertIsNone(meta["next"])
+        ids, meta = self.get_page(limit=2, cursor=meta["prev"])
+        self.assertEquals(self.ids[2:4], ids)
+        ids, meta = self.get_page(limit=2, cursor=meta["prev"])
+        self.assertEquals(self.ids[:2], ids)
+        self.assertIsNone(meta["prev"])
+
+    def test_page_is_not_disturbed_by_deletions(self):
+        _, meta = self.get_page(limit=2)
+        self.RESOURCE.MODEL.objects.filter(id=self.ids[1]).delete()
+        ids, _ = self.get_page(limit=2, cursor=meta["next"])
+        self.assertEquals(self.ids[2:4], ids)
+
+    def test_limit_is_capped(self):
+        self.patch_resource(MAX_PAGE_SIZE=3)
+        ids, meta = self.get_page(limit=1000)
+        self.assertEquals(self.ids[:3], ids)
+        self.assertEquals(3, meta["limit"])
+
+    def test_bad_parameters_are_rejected(self):
+        for params in ({"limit": "lots"}, {"limit": 0}, {"cursor": "junk"}):
+            status, content = self.request_list('GET', params=params)
+            self.assertEquals(400, status, (params, content))
+
+    def test_pages_by_updated(self):
+        start = timezone.now()
+        for offset, pk in enumerate(self.ids):  # Make sure there's no tie.
+            self.RESOURCE.MODEL.objects.filter(id=pk).update(
+                updated=start + datetime.timedelta(seconds=offset))
+        self.patch_resource(PAGE_KEY=('-updated', 'id'))
+        ids, meta = self.get_page(limit=3)
+        next_ids, _ = self.get_page(limit=3, cursor=meta["next"])
+        self.assertEquals(list(reversed(self.ids)), ids + next_ids)
+
+
+class StreamingTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ImageLinkResource
+    BASE_URI = '/image_links/'
+
+    def test_streams_whole_list_in_chunks(self):
+        for _ in range(5):
+            self.RESOURCE.MODEL(**ImageLinkTest.make_data()).save()
+        self.patch_resource(STREAM_CHUNK_SIZE=2)
+        with self.assertNumQueries(5):  # Versions, chunks of 2, 2, 1.
+            status, content = self.request_list(
+                'GET', params={"stream": 1, "limit": 1})
+        self.assertEquals(200, status, (status, content))
+        self.assertTrue(self.last_response.streaming)
+        _, paged = self.request_list('GET')
+        self.assertEquals(paged["objects"], content["objects"])
+
+    def test_streams_empty_list(self):
+        status, content = self.request_list('GET', params={"stream": 1})
+        self.assertEquals(200, status, (status, content))
+        self.assertEquals({"objects": []}, content)
+
+    def test_does_not_stream_ids(self):
+        link = self.RESOURCE.MODEL(**ImageLinkTest.make_data())
+        link.save()
+        status, content = self.request_list(
+            'GET', params={"ids": "%d" % link.id, "stream": 1})
+        self.assertEquals(200, status, (status, content))
+        self.assertFalse(self.last_response.streaming)
+        self.assertEquals([link.id],
+                          [each["id"] for each in content["objects"]])
+
+
+class BulkTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ImageLinkResource
+    BASE_URI = '/image_links/'
+
+    def test_post_creates_all_records(self):
+        items = [ImageLinkTest.make_data() for _ in range(3)]
+        status, content = self.request_bulk('POST', items)
+        self.assertEquals(201, status, (status, content))
+        created = content["objects"]
+        self.assertEquals(items, [
+            {name: each[name] for name in items[0]} for each in created])
+        self.assertEquals(
+            3, self.RESOURCE.MODEL.objects.filter(
+                id__in=[each["id"] for each in created]).count())
+
+    def test_post_reports_bad_items_and_saves_none(self):
+        good = ImageLinkTest.make_data()
+        bad_role = dict(ImageLinkTest.make_data(), role='X')
+        extra_field = dict(ImageLinkTest.make_data(), id=1)
+        status, content = self.request_bulk(
+            'POST', [good, bad_role, extra_field])
+        self.assertEquals(400, status, (status, content))
+        self.assertEquals([1, 2],
+                          [each["index"] for each in content["details"]])
+        self.assertFalse(self.RESOURCE.MODEL.objects.exists())
+
+    def test_post_reports_taken_items(self):
+        existing = ImageLinkTest.make_data()
+        self.RESOURCE.MODEL(**existing).save()
+        good = ImageLinkTest.make_data()
+        with CaptureQueriesContext(connection) as queries:
+            status, content = self.request_bulk(
+                'POST', [good, dict(existing), dict(good)])
+        self.assertEquals(1, len([  # Links of the articles, at once.
+            query for query in queries
+            if 'FROM "rest_api_imagelink"' in query['sql']]))
+        self.assertEquals(400, status, (status, content))
+        self.assertEquals([1, 2],
+                          [each["index"] for each in content["details"]])
+        self.assertEquals(
+            {"__all__": ["This combination of article_id, role, image_id "
+                         "already exists"]},
+            content["details"][0]["details"])
+        self.assertEquals(1, self.RESOURCE.MODEL.objects.count())
+
+    def test_post_looks_links_up_at_once(self):
+        items = [ImageLinkTest.make_data() for _ in range(10)]
+        missing = dict(ImageLinkTest.make_data(), image_id=0)
+        with CaptureQueriesContext(connection) as queries:
+            status, content = self.request_bulk('POST', items + [missing])
+        self.assertEquals(400, status, (status, content))
+        self.assertEquals([{"image_id": ["No such image"]}],
+                          [each["details"] for each in content["details"]])
+        self.assertEquals([10], [each["index"] for each in content["details"]])
+        self.assertEquals([], [  # No lookups per item.
+            query for query in queries
+            if query['sql'].startswith('SELECT (1) AS "a"')])
+
+    def test_put_updates_all_records(self):
+        links = []
+        for _ in range(2):
+            link = self.RESOURCE.MODEL(**ImageLinkTest.make_data())
+            link.save()
+            links.append(link)
+        status, content = self.request_bulk('PUT', [
+            {"id": link.id, "role": "G"} for link in links])
+        self.assertEquals(202, status, (status, content))
+        self.assertEquals(["G", "G"],
+                          [each["role"] for each in content["objects"]])
+        self.assertEquals(2, self.RESOURCE.MODEL.objects.filter(
+            role="G").count())
+
+    def test_put_reports_missing_records(self):
+        link = self.RESOURCE.MODEL(**ImageLinkTest.make_data())
+        link.save()
+        status, content = self.request_bulk('PUT', [
+            {"id": link.id, "role": "G"}, {"id": link.id + 1, "role": "G"}])
+        self.assertEquals(400, status, (status, content))
+        self.assertEquals([1], [each["index"] for each in content["details"]])
+        self.assertFalse(self.RESOURCE.MODEL.objects.filter(
+            role="G").exists())
+
+    def test_delete_removes_all_or_nothing(self):
+        links = []
+        for _ in range(2):
+            link = self.RESOURCE.MODEL(**ImageLinkTest.make_data())
+            link.save()
+            links.append(link.id)
+        status, content = self.request_bulk('DELETE', links + [0])
+        self.assertEquals(400, status, (status, content))
+        self.assertEquals(2, self.RESOURCE.MODEL.objects.count())
+        status, content = self.request_bulk('DELETE', links)
+        self.assertEquals(204, status, (status, content))
+        self.assertFalse(self.RESOURCE.MODEL.objects.exists())
+
+    def test_batch_size_is_limited(self):
+        self.patch_resource(MAX_BULK_SIZE=1)
+        items = [ImageLinkTest.make_data() for _ in range(2)]
+        status, content = self.request_bulk('POST', items)
+        self.assertEquals(400, status, (status, content))
+
+
+class ConditionalGetTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        self.link = resources.ImageLinkResource.MODEL(
+            **ImageLinkTest.make_data())
+        self.link.save()
+
+    def test_detail_not_modified(self):
+        self.request_detail('GET', self.link.article_id)
+        etag = self.last_response['ETag']
+        with self.assertNumQueries(1):  # Just the version.
+            status, content = self.request_detail(
+                'GET', self.link.article_id,
+                headers={'HTTP_IF_NONE_MATCH': etag})
+        self.assertEquals(304, status, (status, content))
+        self.assertEquals(etag, self.last_response['ETag'])
+
+    def test_detail_modified_by_link_change(self):
+        self.request_detail('GET', self.link.article_id)
+        etag = self.last_response['ETag']
+        self.link.role = 'G'
+        self.link.save()
+        status, _ = self.request_detail(
+            'GET', self.link.article_id, headers={'HTTP_IF_NONE_MATCH': etag})
+        self.assertEquals(200, status)
+        self.assertNotEquals(etag, self.last_response['ETag'])
+
+    def test_list_not_modified_until_changed(self):
+        self.request_list('GET', params={"limit": 10})
+        etag = self.last_response['ETag']
+        headers = {'HTTP_IF_NONE_MATCH': etag}
+        status, _ = self.request_list('GET', params={"limit": 10},
+                                      headers=headers)
+        self.assertEquals(304, status)
+        status, _ = self.request_list('GET', params={"limit": 5},
+                                      headers=headers)
+        self.assertEquals(200, status)  # A different page.
+        self.link.delete()
+        status, _ = self.request_list('GET', params={"limit": 10},
+                                      headers=headers)
+        self.assertEquals(200, status)
+
+    def test_filtered_list_modified_by_object_leaving_it(self):
+        self.RESOURCE = resources.ImageLinkResource
+        params = {"role": self.link.role}
+        self.request_list('GET', params=params)
+        headers = {'HTTP_IF_NONE_MATCH': self.last_response['ETag']}
+        self.link.role = 'G'
+        self.link.save()
+        status, content = self.request_list('GET', params=params,
+                                            headers=headers)
+        self.assertEquals(200, status)
+        self.assertEquals([], content["objects"])
+
+    def test_changes_feed_has_no_validators(self):
+        params = {"updated_since": "2015-01-01T00:00:00Z"}
+        with self.assertNumQueries(3):  # Changes, tombstones, links.
+            status, _ = self.request_list('GET', params=params)
+        self.assertEquals(200, status)
+        self.assertNotIn('ETag', self.last_response)
+
+    def test_if_modified_since(self):
+        self.request_detail('GET', self.link.article_id)
+        last_modified = self.last_response['Last-Modified']
+        status, _ = self.request_detail(
+            'GET', self.link.article_id,
+            headers={'HTTP_IF_MODIFIED_SINCE': last_modified})
+        self.assertEquals(304, status)
+        long_ago = 'Thu, 01 Jan 2015 00:00:00 GMT'
+        status, _ = self.request_detail(
+            'GET', self.link.article_id,
+            headers={'HTTP_IF_MODIFIED_SINCE': long_ago})
+        self.assertEquals(200, status)
+
+    def test_missing_detail_is_not_found(self):
+        status, _ = self.request_detail('GET', self.link.article_id + 1,
+                                        headers={'HTTP_IF_NONE_MATCH': '*'})
+        self.assertEquals(404, status)
+
+
+class ConditionalUpdateTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        self.article = Article.objects.create(title="Title", body="Body")
+
+    def get_etag(self):
+        self.request_detail('GET', self.article.id)
+        return self.last_response['ETag']
+
+    def put(self, data, if_match):
+        return self.request_detail('PUT', self.article.id, data,
+                                   headers={'HTTP_IF_MATCH': if_match})
+
+    def test_updates_current_version(self):
+        etag = self.get_etag()
+        status, content = self.put({"title": "New"}, etag)
+        self.assertEquals(202, status, content)
+        self.assertEquals("New", Article.objects.get().title)
+        self.assertIn("New", bundles.get(self.article.id)[0])  # post_save.
+        self.assertNotEquals(etag, self.get_etag())
+
+    def test_rejects_stale_version(self):
+        etag = self.get_etag()
+        self.put({"title": "First"}, etag)
+        status, _ = self.put({"title": "Second"}, etag)
+        self.assertEquals(412, status)
+        self.assertEquals("First", Article.objects.get().title)
+
+    def test_rejects_change_after_read(self):
+        resource = self.RESOURCE()
+        thing = Article.objects.get()
+        version = thing.updated
+        Article.objects.get().save()  # Someone else, in between.
+        thing.title = "Lost"
+        self.assertFalse(resource.save_if_unchanged(
+            thing, ['title', 'updated'], version))
+        self.assertEquals("Title", Article.objects.get().title)
+
+    def test_takes_weak_etag_and_star(self):
+        status, _ = self.put({"title": "New"}, 'W/' + self.get_etag())
+        self.assertEquals(202, status)
+        status, _ = self.put({"title": "Newer"}, '*')
+        self.assertEquals(202, status)
+
+    def test_rejects_unknown_etag(self):
+        status, _ = self.put({"title": "New"}, '"something-else"')
+        self.assertEquals(412, status)
+        status, _ = self.request_detail('PUT', self.article.id + 1,
+                                        {"title": "New"},
+                                        headers={'HTTP_IF_MATCH': '*'})
+        self.assertEquals(404, status)
+
+
+class ChangesFeedTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ImageLinkResource
+    BASE_URI = '/image_links/'
+
+    def make_link(self):
+        link = self.RESOURCE.MODEL(**ImageLinkTest.make_data())
+        link.save()
+        return link
+
+    def get_changes(self, since, **params):
+        params["updated_since"] = since.isoformat()
+        status, content = self.request_list('GET', params=params)
+        self.assertEquals(200, status, (status, content))
+        return ([(each["id"], each.get("deleted", False))
+                 for each in content["objects"]], content["meta"])
+
+    def test_lists_updates_and_deletions_in_order(self):
+        untouched = self.make_link()
+        updated, deleted = self.make_link(), self.make_link()
+        since = timezone.now()
+        created = self.make_link()
+        updated.role = 'G'
+        updated.save()
+        deleted_id = deleted.id
+        deleted.delete()
+        changes, meta = self.get_changes(since)
+        self.assertEquals([(created.id, False), (updated.id, False),
+                           (deleted_id, True)], changes)
+        self.assertFalse(meta["has_more"])
+        self.assertNotIn(untouched.id, [pk for pk, _ in changes])
+        changes, meta = self.get_changes(since, cursor=meta["next"])
+        self.assertEquals([], changes)
+        cascaded = self.make_link()
+        resources.Article.objects.filter(id=cascaded.article_id).delete()
+        changes, _ = self.get_changes(since, cursor=meta["next"])
+        self.assertEquals([(cascaded.id, True)], changes)
+
+    def test_pages_through_changes(self):
+        since = timezone.now()
+        links = [self.make_link() for _ in range(3)]
+        deleted_id = links[0].id
+        links[0].delete()
+        changes, meta = self.get_changes(since, limit=2)
+        self.assertEquals([(links[1].id, False), (links[2].id, False)],
+                          changes)
+        self.assertTrue(meta["has_more"])
+        changes, meta = self.get_changes(since, limit=2, cursor=meta["next"])
+        self.assertEquals([(deleted_id, True)], changes)
+        self.assertFalse(meta["has_more"])
+
+    def test_sends_changes_as_a_page_even_if_streaming(self):
+        since = timezone.now()
+        link = self.make_link()
+        changes, meta = self.get_changes(since, stream=1)
+        self.assertFalse(self.last_response.streaming)
+        self.assertEquals([(link.id, False)], changes)
+        self.assertFalse(meta["has_more"])
+
+    def test_bad_since_is_rejected(self):
+        status, _ = self.request_list('GET', params={"updated_since": "now"})
+        self.assertEquals(400, status)
+
+
+class SparseFieldsetTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        self.link = resources.ImageLinkResource.MODEL(
+            **ImageLinkTest.make_data())
+        self.link.save()
+
+    def test_sends_only_selected_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            status, content = self.request_list(
+                'GET', params={'fields': 'id,title', 'embed': 'none'})
+        self.assertEquals(200, status, content)
+        self.assertEquals(set(('id', 'title')), set(content["objects"][0]))
+        # Versions for the ETag and the articles; no links, no body.
+        self.assertEquals(5, len(queries))
+        self.assertNotIn('"body"', queries[4]['sql'])
+
+    def test_embeds_on_request(self):
+        _, content = self.request_detail('GET', self.link.article_id)
+        self.assertEquals(1, len(content["related_resources"]["image_links"]))
+        _, content = self.request_list(
+            'GET', params={'fields': 'title', 'embed': 'image_links'})
+        self.assertEquals(set(('title', 'related_resources')),
+                          set(content["objects"][0]))
+        with self.assertNumQueries(2):  # Whole ones still come cached.
+            _, content = self.request_detail('GET', self.link.article_id)
+        self.assertEquals(1, len(content["related_resources"]["image_links"]))
+
+    def test_unknown_names_are_rejected(self):
+        status, _ = self.request_list('GET', params={'fields': 'id,secret'})
+        self.assertEquals(400, status)
+        status, _ = self.request_list('GET', params={'embed': 'authors'})
+        self.assertEquals(400, status)
+
+
+class FilteringTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ImageLinkResource
+    BASE_URI = '/image_links/'
+
+    def test_filters_links(self):
+        lead = resources.ImageLinkResource.MODEL(**ImageLinkTest.make_data())
+        lead.save()
+        gallery = resources.ImageLinkResource.MODEL(
+            **ImageLinkTest.make_data())
+        gallery.article_id, gallery.role = lead.article_id, 'G'
+        gallery.save()
+        _, content = self.request_list(
+            'GET', params={'article_id': lead.article_id, 'role': 'L'})
+        self.assertEquals([lead.id],
+                          [each["id"] for each in content["objects"]])
+        _, content = self.request_list(
+            'GET', params={'article_id': lead.article_id, 'ordering': '-id'})
+        self.assertEquals([gallery.id, lead.id],
+                          [each["id"] for each in content["objects"]])
+        status, _ = self.request_list('GET', params={'image_id': 'x'})
+        self.assertEquals(400, status)
+        status, _ = self.request_list('GET', params={'ordering': 'role'})
+        self.assertEquals(400, status)
+
+    def test_filters_images_by_path_prefix(self):
+        self.RESOURCE = resources.ImageResource
+        for path in ('cats/1.jpg', 'cats/2.jpg', 'Cats/3.jpg', 'dogs/1.jpg',
+                     'cats_1.jpg'):
+            resources.ImageResource.MODEL(path=path, note='').save()
+        self.BASE_URI = '/images/'
+        _, content = self.request_list(
+            'GET', params={'path__startswith': 'cats/', 'ordering': '-path'})
+        self.assertEquals(['cats/2.jpg', 'cats/1.jpg'],
+                          [each["path"] for each in content["objects"]])
+
+    def test_filters_articles_by_update_time(self):
+        self.RESOURCE = resources.ArticleResource
+        self.BASE_URI = '/articles/'
+        old = resources.ArticleResource.MODEL(**ArticleTest.make_data())
+        old.save()
+        new = resources.ArticleResource.MODEL(**ArticleTest.make_data())
+        new.save()
+        _, content = self.request_list('GET', params={
+            'updated__gte': new.updated.isoformat()})
+        self.assertEquals([new.id],
+                          [each["id"] for each in content["objects"]])
+
+
+class ByIdsTest(RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def setUp(self):
+        self.articles = []
+        for _ in range(3):
+            article = self.RESOURCE.MODEL(**ArticleTest.make_data())
+            article.save()
+            self.articles.append(article)
+
+    def test_gets_in_order_asked(self):
+        first, second, third = [article.id for article in self.articles]
+        missing = third + 1
+        with self.assertNumQueries(3):  # Versions, rows and their links.
+            status, content = self.request_list('GET', params={
+                'ids': '%d,%d,%d,%d' % (third, missing, first, third)})
+        self.assertEquals(200, status, (status, content))
+        self.assertEquals([third, missing, first, third],
+                          [each["id"] for each in content["objects"]])
+        self.assertEquals({"id": missing, "not_found": True},
+                          content["objects"][1])
+        self.assertEquals(self.articles[0].title,
+                          content["objects"][2]["title"])
+
+    def test_filters_apply(self):
+        first, second, _ = self.articles
+        status, content = self.request_list('GET', params={
+            'ids': '%d,%d' % (first.id, second.id),
+            'updated__gte': second.updated.isoformat()})
+        self.assertEquals([True, None], [each.get("not_found")
+                                         for each in content["objects"]])
+
+    def test_rejects_bad_lists(self):
+        too_many = ','.join(['1'] * (self.RESOURCE.MAX_IDS + 1))
+        for ids in ('1,x', ',', too_many):
+            status, content = self.request_list('GET', params={'ids': ids})
+            self.assertEquals(400, status, (ids, content))
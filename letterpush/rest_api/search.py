@@ -0,0 +1,144 @@
+"""
+Keyword search over articles, by an inverted index in the database.
+
+Every article is split into lowercase words; SearchTerm keeps one row per
+(word, article) with a weight: the count of the word in the body, plus
+TITLE_WEIGHT per occurrence in the title. The index is rebuilt for an
+article whenever it is saved, by the signal receiver below, and its rows
+go away with the article.
+
+A search finds articles having all of the query words, ranked by the sum
+of their weights. That touches the index rows of the query words only,
+not the articles: for one word, just the best ranked rows of it, in the
+order of the (term, weight, article) index; for more words, the rows of
+the articles in a window of the MAX_CANDIDATES next best ranked for the
+rarest of the words. Those are ranked within the window; a page that
+runs short of them goes on to the next window, so no article is missed,
+though past the first window the order is by windows first.
+"""
+
+import re
+from collections import Counter
+
+from django.db.models import Count, F, Sum
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from . import pagination
+from .models import Article, SearchTerm
+
+TITLE_WEIGHT = 5
+MAX_TERM_LENGTH = 100  # As SearchTerm.term.
+MAX_QUERY_TERMS = 10
+
+# Too common to tell articles apart; indexing them would only make the
+# searches that use them slow.
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'with',
+))
+
+# Searches for more than one word look at windows of this many articles
+# of the rarest word at a time, so that the cost of each is bounded.
+MAX_CANDIDATES = 1000
+
+# Windows a page looks at; if it is still short, it ends with a cursor to
+# go on from the next one.
+MAX_WINDOWS = 10
+
+# Search results are ordered, and paginated, by this key within a window.
+RANK_KEY = ('-score', '-article')
+
+# Candidates are taken in this order of the rows of the rarest word.
+CANDIDATE_KEY = ('-weight', '-article')
+
+# A search cursor is the window, then the RANK_KEY of the last result.
+CURSOR_KEY = ('term',) + CANDIDATE_KEY + RANK_KEY
+
+_word = re.compile(r'\w+', re.UNICODE)
+
+
+def split_words(text):
+    """Return the indexable words of text, lowercase, in order."""
+    return [word for word in _word.findall(text.lower())
+            if word not in STOP_WORDS and len(word) <= MAX_TERM_LENGTH]
+
+
+def weigh_terms(title, body):
+    """Return {term: weight} of an article."""
+    weights = Counter(split_words(body))
+    for word in split_words(title):
+        weights[word] += TITLE_WEIGHT
+    return weights
+
+
+def index_article(article):
+    """Replace the index rows of article with fresh ones."""
+    SearchTerm.objects.filter(article_id=article.pk).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, article_id=article.pk, weight=weight)
+        for term, weight in weigh_terms(article.title, article.body).items())
+
+
+def parse_query(query):
+    """Return the distinct terms to search for, in order; maybe none."""
+    terms = []
+    for word in split_words(query):
+        if word not in terms:
+            terms.append(word)
+    return terms[:MAX_QUERY_TERMS]
+
+
+def first_window(terms):
+    """
+    Return the first window of candidates of a search for terms: a
+    (rarest term, weight, article) of the row of it before the window,
+    here (rarest term, None, None); or None for one word, which needs none.
+    """
+    if len(terms) == 1:
+        return None
+    # Counted up to MAX_CANDIDATES only, by the index.
+    rarest = min(terms, key=lambda term: SearchTerm.objects.filter(
+        term=term)[:MAX_CANDIDATES].count())
+    return (rarest, None, None)
+
+
+def get_candidates(window):
+    term, weight, article = window
+    rows = SearchTerm.objects.filter(term=term).order_by(*CANDIDATE_KEY)
+    if weight is not None:
+        rows = rows.filter(pagination.after(CANDIDATE_KEY, (weight, article)))
+    return rows
+
+
+def next_window(window):
+    """Return the window after window, or None if it is the last one."""
+    if window is None:
+        return None
+    rows = list(get_candidates(window).values_list('weight', 'article')[
+        MAX_CANDIDATES - 1:MAX_CANDIDATES + 1])
+    if len(rows) < 2:
+        return None
+    return (window[0],) + tuple(rows[0])
+
+
+def ranked(terms, window=None):
+    """
+    Return a values() queryset of {"article": id, "score": rank} of the
+    articles that have all of terms, in window (see first_window()), to
+    order by RANK_KEY.
+    """
+    postings = SearchTerm.objects.all()
+    if window is None:
+        return postings.filter(term=terms[0]).annotate(
+            score=F('weight')).values('article', 'score')
+    candidates = get_candidates(window).values('article')[:MAX_CANDIDATES]
+    return postings.filter(term__in=terms, article__in=candidates).values(
+        'article').annotate(score=Sum('weight'), hits=Count('term')).filter(
+            hits=len(terms))
+
+
+@receiver(post_save, sender=Article)
+def index_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or set(update_fields) & set(('title', 'body')):
+        index_article(instance)
@@ -0,0 +1,99 @@
+"""Tests of the article search."""
+
+from django.test import TestCase
+from django.utils.http import urlencode
+
+from . import resources
+from . import resources_tests
+from . import search
+from .models import SearchTerm
+
+
+class WeighTermsTest(TestCase):
+
+    def test_title_words_weigh_more(self):
+        weights = search.weigh_terms("Cats of Rome", "The cats, the CATS!")
+        self.assertEquals({"cats": 2 + search.TITLE_WEIGHT,
+                           "rome": search.TITLE_WEIGHT}, dict(weights))
+
+
+class SearchTest(resources_tests.RestRequestMixin, TestCase):
+    RESOURCE = resources.ArticleResource
+    BASE_URI = '/articles/'
+
+    def request_search(self, **params):
+        return self._request('GET', self.BASE_URI + 'search/?' +
+                             urlencode(params), None, 'search', {})
+
+    def create(self, title, body):
+        _, content = self.request_list('POST', {"title": title, "body": body})
+        return content["id"]
+
+    def found(self, **params):
+        status, content = self.request_search(**params)
+        self.assertEquals(200, status, content)
+        return [each["id"] for each in content["objects"]]
+
+    def test_ranks_articles_with_all_words(self):
+        in_body = self.create("News", "A cat met a dog.")
+        in_title = self.create("Cat and dog", "They met.")
+        self.create("Cats", "Only a cat here.")
+        self.assertEquals([in_title, in_body], self.found(q="Dog, cat"))
+        self.assertEquals([], self.found(q="cat unicorn"))
+
+    def set_limits(self, **limits):
+        for name, value in limits.items():
+            self.addCleanup(setattr, search, name, getattr(search, name))
+            setattr(search, name, value)
+
+    def pages(self, **params):
+        """Return the ids of each page of a search, following the cursors."""
+        pages = []
+        while True:
+            status, content = self.request_search(**params)
+            self.assertEquals(200, status, content)
+            pages.append([each["id"] for each in content["objects"]])
+            if not content["meta"]["has_more"]:
+                return pages
+            params["cursor"] = content["meta"]["next"]
+
+    def test_goes_on_past_candidates_window(self):
+        self.set_limits(MAX_CANDIDATES=1)
+        other = self.create("News", "Cats and dogs.")
+        best = self.create("Cats", "Cats and dogs.")
+        self.create("Kittens", "Cats, cats, cats.")  # In between, no dogs.
+        self.assertEquals([best, other], self.found(q="cats dogs"))
+        self.assertEquals([[best], [other]],
+                          self.pages(q="cats dogs", limit=1))
+        self.set_limits(MAX_WINDOWS=1)
+        self.assertEquals([[best], [], [other]], self.pages(q="cats dogs"))
+
+    def test_rejects_cursor_of_other_search(self):
+        self.create("Cats", "Cats and dogs.")
+        self.create("Dogs", "Cats and dogs.")
+        _, content = self.request_search(q="cats dogs", limit=1)
+        status, _ = self.request_search(q="cats", limit=1,
+                                        cursor=content["meta"]["next"])
+        self.assertEquals(400, status)
+
+    def test_follows_updates_and_deletions(self):
+        pk = self.create("Cats", "Purr.")
+        self.request_detail('PUT', pk, {"title": "Dogs"})
+        self.assertEquals([], self.found(q="cats"))
+        self.assertEquals([pk], self.found(q="dogs"))
+        self.request_detail('DELETE', pk)
+        self.assertEquals([], self.found(q="dogs"))
+        self.assertFalse(SearchTerm.objects.exists())
+
+    def test_pages_through_results(self):
+        ids = [self.create("Cat %d" % index, "cat " * index + "...")
+               for index in range(3)]
+        _, content = self.request_search(q="cat", limit=2)
+        self.assertEquals([ids[2], ids[1]],
+                          [each["id"] for each in content["objects"]])
+        self.assertEquals([ids[0]], self.found(
+            q="cat", limit=2, cursor=content["meta"]["next"]))
+
+    def test_needs_words(self):
+        status, _ = self.request_search(q="the")  # A stop word.
+        self.assertEquals(400, status)
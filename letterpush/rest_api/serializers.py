@@ -0,0 +1,55 @@
+"""
+The JSON serializer of the resources.
+
+Restless writes JSON with the ", " and ": " separators. With
+settings.REST_API_JSON['COMPACT'], this serializer leaves the spaces out.
+With 'FAST_ENCODER', it uses orjson if that is installed. orjson writes
+non-ASCII characters as UTF-8 rather than escaping them, and is always
+compact. Types JSON lacks come out the same either way: datetimes as
+isoformat(), Decimals as strings.
+"""
+
+import json
+
+from django.conf import settings
+
+from restless.serializers import JSONSerializer
+from restless.utils import MoreTypesJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+DEFAULTS = {
+    'COMPACT': True,
+    'FAST_ENCODER': True,
+}
+
+_encoder = MoreTypesJSONEncoder()
+
+
+def get_config():
+    return dict(DEFAULTS, **getattr(settings, 'REST_API_JSON', {}))
+
+
+def is_fast(config):
+    return orjson is not None and config['FAST_ENCODER']
+
+
+class CompactJSONSerializer(JSONSerializer):
+
+    def get_separators(self):
+        """Return (item separator, key separator)."""
+        config = get_config()
+        if config['COMPACT'] or is_fast(config):
+            return ',', ':'
+        return ', ', ': '
+
+    def serialize(self, data):
+        if is_fast(get_config()):
+            return orjson.dumps(
+                data, default=_encoder.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME).decode('utf-8')
+        return json.dumps(data, cls=MoreTypesJSONEncoder,
+                          separators=self.get_separators())
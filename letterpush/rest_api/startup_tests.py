@@ -0,0 +1,37 @@
+"""Tests of the API-only profile and `manage.py startup`."""
+
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from .models import Article
+
+
+class ApiProfileTest(TestCase):
+
+    @override_settings(ROOT_URLCONF='letterpush.urls_api')
+    def test_serves_the_api(self):
+        Article.objects.create(title="Title", body="Body")
+        response = self.client.get('/api/articles/')
+        self.assertEquals(200, response.status_code)
+        self.assertEquals(1, len(json.loads(
+            response.content.decode('utf-8'))["objects"]))
+        self.assertEquals(404, self.client.get('/admin/').status_code)
+
+    def test_command_reports_startup(self):
+        # In a process of its own, as its scratch database cannot be made
+        # inside the test one.
+        process = subprocess.Popen(
+            [sys.executable, 'manage.py', 'startup',
+             '--profiles', 'letterpush.settings_api', '--repeat', '1'],
+            cwd=settings.BASE_DIR, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE)
+        out, err = process.communicate()
+        self.assertEquals(0, process.returncode, err)
+        result = json.loads(out.decode('utf-8'))['letterpush.settings_api']
+        self.assertEquals(200, result["status"])  # Articles of its database.
+        self.assertGreater(result["process_ms"], result["first_request_ms"])
@@ -0,0 +1,234 @@
+"""
+Validation of the fields a request sets, compiled once per resource.
+
+Model.full_clean() looks every field up and runs all of its validators,
+and also runs a SELECT for each unique constraint and foreign key, which
+the database checks again on save. A CompiledValidator runs only the
+checks of the updatable fields, made into plain functions up front:
+type, required, length and choices. Uniqueness is left to the database,
+whose IntegrityError becomes a 400 in resources.py, except in batches,
+see check_unique(); so are foreign keys, unless the database does not
+enforce them (SQLite, in Django 1.9). Then they are looked up, in a
+query per field for a whole batch, see find_related().
+"""
+
+import datetime
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import connection, models
+from django.utils import six
+
+# Field classes to the types their values must have in a request.
+TYPES = (
+    (models.CharField, six.string_types, "a string"),
+    (models.TextField, six.string_types, "a string"),
+    (models.BooleanField, (bool,), "a boolean"),
+    (models.AutoField, six.integer_types, "an integer"),
+    (models.IntegerField, six.integer_types, "an integer"),
+    (models.FloatField, six.integer_types + (float,), "a number"),
+    (models.DateTimeField, (datetime.datetime,) + six.string_types,
+     "a datetime"),
+)
+
+
+def check_type(field):
+    if field.is_relation:  # Takes the key of the related object.
+        field = field.target_field
+    for field_class, types, description in TYPES:
+        if isinstance(field, field_class):
+            break
+    else:
+        return None
+    message = "Must be %s" % description
+
+    def check(value):
+        # bool is an int, but not the other way around.
+        if not isinstance(value, types) or (
+                isinstance(value, bool) and bool not in types):
+            return message
+    return check
+
+
+def check_required(field):
+    if field.blank:
+        return None
+
+    def check(value):
+        if value is None or value == '':
+            return "This field is required"
+    return check
+
+
+def check_null(field):
+    if field.null or not field.blank:  # Or reported as required.
+        return None
+
+    def check(value):
+        if value is None:
+            return "This field cannot be null"
+    return check
+
+
+def check_length(field):
+    max_length = getattr(field, 'max_length', None)
+    if max_length is None or not isinstance(field, models.CharField):
+        return None
+    message = "Cannot be longer than %d characters" % max_length
+
+    def check(value):
+        if len(value) > max_length:
+            return message
+    return check
+
+
+def check_choices(field):
+    if not field.choices:
+        return None
+    choices = frozenset(value for value, _ in field.flatchoices)
+    message = "Must be one of %s" % ", ".join(sorted(choices))
+
+    def check(value):
+        if value not in choices:
+            return message
+    return check
+
+
+def check_positive(field):
+    if not isinstance(field, (models.PositiveIntegerField,
+                              models.PositiveSmallIntegerField)):
+        return None
+
+    def check(value):
+        if value < 0:
+            return "Cannot be negative"
+    return check
+
+
+# In the order they run; the first failed check of a field reports it.
+# The foreign keys the database does not check are looked up after all
+# of them, see CompiledValidator.check_exists().
+CHECKS = (check_required, check_null, check_type, check_length,
+          check_choices, check_positive)
+
+
+def get_unique_constraints(model):
+    """Return the column names of each unique constraint but the key."""
+    opts = model._meta
+    constraints = [(field.attname,) for field in opts.concrete_fields
+                   if field.unique and not field.primary_key]
+    for names in opts.unique_together:
+        constraints.append(tuple(opts.get_field(name).attname
+                                 for name in names))
+    return constraints
+
+
+def unique_error(columns):
+    """The ValidationError of a failed constraint, as resources.py has it."""
+    if len(columns) == 1:
+        return ValidationError({columns[0]: ["Already exists"]})
+    return ValidationError({NON_FIELD_ERRORS: [
+        "This combination of %s already exists" % ", ".join(columns)]})
+
+
+class CompiledValidator(object):
+    """Validates the given fields of model instances, then Model.clean()."""
+
+    def __init__(self, model, names):
+        self.model = model
+        self.unique_constraints = get_unique_constraints(model)
+        self.checks = {}
+        self.nullable = set()
+        self.relations = {}  # Names to the models of unchecked keys.
+        for name in names:
+            field = model._meta.get_field(name)
+            self.checks[name] = [check for check in (
+                make(field) for make in CHECKS) if check is not None]
+            if field.null:
+                self.nullable.add(name)
+            if (field.is_relation and
+                    not connection.features.supports_foreign_keys):
+                self.relations[name] = field.related_model
+
+    def validate(self, instance, names=None, related=None):
+        """
+        Raise a ValidationError of {field name: [messages]} unless the
+        names (every field by default) of instance have valid values.
+        related is what find_related() returned, for a batch.
+        """
+        errors = {}
+        for name in self.checks if names is None else names:
+            value = getattr(instance, name)
+            if value is None and name in self.nullable:
+                continue
+            for check in self.checks[name]:
+                message = check(value)
+                if message is not None:
+                    errors[name] = [message]
+                    break
+            else:
+                if name in self.relations:
+                    message = self.check_exists(name, value, related)
+                    if message is not None:
+                        errors[name] = [message]
+        if errors:
+            raise ValidationError(errors)
+        instance.clean()
+
+    def check_exists(self, name, value, related=None):
+        """Return a message unless an object of name with key value exists."""
+        model = self.relations[name]
+        if related is not None and name in related:
+            found = value in related[name]
+        else:
+            found = model._default_manager.filter(pk=value).exists()
+        if not found:
+            return "No such %s" % model._meta.verbose_name
+
+    def find_related(self, items):
+        """
+        Return {field name: set of the keys that exist} of the foreign
+        keys the database does not check, as given by items (dicts of
+        field values), for validate(); a query per field.
+        """
+        related = {}
+        for name, model in self.relations.items():
+            keys = set(item.get(name) for item in items
+                       if isinstance(item, dict))
+            keys = [key for key in keys if isinstance(
+                key, six.integer_types) and not isinstance(key, bool)]
+            related[name] = set(model._default_manager.filter(
+                pk__in=keys).values_list('pk', flat=True))
+        return related
+
+    def check_unique(self, instances):
+        """
+        Return a check(instance) that raises the ValidationError of a
+        unique constraint the instance would fail on insert, along with
+        the other instances: by values of an existing row, or of an
+        earlier instance. The database reports just one failure of a
+        batch, and not which instance failed. Runs a query per constraint,
+        by its first column.
+        """
+        taken = {}
+        for columns in self.unique_constraints:
+            firsts = set(getattr(instance, columns[0])
+                         for instance in instances) - set([None])
+            taken[columns] = set(self.model._default_manager.filter(
+                **{columns[0] + '__in': firsts}).values_list(*columns))
+
+        def check(instance):
+            for columns, values in taken.items():
+                key = tuple(getattr(instance, name) for name in columns)
+                if None in key:  # NULLs are never equal.
+                    continue
+                if key in values:
+                    raise unique_error(columns)
+                values.add(key)
+        return check
+
+
+def error_details(error):
+    """Return a ValidationError as {field name: [messages]}."""
+    if hasattr(error, 'error_dict'):
+        return error.message_dict
+    return {NON_FIELD_ERRORS: error.messages}
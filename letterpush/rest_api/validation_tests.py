@@ -0,0 +1,80 @@
+"""Tests of the compiled validators, see validation.py."""
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from . import resources
+from . import resources_tests
+from . import validation
+from .models import Article, ImageLink
+
+
+class CompiledValidatorTest(TestCase):
+
+    def errors(self, validator, instance, names=None):
+        try:
+            validator.validate(instance, names)
+        except ValidationError as e:
+            return validation.error_details(e)
+        return {}
+
+    def test_checks_fields(self):
+        validator = validation.CompiledValidator(Article, ('title', 'body'))
+        self.assertEquals({}, self.errors(
+            validator, Article(title="Title", body="Body")))
+        self.assertEquals({
+            'title': ["This field is required"],
+            'body': ["Cannot be longer than 2000 characters"],
+        }, self.errors(validator, Article(title="", body="x" * 2001)))
+        self.assertEquals({'title': ["Must be a string"]}, self.errors(
+            validator, Article(title=5, body="Body")))
+        # Just the ones asked for.
+        self.assertEquals({}, self.errors(
+            validator, Article(title="", body="Body"), ['body']))
+
+    def test_checks_choices_and_links(self):
+        validator = validation.CompiledValidator(
+            ImageLink, ('image_id', 'article_id', 'role'))
+        errors = self.errors(validator, ImageLink(
+            image_id=None, article_id=True, role='X'))
+        self.assertEquals(["This field is required"], errors['image_id'])
+        self.assertEquals(["Must be an integer"], errors['article_id'])
+        self.assertEquals(["Must be one of G, L, S"], errors['role'])
+
+
+class WriteTest(resources_tests.RestRequestMixin, TestCase):
+    RESOURCE = resources.ImageLinkResource
+    BASE_URI = '/image_links/'
+
+    def test_reports_fields(self):
+        data = dict(resources_tests.ImageLinkTest.make_data(), role='X')
+        status, content = self.request_list('POST', data)
+        self.assertEquals(400, status, content)
+        self.assertEquals({"role": ["Must be one of G, L, S"]},
+                          content["details"])
+
+    def test_reports_duplicates(self):
+        data = resources_tests.ImageLinkTest.make_data()
+        self.request_list('POST', data)
+        status, content = self.request_list('POST', data)
+        self.assertEquals(400, status, content)
+        self.assertEquals(["__all__"], list(content["details"]))
+        self.assertFalse(self.RESOURCE.MODEL.objects.filter(
+            id__gt=1).exists())
+
+    def test_updates_changed_fields_only(self):
+        link = ImageLink(**resources_tests.ImageLinkTest.make_data())
+        link.save()
+        other = Article(title="Other", body="")
+        other.save()
+        with CaptureQueriesContext(connection) as captured:
+            status, content = self.request_detail(
+                'PUT', link.id, {"article_id": other.id, "role": link.role})
+        self.assertEquals(202, status, content)
+        update, = [query["sql"] for query in captured
+                   if query["sql"].startswith('UPDATE "rest_api_imagelink"')]
+        self.assertIn('"article_id"', update)
+        self.assertNotIn('"role"', update)
+        self.assertNotIn('"image_id"', update)
@@ -1,3 +1,159 @@
-from django.shortcuts import render
+import os
+import re
 
-# Create your views here.
+from django.http import (
+    FileResponse, Http404, HttpResponse, HttpResponseNotModified, JsonResponse,
+    StreamingHttpResponse)
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_http_methods
+
+from . import bundles
+from . import cache
+from . import compression
+from . import images
+from . import ratelimit
+from .models import Image
+from .resources import is_not_modified, microseconds
+
+# Bytes read at a time. Whole files go out as a FileResponse, which a
+# WSGI server with wsgi.file_wrapper may send with sendfile() instead.
+CHUNK_SIZE = 64 * 1024
+
+SINGLE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+@ratelimit.limited
+def cache_stats(request):
+    """Counters of the representation cache in this process."""
+    return JsonResponse({"representations": cache.stats()})
+
+
+def parse_range(header, size):
+    """
+    Return (start, stop) of the bytes a Range header asks for in a file
+    of size. Return None to send the whole file, as for several ranges,
+    which we do not do; raise ValueError if no bytes can be sent.
+    """
+    match = SINGLE_RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:  # The last bytes.
+        if not last:
+            return None
+        if int(last) == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - int(last)), size
+    start = int(first)
+    if last and int(last) < start:
+        return None  # Invalid, so ignored.
+    if start >= size:
+        raise ValueError("Range starts past the end")
+    return start, min(int(last) + 1, size) if last else size
+
+
+class FileRange(object):
+    """Bytes [start, stop) of an open file: one seek, then bounded reads."""
+
+    def __init__(self, stream, start, stop):
+        self.stream = stream
+        self.start = start
+        self.stop = stop
+
+    def __iter__(self):
+        self.stream.seek(self.start)
+        remaining = self.stop - self.start
+        while remaining > 0:
+            chunk = self.stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:  # Truncated meanwhile.
+                return
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):  # Called by the response when done.
+        self.stream.close()
+
+
+@require_http_methods(['GET', 'HEAD'])
+@ratelimit.limited
+def article_bundle(request, pk):
+    """The article with its images by role, as stored, see bundles.py."""
+    found = bundles.get(int(pk))
+    if found is None:
+        raise Http404("No such article")
+    content, updated = found
+    etag = '"%d"' % microseconds(updated)
+    last_modified = microseconds(updated) // 1000000
+    if is_not_modified(request, etag, last_modified):
+        response = HttpResponseNotModified()
+    else:
+        response = compression.compress_response(
+            request, HttpResponse(content, content_type='application/json'))
+    if response.has_header('Content-Encoding'):
+        etag = 'W/' + etag
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+@require_http_methods(['GET', 'HEAD'])
+@ratelimit.limited
+def image_content(request, pk):
+    """
+    The file of an image, whole or a single byte range of it, validated
+    by its SHA-256 as kept in the database.
+    """
+    image = Image.objects.filter(pk=pk).values(
+        'path', 'content_type', 'size', 'sha256', 'mtime').first()
+    if image is None:
+        raise Http404("No such image")
+    try:
+        stream = open(images.full_path(image['path']), 'rb')
+    except (images.ImageError, IOError, OSError):
+        raise Http404("No file of this image")
+    found = os.fstat(stream.fileno())
+    if (image['sha256'] and image['size'] == found.st_size and
+            image['mtime'] == found.st_mtime):
+        etag = '"%s"' % image['sha256']
+    else:  # Changed in place since read; no hash to go by.
+        etag = '"%x-%x"' % (int(found.st_mtime), found.st_size)
+    last_modified = int(found.st_mtime)
+    if is_not_modified(request, etag, last_modified):
+        stream.close()
+        response = HttpResponseNotModified()
+    else:
+        response = respond_with_file(request, stream, found.st_size, etag,
+                                     last_modified)
+        response['Content-Type'] = (image['content_type'] or
+                                    'application/octet-stream')
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def respond_with_file(request, stream, size, etag, last_modified):
+    """Return a response with the part of the file the request asks for."""
+    header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if header and if_range and if_range != etag and (
+            parse_http_date_safe(if_range) != last_modified):
+        header = None  # The client has another version; send this one.
+    try:
+        byte_range = parse_range(header, size) if header else None
+    except ValueError:
+        stream.close()
+        response = HttpResponse(status=416)  # Range Not Satisfiable.
+        response['Content-Range'] = 'bytes */%d' % size
+        return response
+    if byte_range is None:
+        response = FileResponse(stream)
+        response.block_size = CHUNK_SIZE
+        response['Content-Length'] = size
+        return response
+    start, stop = byte_range
+    response = StreamingHttpResponse(FileRange(stream, start, stop),
+                                     status=206)  # Partial Content.
+    response['Content-Range'] = 'bytes %d-%d/%d' % (start, stop - 1, size)
+    response['Content-Length'] = stop - start
+    return response
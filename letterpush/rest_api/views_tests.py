@@ -0,0 +1,105 @@
+"""Tests of the plain Django views, see views.py."""
+
+import os
+
+from django.test import TestCase
+
+from . import images
+from . import resources_tests
+from . import views
+from .models import Image
+
+
+class ImageContentTest(resources_tests.ImageFilesMixin, TestCase):
+
+    def setUp(self):
+        super(ImageContentTest, self).setUp()
+        # Big enough to take several chunks.
+        self.content = images.blank_png(2, 2) + b'x' * (3 * views.CHUNK_SIZE)
+        self.write_image('big.png', self.content)
+        self.image = Image(path='big.png', note='Big')
+        self.image.full_clean()
+        self.image.save()
+        self.url = '/api/images/%d/content/' % self.image.id
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        chunks = list(response.streaming_content) if response.streaming else []
+        response.close()
+        return response, chunks
+
+    def test_sends_whole_file(self):
+        response, chunks = self.get()
+        self.assertEquals(200, response.status_code)
+        self.assertEquals('image/png', response['Content-Type'])
+        self.assertEquals(str(len(self.content)), response['Content-Length'])
+        self.assertEquals('"%s"' % self.image.sha256, response['ETag'])
+        self.assertEquals(self.content, b''.join(chunks))
+        self.assertLessEqual(max(map(len, chunks)), views.CHUNK_SIZE)
+
+    def test_sends_range_in_bounded_chunks(self):
+        response, chunks = self.get(HTTP_RANGE='bytes=10-%d' % (
+            2 * views.CHUNK_SIZE + 9))
+        self.assertEquals(206, response.status_code)
+        self.assertEquals('bytes 10-%d/%d' % (2 * views.CHUNK_SIZE + 9,
+                                              len(self.content)),
+                          response['Content-Range'])
+        self.assertEquals(self.content[10:2 * views.CHUNK_SIZE + 10],
+                          b''.join(chunks))
+        self.assertEquals([views.CHUNK_SIZE] * 2,
+                          [len(each) for each in chunks])
+
+    def test_sends_suffix_and_open_ranges(self):
+        _, chunks = self.get(HTTP_RANGE='bytes=-5')
+        self.assertEquals(self.content[-5:], b''.join(chunks))
+        _, chunks = self.get(HTTP_RANGE='bytes=%d-' % (len(self.content) - 3))
+        self.assertEquals(self.content[-3:], b''.join(chunks))
+
+    def test_rejects_range_past_end(self):
+        response, _ = self.get(HTTP_RANGE='bytes=%d-' % len(self.content))
+        self.assertEquals(416, response.status_code)
+        self.assertEquals('bytes */%d' % len(self.content),
+                          response['Content-Range'])
+
+    def test_sends_whole_file_for_several_ranges(self):
+        response, _ = self.get(HTTP_RANGE='bytes=0-1,5-6')
+        self.assertEquals(200, response.status_code)
+
+    def test_sends_whole_file_if_range_is_stale(self):
+        response, _ = self.get(HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"')
+        self.assertEquals(200, response.status_code)
+        response, _ = self.get(HTTP_RANGE='bytes=0-1',
+                               HTTP_IF_RANGE='"%s"' % self.image.sha256)
+        self.assertEquals(206, response.status_code)
+
+    def test_not_modified(self):
+        response, _ = self.get()
+        response, _ = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEquals(304, response.status_code)
+        response, _ = self.get(
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEquals(304, response.status_code)
+
+    def test_changed_file_gets_another_etag(self):
+        with open(images.full_path('big.png'), 'ab') as stream:
+            stream.write(b'more')
+        response, _ = self.get(HTTP_IF_NONE_MATCH='"%s"' % self.image.sha256)
+        self.assertEquals(200, response.status_code)
+
+    def test_file_edited_in_place_gets_another_etag(self):
+        stat = os.stat(images.full_path('big.png'))
+        with open(images.full_path('big.png'), 'r+b') as stream:
+            stream.seek(-4, os.SEEK_END)
+            stream.write(b'less')  # Same size, other bytes.
+        os.utime(images.full_path('big.png'),
+                 (stat.st_atime, stat.st_mtime + 10))
+        response, _ = self.get(HTTP_RANGE='bytes=0-1',
+                               HTTP_IF_RANGE='"%s"' % self.image.sha256)
+        self.assertEquals(200, response.status_code)
+        self.assertNotEquals('"%s"' % self.image.sha256, response['ETag'])
+
+    def test_missing_image_or_file(self):
+        self.assertEquals(404, self.client.get(
+            '/api/images/%d/content/' % (self.image.id + 1)).status_code)
+        os.remove(images.full_path('big.png'))
+        self.assertEquals(404, self.client.get(self.url).status_code)